@@ -5,81 +5,44 @@ This script takes your existing CSV/Excel files and adds email addresses
 """
 
 import pandas as pd
-import re
 import time
 import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin
 import os
 from datetime import datetime
+from page_parser import extract_emails_from_text, is_valid_email
+from website_emails import WebsiteEmailFinder, USER_AGENT
+from job_control import Deadline
+from lead_store import get_lead_store
+from email_cleaning import SOURCE_SCRAPED, SOURCE_GUESSED
+from metrics import get_metrics
+from profiling import profile_run, take_profile_flag
+from run_log import get_log
+from config import LEAD_TIME_BUDGET
 
 class EmailExtractor:
     def __init__(self):
-        self.email_patterns = [
-            r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',
-            r'\b[A-Za-z0-9._%+-]+\s*@\s*[A-Za-z0-9.-]+\s*\.\s*[A-Z|a-z]{2,}\b'
-        ]
         self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+        self.session.headers.update({'User-Agent': USER_AGENT})
+        self.email_finder = WebsiteEmailFinder(self.session)
     
     def extract_emails_from_text(self, text):
         """Extract email addresses from text"""
-        emails = set()
-        for pattern in self.email_patterns:
-            found_emails = re.findall(pattern, text, re.IGNORECASE)
-            for email in found_emails:
-                email = email.strip().replace(' ', '')
-                if self.is_valid_email(email):
-                    emails.add(email.lower())
-        return list(emails)
+        return extract_emails_from_text(text)
     
     def is_valid_email(self, email):
         """Basic email validation"""
-        if not email or len(email) < 5:
-            return False
-        if email.count('@') != 1:
-            return False
-        if email.startswith('.') or email.endswith('.'):
-            return False
-        if '..' in email:
-            return False
-        return True
+        return is_valid_email(email)
     
-    def get_emails_from_website(self, url):
-        """Get emails from a website"""
-        emails = set()
+    def get_emails_from_website(self, url, deadline=None):
+        """Get emails from a website within an optional time budget"""
+        if not url or pd.isna(url):
+            return []
         
-        try:
-            if not url or pd.isna(url):
-                return []
-            
-            # Clean URL
-            if not url.startswith(('http://', 'https://')):
-                url = 'https://' + url
-            
-            print(f"   🌐 Checking: {url}")
-            
-            response = self.session.get(url, timeout=10)
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'html.parser')
-                
-                # Get all text content
-                text_content = soup.get_text()
-                emails.update(self.extract_emails_from_text(text_content))
-                
-                # Also check HTML attributes that might contain emails
-                for element in soup.find_all(['a', 'span', 'div', 'p']):
-                    if element.get('href', '').startswith('mailto:'):
-                        email = element.get('href').replace('mailto:', '').split('?')[0]
-                        if self.is_valid_email(email):
-                            emails.add(email.lower())
-                
-        except Exception as e:
-            print(f"   ⚠️  Error checking {url}: {str(e)}")
+        # Scheme and www. variants are raced by the email finder
+        get_log().debug('website_check', "   🌐 Checking: {url}", url=url)
         
-        return list(emails)
+        # Homepage only; parsing runs in the shared parser pool
+        return self.email_finder.find_emails(url, max_pages=1, deadline=deadline)
     
     def add_emails_to_dataframe(self, df, website_column='website', name_column='name'):
         """Add email column to existing dataframe"""
@@ -87,16 +50,21 @@ class EmailExtractor:
         print("⚠️  This will take some time as we check each website...")
         
         emails_list = []
+        sources_list = []
+        log = get_log()
+        progress = log.progress('leads', total=len(df))
         
         for i, row in df.iterrows():
-            print(f"\n📋 Processing {i+1}/{len(df)}: {row.get(name_column, 'Unknown')}")
+            log.debug('lead', "\n📋 Processing {i}/{count}: {name}",
+                      i=i + 1, count=len(df), name=row.get(name_column, 'Unknown'))
             
             emails = []
             
             # Try to get emails from website
             if website_column in row and row[website_column]:
-                website_emails = self.get_emails_from_website(row[website_column])
+                website_emails = self.get_emails_from_website(row[website_column], Deadline(LEAD_TIME_BUDGET))
                 emails.extend(website_emails)
+            source = SOURCE_SCRAPED if emails else ''
             
             # If no emails found, try to construct common email patterns
             if not emails and name_column in row and row[name_column]:
@@ -127,20 +95,26 @@ class EmailExtractor:
                     for pattern in patterns:
                         if self.is_valid_email(pattern):
                             emails.append(pattern)
+                            source = SOURCE_GUESSED
                             break  # Just add one guess per domain
             
             emails_list.append(', '.join(emails) if emails else '')
+            sources_list.append(source)
             
-            if emails:
-                print(f"   ✅ Found: {', '.join(emails)}")
+            if source == SOURCE_GUESSED:
+                log.debug('emails_guessed', "   🤔 Guessed: {emails}", emails=emails_list[-1])
+            elif emails:
+                log.debug('emails_found', "   ✅ Found: {emails}", emails=emails_list[-1])
             else:
-                print(f"   ❌ No emails found")
+                log.debug('emails_missing', "   ❌ No emails found")
+            progress.update(found=int(source == SOURCE_SCRAPED), guessed=int(source == SOURCE_GUESSED))
             
             # Add delay to be respectful
             time.sleep(1)
         
-        # Add emails column to dataframe
+        # Add emails column to dataframe, recording which ones are only guesses
         df['emails'] = emails_list
+        df['email_source'] = sources_list
         return df
 
 def main():
@@ -202,6 +176,16 @@ def main():
         output_file = os.path.join(data_dir, f"leads_with_emails_{timestamp}.csv")
         df_with_emails.to_csv(output_file, index=False)
         
+        # Keep the lead store in step with the enriched file (guesses stay out of it)
+        store = get_lead_store()
+        job_id = store.start_job('enrich', name=os.path.splitext(os.path.basename(output_file))[0])
+        scraped_only = df_with_emails.assign(
+            emails=df_with_emails['emails'].where(df_with_emails['email_source'] != SOURCE_GUESSED, '')
+        )
+        store.upsert_many(scraped_only.to_dict('records'), job_id)
+        store.finish_job(job_id)
+        store.record_export(output_file, job_id, len(df_with_emails))
+        
         print(f"\n🎉 Email extraction completed!")
         print(f"💾 Enhanced data saved to: {output_file}")
         
@@ -212,6 +196,8 @@ def main():
         print(f"   Leads with emails: {leads_with_emails}")
         print(f"   Success rate: {leads_with_emails/len(df_with_emails)*100:.1f}%")
         
+        get_metrics().save_run_summary(output_file)
+        
         # Show sample results
         if leads_with_emails > 0:
             print(f"\n📋 Sample leads with emails:")
@@ -223,4 +209,5 @@ def main():
         print(f"❌ Error: {str(e)}")
 
 if __name__ == "__main__":
-    main()
+    with profile_run(take_profile_flag()):
+        main()
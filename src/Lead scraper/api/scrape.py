@@ -3,10 +3,12 @@ import os
 import json
 from datetime import datetime
 import requests
-from bs4 import BeautifulSoup
 import re
 import time
-import threading
+import uuid
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from urllib.parse import urlparse
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -14,27 +16,86 @@ load_dotenv()
 
 app = Flask(__name__)
 
-# Global variables for status tracking
-scraping_status = {
-    'is_running': False,
-    'current_query': '',
-    'leads_found': 0,
-    'total_queries': 0,
-    'completed_queries': 0,
-    'error': None
-}
-
-def get_place_details(place_id, api_key):
+# Function instances freeze between requests and are recycled at any time, so
+# nothing runs after a response: each request to /api/scrape does one bounded
+# slice of a job and returns a continuation token for the next one, and the
+# job's progress lives in a state store (see get_state_store below)
+SLICE_SECONDS = float(os.getenv('SLICE_SECONDS', 6))  # Work per request, below the platform's time limit
+SLICE_MAX_DETAILS = int(os.getenv('SLICE_MAX_DETAILS', 20))  # Place details calls per request
+PAGE_TOKEN_DELAY = 2  # Seconds before Google accepts a next_page_token
+SLICE_CLAIM_TTL = 60  # Seconds before a slice claimed by a request that died can be run again
+
+# Job ids are made by new_job and become state store keys (file names for
+# FileStateStore), so ids and tokens from a request are checked against these first
+JOB_ID_PATTERN = re.compile(r'[0-9a-f]{12}')
+CONTINUATION_PATTERN = re.compile(r'([0-9a-f]{12})\.(\d+)')
+
+# Google Maps Platform host (overridable to point at a local stand-in, see benchmarks/)
+PLACES_API_BASE_URL = os.getenv('PLACES_API_BASE_URL', 'https://maps.googleapis.com').rstrip('/')
+
+# One pooled session for every outgoing request. LEADSCRAPER_CASSETTE records or
+# replays its traffic for offline regression runs (see ../cassette.py; never set on Vercel)
+http_session = requests.Session()
+if os.getenv('LEADSCRAPER_CASSETTE'):
+    import sys
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from cassette import install_cassette
+    install_cassette(http_session)
+
+# Geocoded locations, kept for the life of the instance and mirrored to /tmp
+GEOCODE_CACHE_FILE = os.getenv('GEOCODE_CACHE_FILE', '/tmp/geocode_cache.json')
+geocode_cache = {}
+
+def geocode_location(location, api_key, timeout=10):
+    """Resolve a location string to lat/lng and viewport, geocoding each string only once"""
+    key = ' '.join(location.lower().split())
+    
+    if not geocode_cache:
+        try:
+            with open(GEOCODE_CACHE_FILE, 'r') as f:
+                geocode_cache.update(json.load(f))
+        except (FileNotFoundError, ValueError):
+            pass
+    
+    if key in geocode_cache:
+        return geocode_cache[key]
+    
+    try:
+        url = f"{PLACES_API_BASE_URL}/maps/api/geocode/json"
+        response = http_session.get(url, params={'address': location, 'key': api_key}, timeout=timeout)
+        data = response.json()
+        
+        if data['status'] == 'OK' and data['results']:
+            geometry = data['results'][0]['geometry']
+            geocode_cache[key] = {
+                'query': location,
+                'formatted_address': data['results'][0].get('formatted_address', location),
+                'lat': geometry['location']['lat'],
+                'lng': geometry['location']['lng'],
+                'viewport': geometry.get('viewport')
+            }
+            try:
+                with open(GEOCODE_CACHE_FILE, 'w') as f:
+                    json.dump(geocode_cache, f)
+            except OSError:
+                pass
+            return geocode_cache[key]
+    except Exception as e:
+        print(f"Error geocoding location: {e}")
+    
+    return None
+
+def get_place_details(place_id, api_key, timeout=10):
     """Get detailed information about a place"""
     try:
-        url = "https://maps.googleapis.com/maps/api/place/details/json"
+        url = f"{PLACES_API_BASE_URL}/maps/api/place/details/json"
         params = {
             'place_id': place_id,
             'fields': 'name,formatted_address,formatted_phone_number,website,type,rating,user_ratings_total',
             'key': api_key
         }
         
-        response = requests.get(url, params=params)
+        response = http_session.get(url, params=params, timeout=timeout)
         data = response.json()
         
         if data['status'] == 'OK':
@@ -46,25 +107,111 @@ def get_place_details(place_id, api_key):
                 'website': result.get('website', ''),
                 'type': ', '.join(result.get('type', [])),
                 'rating': result.get('rating', ''),
-                'reviews': result.get('user_ratings_total', '')
+                'reviews': result.get('user_ratings_total', ''),
+                'place_id': place_id
             }
     except Exception as e:
         print(f"Error getting place details: {e}")
     
     return None
 
-def extract_email_from_website(url):
+# Working scheme://host per domain, kept for the life of the instance
+canonical_urls = {}
+url_race_pool = ThreadPoolExecutor(max_workers=8)
+
+def url_variants(url):
+    """http/https and www/bare variants of a website URL, most likely first"""
+    parsed = urlparse(url if '://' in url else 'https://' + url)
+    schemes = [parsed.scheme, 'http' if parsed.scheme == 'https' else 'https']
+    bare = parsed.netloc[4:] if parsed.netloc.lower().startswith('www.') else parsed.netloc
+    hosts = [parsed.netloc, bare if parsed.netloc != bare else 'www.' + bare]
+    
+    variants = []
+    for scheme in schemes:
+        for host in hosts:
+            variant = f"{scheme}://{host}{parsed.path or '/'}"
+            if parsed.query:
+                variant += '?' + parsed.query
+            if variant not in variants:
+                variants.append(variant)
+    return variants
+
+def close_response(future):
+    """Done-callback closing a race loser's response"""
+    try:
+        future.result().close()
+    except Exception:
+        pass
+
+def open_website(url, headers, timeout=10):
+    """
+    Race the URL variants of a website and return the first 200 response
+    
+    Responses are streamed, so only the winner's body is ever downloaded
+    (the caller reads and closes it); losers are closed as they arrive. The
+    whole race, not just each request, ends after `timeout` seconds.
+    """
+    domain = urlparse(url if '://' in url else 'https://' + url).netloc.lower()
+    domain = domain[4:] if domain.startswith('www.') else domain
+    expires_at = time.monotonic() + timeout
+    
+    if domain in canonical_urls:
+        try:
+            response = http_session.get(canonical_urls[domain], headers=headers, timeout=timeout, stream=True)
+            if response.status_code == 200:
+                return response
+            response.close()
+        except requests.RequestException:
+            pass
+        canonical_urls.pop(domain, None)
+    
+    remaining = expires_at - time.monotonic()
+    if remaining <= 0:
+        return None
+    pending = {url_race_pool.submit(http_session.get, variant, headers=headers, timeout=remaining, stream=True)
+               for variant in url_variants(url)}
+    winner = None
+    while pending and winner is None:
+        remaining = expires_at - time.monotonic()
+        if remaining <= 0:
+            break
+        done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                response = future.result()
+            except requests.RequestException:
+                continue
+            if winner is None and response.status_code == 200:
+                winner = response
+            else:
+                response.close()
+    
+    # Close the losers' responses whenever they arrive
+    for future in pending:
+        future.add_done_callback(close_response)
+    
+    if winner is not None:
+        canonical_urls[domain] = winner.url
+    return winner
+
+def extract_email_from_website(url, timeout=10):
     """Extract email from a website"""
     try:
-        if not url or not url.startswith(('http://', 'https://')):
+        if not url:
             return 'No email found'
         
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
         
-        response = requests.get(url, headers=headers, timeout=10)
-        soup = BeautifulSoup(response.content, 'html.parser')
+        response = open_website(url, headers, timeout)
+        if response is None:
+            return 'No email found'
+        
+        # Imported on first use, so cold starts that only check status skip it
+        from bs4 import BeautifulSoup
+        with response:
+            soup = BeautifulSoup(response.content, 'html.parser')
         
         # Look for email patterns
         email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
@@ -86,154 +233,361 @@ def extract_email_from_website(url):
     
     return 'No email found'
 
-def search_places(query, location, api_key, max_results=20):
-    """Search for places using Google Places API"""
-    places = []
-    
+def search_page(query, location, api_key, radius=5000, page_token=None, timeout=10):
+    """One page of text search results: (place ids, next_page_token)"""
     try:
-        url = "https://maps.googleapis.com/maps/api/place/text/search/json"
-        params = {
-            'query': f"{query} in {location}",
-            'key': api_key
-        }
+        url = f"{PLACES_API_BASE_URL}/maps/api/place/text/search/json"
+        
+        # Search explicit coordinates when the location geocodes, otherwise
+        # fall back to putting the location in the query text
+        resolved = geocode_location(location, api_key, timeout)
+        if resolved:
+            params = {
+                'query': query,
+                'location': f"{resolved['lat']},{resolved['lng']}",
+                'radius': radius,
+                'key': api_key
+            }
+        else:
+            params = {
+                'query': f"{query} in {location}",
+                'key': api_key
+            }
+        if page_token:
+            params['pagetoken'] = page_token
         
-        response = requests.get(url, params=params)
+        response = http_session.get(url, params=params, timeout=timeout)
         data = response.json()
         
         if data['status'] == 'OK':
-            for place in data['results'][:max_results]:
-                place_id = place['place_id']
-                details = get_place_details(place_id, api_key)
-                
-                if details:
-                    places.append(details)
-                
-                # Rate limiting
-                time.sleep(0.1)
-        
-        # Handle pagination if needed
-        if 'next_page_token' in data and len(places) < max_results:
-            time.sleep(2)  # Required delay for next_page_token
-            params['pagetoken'] = data['next_page_token']
-            
-            response = requests.get(url, params=params)
-            data = response.json()
-            
-            if data['status'] == 'OK':
-                for place in data['results'][:max_results - len(places)]:
-                    place_id = place['place_id']
-                    details = get_place_details(place_id, api_key)
-                    
-                    if details:
-                        places.append(details)
-                    
-                    time.sleep(0.1)
+            return [place['place_id'] for place in data['results']], data.get('next_page_token')
     
     except Exception as e:
         print(f"Error searching places: {e}")
     
-    return places
+    return [], None
 
-def scrape_leads_async(location, queries, max_results, include_emails):
-    """Async function to scrape leads"""
-    global scraping_status
+class StateStore(ABC):
+    """Where job states live, shared by the requests that continue a job"""
     
-    try:
-        scraping_status['is_running'] = True
-        scraping_status['total_queries'] = len(queries)
-        scraping_status['completed_queries'] = 0
-        scraping_status['leads_found'] = 0
-        scraping_status['error'] = None
-        
-        api_key = os.getenv('GOOGLE_API_KEY')
-        all_leads = []
-        
-        for i, query in enumerate(queries):
-            scraping_status['current_query'] = query
-            scraping_status['completed_queries'] = i
-            
-            print(f"Searching for: {query}")
-            places = search_places(query, location, api_key, max_results)
-            
-            if include_emails:
-                for place in places:
-                    if place['website']:
-                        place['email'] = extract_email_from_website(place['website'])
-                    else:
-                        place['email'] = 'No email found'
-            else:
-                for place in places:
-                    place['email'] = 'Email extraction disabled'
-            
-            all_leads.extend(places)
-            scraping_status['leads_found'] = len(all_leads)
-            
-            # Rate limiting between queries
-            time.sleep(1)
-        
-        scraping_status['completed_queries'] = len(queries)
-        
-        # Save results to a temporary location (Vercel doesn't have persistent file system)
-        # In a real deployment, you'd save to a database or cloud storage
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        search_terms_clean = '_'.join([term.replace(' ', '_').replace(',', '') for term in queries[:3]])
-        if len(queries) > 3:
-            search_terms_clean += f"_and_{len(queries)-3}_more"
-        
-        if len(search_terms_clean) > 50:
-            search_terms_clean = search_terms_clean[:50]
+    @abstractmethod
+    def load(self, key):
+        """The value stored under key, or None"""
+    
+    @abstractmethod
+    def save(self, key, value):
+        """Store a JSON-serializable value under key"""
+    
+    @abstractmethod
+    def claim(self, key, ttl=SLICE_CLAIM_TTL):
+        """Atomically take a key no other request holds (across every instance); False if it is taken"""
+
+class FileStateStore(StateStore):
+    """Job states as JSON files; only shared by requests that reach the same instance"""
+    
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+    
+    def _path(self, key):
+        if os.path.basename(key) != key or key in ('', '.', '..'):
+            raise ValueError(f"Invalid state key: {key!r}")
+        return os.path.join(self.directory, f"{key}.json")
+    
+    def load(self, key):
+        try:
+            with open(self._path(key), 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+    
+    def save(self, key, value):
+        # Write then rename, so a recycled instance never leaves half a file
+        tmp_path = f"{self._path(key)}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(value, f)
+        os.replace(tmp_path, self._path(key))
+    
+    def claim(self, key, ttl=SLICE_CLAIM_TTL):
+        """Atomically take a key no other request holds; False if it is taken"""
+        path = self._path(key) + '.claim'
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            pass
+        # A claim left by a request that died is taken over once it expires
+        try:
+            if time.time() - os.path.getmtime(path) < ttl:
+                return False
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            return False
+
+class KVStateStore(StateStore):
+    """Job states in a Redis-compatible REST store such as Vercel KV, shared by every instance"""
+    
+    def __init__(self, url, token, ttl=86400):
+        self.url = url.rstrip('/')
+        self.headers = {'Authorization': f'Bearer {token}'}
+        self.ttl = ttl
+    
+    def _command(self, *args):
+        """Run one Redis command, sent as a JSON array, and return its result"""
+        response = http_session.post(self.url, json=[str(arg) for arg in args], headers=self.headers, timeout=5)
+        response.raise_for_status()
+        return response.json().get('result')
+    
+    def load(self, key):
+        value = self._command('GET', f"scrape:{key}")
+        return json.loads(value) if value else None
+    
+    def save(self, key, value):
+        self._command('SET', f"scrape:{key}", json.dumps(value), 'EX', self.ttl)
+    
+    def claim(self, key, ttl=SLICE_CLAIM_TTL):
+        """Atomically take a key no other request holds (SET NX); False if it is taken"""
+        return self._command('SET', f"scrape:claim:{key}", '1', 'NX', 'EX', int(ttl)) == 'OK'
+
+# Job state stores by URL scheme: factory(url) -> StateStore
+STATE_STORES = {}
+
+def register_state_store(scheme, factory):
+    """Make get_state_store() build stores for URLs with this scheme"""
+    STATE_STORES[scheme] = factory
+
+def _file_state_store(url):
+    """file:///tmp/scrape_jobs: one JSON file per key in that directory"""
+    return FileStateStore(url[len('file://'):])
+
+def _kv_state_store(url):
+    """Vercel KV's REST URL (https://...), with its token from KV_REST_API_TOKEN"""
+    return KVStateStore(url, os.environ['KV_REST_API_TOKEN'])
+
+register_state_store('file', _file_state_store)
+register_state_store('https', _kv_state_store)
+
+state_stores = {}
+
+def get_state_store(url=None):
+    """
+    Return the job state store for a URL
+    
+    Args:
+        url: Store URL (default: SCRAPE_STATE_URL; else Vercel KV's KV_REST_API_URL
+             when KV is connected, else file:// in SCRAPE_STATE_DIR or /tmp/scrape_jobs)
+    """
+    url = (url or os.getenv('SCRAPE_STATE_URL') or os.getenv('KV_REST_API_URL')
+           or f"file://{os.getenv('SCRAPE_STATE_DIR', '/tmp/scrape_jobs')}")
+    scheme = url.split('://', 1)[0]
+    if scheme not in STATE_STORES:
+        raise ValueError(f"No state store registered for {scheme}:// (known: {', '.join(sorted(STATE_STORES))})")
+    if url not in state_stores:
+        state_stores[url] = STATE_STORES[scheme](url)
+    return state_stores[url]
+
+def new_job(location, queries, max_results, include_emails):
+    """State of a job that hasn't done any work yet"""
+    return {
+        'job_id': uuid.uuid4().hex[:12],
+        'location': location,
+        'queries': queries,
+        'max_results': max_results,
+        'include_emails': include_emails,
+        'is_running': True,
+        'current_query': '',
+        'leads_found': 0,
+        'total_queries': len(queries),
+        'completed_queries': 0,
+        'error': None,
+        'step': 0,
+        # Where the current query is up to
+        'searched': False,
+        'pending': [],
+        'page_token': None,
+        'page_token_at': 0,
+        'query_leads': 0,
+        'leads': []
+    }
+
+def run_slice(job, api_key, max_details=SLICE_MAX_DETAILS, seconds=SLICE_SECONDS):
+    """
+    Advance a job by at most max_details place details calls or about `seconds`
+    
+    Every step (a search page, or one place's details and email) updates the
+    job in place, so the next slice picks up exactly where this one stopped.
+    """
+    started = time.monotonic()
+    details_calls = 0
+    
+    def time_left():
+        return seconds - (time.monotonic() - started)
+    
+    def request_timeout():
+        # No single request may carry the slice far past its budget
+        return max(1, min(10, time_left()))
+    
+    while job['completed_queries'] < len(job['queries']):
+        if time_left() <= 0 or details_calls >= max_details:
+            return
+        query = job['queries'][job['completed_queries']]
+        job['current_query'] = query
         
-        filename = f"leads_{search_terms_clean}_{timestamp}.json"
+        if job['pending'] and job['query_leads'] < job['max_results']:
+            details = get_place_details(job['pending'].pop(0), api_key, timeout=request_timeout())
+            details_calls += 1
+            if details:
+                if not job['include_emails']:
+                    details['email'] = 'Email extraction disabled'
+                elif details['website']:
+                    details['email'] = extract_email_from_website(details['website'],
+                                                                  timeout=request_timeout())
+                else:
+                    details['email'] = 'No email found'
+                job['leads'].append(details)
+                job['query_leads'] += 1
+                job['leads_found'] = len(job['leads'])
+            
+            # Rate limiting
+            time.sleep(0.1)
         
-        # Store results in memory (in production, use a database)
-        scraping_status['results'] = {
-            'filename': filename,
-            'leads': all_leads,
-            'total_leads': len(all_leads),
-            'timestamp': timestamp
-        }
+        elif not job['searched'] or (job['page_token'] and job['query_leads'] < job['max_results']):
+            if job['searched']:
+                # Next page: the token only works a moment after it was issued
+                wait = PAGE_TOKEN_DELAY - (time.time() - job['page_token_at'])
+                if wait > 0:
+                    if wait >= time_left():
+                        return
+                    time.sleep(wait)
+            print(f"Searching for: {query}")
+            place_ids, page_token = search_page(query, job['location'], api_key, page_token=job['page_token'],
+                                                timeout=request_timeout())
+            job.update(searched=True, pending=place_ids[:job['max_results'] - job['query_leads']],
+                       page_token=page_token, page_token_at=time.time())
         
-    except Exception as e:
-        scraping_status['error'] = str(e)
-        print(f"Error in scraping: {e}")
-    finally:
-        scraping_status['is_running'] = False
+        else:
+            job.update(completed_queries=job['completed_queries'] + 1, searched=False,
+                       pending=[], page_token=None, query_leads=0)
+    
+    finish_job(job)
 
-@app.route('/api/scrape', methods=['POST'])
-def scrape():
-    """Start scraping leads"""
-    global scraping_status
+def finish_job(job):
+    """Mark a job done and name its results"""
+    queries = job['queries']
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    search_terms_clean = '_'.join([term.replace(' ', '_').replace(',', '') for term in queries[:3]])
+    if len(queries) > 3:
+        search_terms_clean += f"_and_{len(queries)-3}_more"
     
-    if scraping_status['is_running']:
-        return jsonify({'error': 'Scraping is already in progress'}), 400
+    if len(search_terms_clean) > 50:
+        search_terms_clean = search_terms_clean[:50]
     
-    data = request.form
-    location = data.get('location', '')
-    search_terms = data.get('search_terms', '')
-    max_results = int(data.get('max_results', 20))
-    include_emails = data.get('include_emails') == 'on'
+    filename = f"leads_{search_terms_clean}_{timestamp}.json"
     
-    if not location or not search_terms:
-        return jsonify({'error': 'Location and search terms are required'}), 400
+    job['is_running'] = False
+    job['results'] = {
+        'filename': filename,
+        'leads': job['leads'],
+        'total_leads': len(job['leads']),
+        'timestamp': timestamp
+    }
+
+def job_status(job):
+    """What a client sees of a job, with the token for its next slice while it is unfinished"""
+    status = {key: job[key] for key in ('job_id', 'is_running', 'current_query', 'leads_found',
+                                        'total_queries', 'completed_queries', 'error')}
+    status['continuation'] = f"{job['job_id']}.{job['step']}" if job['is_running'] else None
+    if 'results' in job:
+        status['results'] = job['results']
+    return status
+
+@app.route('/api/scrape', methods=['POST'])
+def scrape():
+    """
+    Start a scrape, or continue one with the continuation token from the last response
+    
+    Each request does one slice of work and returns the job's status; keep
+    posting the continuation token back until it comes back empty.
+    """
+    data = request.get_json(silent=True) or request.form
+    store = get_state_store()
+    token = data.get('continuation')
     
-    queries = [term.strip() for term in search_terms.split(',') if term.strip()]
+    if token:
+        match = CONTINUATION_PATTERN.fullmatch(token)
+        if not match:
+            return jsonify({'error': 'Invalid continuation token'}), 400
+        job_id, step = match.groups()
+        job = store.load(job_id)
+        if job is None:
+            return jsonify({'error': 'Job not found'}), 404
+        # Claiming the step is atomic, so of two requests with the same token
+        # (a retry, a double click) only one runs the slice and pays for its calls
+        if not job['is_running'] or str(job['step']) != step or not store.claim(token):
+            # Already continued by another request; report where it is
+            return jsonify(job_status(job)), 409
+    else:
+        location = data.get('location', '')
+        search_terms = data.get('search_terms', '')
+        max_results = int(data.get('max_results', 20))
+        include_emails = data.get('include_emails') in ('on', True)
+        
+        if not location or not search_terms:
+            return jsonify({'error': 'Location and search terms are required'}), 400
+        
+        queries = [term.strip() for term in search_terms.split(',') if term.strip()]
+        job = new_job(location, queries, max_results, include_emails)
+        store.save('latest', {'job_id': job['job_id']})
     
-    # Start scraping in a separate thread
-    thread = threading.Thread(target=scrape_leads_async, args=(location, queries, max_results, include_emails))
-    thread.start()
+    try:
+        run_slice(job, os.getenv('GOOGLE_API_KEY'))
+    except Exception as e:
+        job['error'] = str(e)
+        job['is_running'] = False
+        print(f"Error in scraping: {e}")
     
-    return jsonify({'message': 'Scraping started'})
+    job['step'] += 1
+    store.save(job['job_id'], job)
+    return jsonify(job_status(job))
+
+def load_job(job_id=None):
+    """A job's state by id, or the most recently started job's"""
+    store = get_state_store()
+    if not job_id:
+        latest = store.load('latest')
+        job_id = latest and latest['job_id']
+    return store.load(job_id) if job_id else None
+
+def invalid_job_id(job_id):
+    """True for a ?job_id=... that new_job could not have made"""
+    return bool(job_id) and not JOB_ID_PATTERN.fullmatch(job_id)
 
 @app.route('/api/status')
 def status():
-    """Get scraping status"""
-    return jsonify(scraping_status)
+    """Get a job's status (?job_id=..., default: the most recent job) without doing any work"""
+    job_id = request.args.get('job_id')
+    if invalid_job_id(job_id):
+        return jsonify({'error': 'Invalid job id'}), 400
+    job = load_job(job_id)
+    if job is None:
+        return jsonify({'is_running': False, 'current_query': '', 'leads_found': 0, 'total_queries': 0,
+                        'completed_queries': 0, 'error': None, 'continuation': None})
+    return jsonify(job_status(job))
 
 @app.route('/api/download/<filename>')
 def download(filename):
-    """Download results"""
-    if 'results' in scraping_status and scraping_status['results']['filename'] == filename:
-        leads = scraping_status['results']['leads']
+    """Download results (?job_id=..., default: the most recent job)"""
+    job_id = request.args.get('job_id')
+    if invalid_job_id(job_id):
+        return jsonify({'error': 'Invalid job id'}), 400
+    job = load_job(job_id)
+    if job and 'results' in job and job['results']['filename'] == filename:
+        leads = job['results']['leads']
         
         # Convert to CSV format
         csv_content = "Name,Address,Phone,Website,Type,Rating,Reviews,Email\n"
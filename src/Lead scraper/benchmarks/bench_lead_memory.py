@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Lead Memory Benchmark - Bytes held per lead, dict vs LeadRecord
+Builds the same synthetic job twice, once with the old 12-key dict per lead
+and once with LeadRecord, and reports what tracemalloc says each one keeps
+alive.
+
+Usage: python3 benchmarks/bench_lead_memory.py [number_of_leads]
+"""
+
+import os
+import sys
+import time
+import random
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from lead_record import LeadRecord, join_types
+
+QUERIES = ['restaurants', 'coffee shops', 'cafes', 'pizza', 'barber shops']
+TYPE_SETS = [
+    ['restaurant', 'food', 'point_of_interest', 'establishment'],
+    ['cafe', 'food', 'point_of_interest', 'establishment'],
+    ['meal_takeaway', 'restaurant', 'food', 'point_of_interest', 'establishment'],
+    ['hair_care', 'point_of_interest', 'establishment'],
+]
+
+
+def synthetic_places(count: int, seed: int = 42):
+    """(place, details, query) triples shaped like Places API responses"""
+    rng = random.Random(seed)
+    for i in range(count):
+        place = {'place_id': f"ChIJ{i:012d}abcdefghijkl", 'name': f"Business {i}"}
+        details = {
+            'name': f"Business {i}",
+            'formatted_address': f"{rng.randint(1, 300)} High Street, London E{rng.randint(1, 20)} {i % 9}AB, UK",
+            'formatted_phone_number': f"020 {rng.randint(1000, 9999)} {rng.randint(1000, 9999)}",
+            'website': f"https://business{i}.co.uk/",
+            'rating': round(rng.uniform(3, 5), 1),
+            'user_ratings_total': rng.randint(0, 2000),
+            'price_level': rng.choice([1, 2, 3]),
+            'business_status': 'OPERATIONAL',
+            # A fresh list per response, as the API client returns
+            'type': list(rng.choice(TYPE_SETS)),
+        }
+        yield place, details, rng.choice(QUERIES)
+
+
+def legacy_lead(place, details, query):
+    """The dict every lead used to be built as"""
+    return {
+        'name': details.get('name', place.get('name', '')),
+        'address': details.get('formatted_address', place.get('formatted_address', '')),
+        'phone': details.get('formatted_phone_number', ''),
+        'website': details.get('website', ''),
+        'rating': details.get('rating', 0),
+        'total_reviews': details.get('user_ratings_total', 0),
+        'price_level': details.get('price_level', ''),
+        'business_status': details.get('business_status', ''),
+        'types': ', '.join(details.get('type', [])),
+        'place_id': place.get('place_id', ''),
+        'query_used': ''.join(query),  # a per-request copy, as from a parsed form field
+        'scraped_at': datetime.now().isoformat()
+    }
+
+
+def record_lead(place, details, query):
+    """The same lead as a LeadRecord"""
+    return LeadRecord(
+        name=details.get('name', place.get('name', '')),
+        address=details.get('formatted_address', place.get('formatted_address', '')),
+        phone=details.get('formatted_phone_number', ''),
+        website=details.get('website', ''),
+        rating=details.get('rating', 0),
+        total_reviews=details.get('user_ratings_total', 0),
+        price_level=details.get('price_level', ''),
+        business_status=details.get('business_status', ''),
+        types=join_types(details.get('type', [])),
+        place_id=place.get('place_id', ''),
+        query_used=''.join(query),
+        scraped_at=time.time()
+    )
+
+
+def measure(build, count: int) -> int:
+    """Bytes still allocated after building and keeping count leads"""
+    inputs = list(synthetic_places(count))
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    leads = [build(place, details, query) for place, details, query in inputs]
+    held = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    del leads
+    return held
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    print(f"🧪 Building {count} leads each way...")
+
+    legacy = measure(legacy_lead, count)
+    record = measure(record_lead, count)
+
+    print(f"\n📊 Memory held per lead:")
+    print(f"   dict:       {legacy / count:8.0f} bytes ({legacy / 1e6:.1f} MB total)")
+    print(f"   LeadRecord: {record / count:8.0f} bytes ({record / 1e6:.1f} MB total)")
+    print(f"   Saving:     {(1 - record / legacy) * 100:.0f}%")
+
+
+if __name__ == "__main__":
+    main()
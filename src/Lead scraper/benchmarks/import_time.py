@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Import Time - Cold-start cost of each entry point, against a startup budget
+Imports every entry point in fresh interpreters with `python -X importtime`
+and reports the median time its import took, the modules that cost the most,
+and any heavy dependency (pandas, googlemaps, BeautifulSoup, ...) that was
+loaded at startup instead of on first use. Exits with status 1 when an entry
+point is over its budget or loads a module it should defer, so it can gate CI.
+
+Usage: python3 benchmarks/import_time.py [--targets web_scraper,api] [--runs 5] [--output startup.json]
+"""
+
+import os
+import re
+import sys
+import json
+import argparse
+import platform
+import subprocess
+from statistics import median
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(BENCH_DIR)
+
+# Heavy modules the entry points load lazily, when a job or export needs them
+LAZY_MODULES = ['pandas', 'numpy', 'googlemaps', 'bs4', 'lxml', 'openpyxl']
+
+# Entry point -> (import statement, startup budget in ms, modules it must not load at import)
+TARGETS = {
+    'web_scraper': ('import web_scraper', 300, LAZY_MODULES + ['requests', 'lead_scraper', 'email_scraper']),
+    'api': ("import sys; sys.path.insert(0, 'api'); import scrape", 250, LAZY_MODULES),
+    'lead_scraper': ('import lead_scraper', 200, LAZY_MODULES),
+}
+
+LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$')
+
+
+def measure(statement: str):
+    """
+    Run one import in a fresh interpreter
+
+    Returns:
+        (milliseconds the entry point's import took, {module: self ms},
+         set of top-level packages that were imported)
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement], cwd=PROJECT_DIR,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"{statement!r} failed:\n{result.stderr[-2000:]}")
+
+    own = {}
+    packages = set()
+    total = 0
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, module = match.groups()
+        own[module] = int(self_us) / 1000
+        packages.add(module.split('.')[0])
+        # The last top-level import is the entry point; site and friends come before it
+        if indent == ' ':
+            total = int(cumulative_us) / 1000
+    return total, own, packages
+
+
+def profile_target(name: str, runs: int, top: int) -> dict:
+    """Median import time of an entry point over several cold interpreters"""
+    statement, budget_ms, deferred = TARGETS[name]
+    measure(statement)  # Warm-up: compiles .pyc files so later runs only time importing
+
+    samples = [measure(statement) for _ in range(runs)]
+    totals = [total for total, _, _ in samples]
+    # The breakdown comes from the run closest to the median
+    _, own, packages = min(samples, key=lambda sample: abs(sample[0] - median(totals)))
+    loaded = sorted(module for module in deferred if module in packages)
+    startup_ms = round(median(totals), 1)
+
+    return {
+        'startup_ms': startup_ms,
+        'min_ms': round(min(totals), 1),
+        'max_ms': round(max(totals), 1),
+        'budget_ms': budget_ms,
+        'within_budget': startup_ms <= budget_ms,
+        'eagerly_loaded': loaded,
+        'slowest_modules': [{'module': module, 'ms': round(ms, 1)}
+                            for module, ms in sorted(own.items(), key=lambda item: -item[1])[:top]],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the import (cold-start) time of each entry point")
+    parser.add_argument('--targets', default=','.join(TARGETS), help="Comma-separated entry points to measure")
+    parser.add_argument('--runs', type=int, default=5, help="Fresh interpreters per entry point")
+    parser.add_argument('--top', type=int, default=8, help="Slowest modules to list per entry point")
+    parser.add_argument('--budget-ms', type=float, help="Override every entry point's startup budget")
+    parser.add_argument('--output', help="Write results JSON here instead of stdout")
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.targets.split(',') if name.strip()]
+    unknown = [name for name in names if name not in TARGETS]
+    if unknown:
+        parser.error(f"Unknown targets: {', '.join(unknown)} (known: {', '.join(TARGETS)})")
+    if args.budget_ms:
+        for name in names:
+            statement, _, deferred = TARGETS[name]
+            TARGETS[name] = (statement, args.budget_ms, deferred)
+
+    results = {}
+    failed = False
+    for name in names:
+        result = profile_target(name, args.runs, args.top)
+        results[name] = result
+        ok = result['within_budget'] and not result['eagerly_loaded']
+        failed = failed or not ok
+        print(f"{'✅' if ok else '❌'} {name}: {result['startup_ms']}ms "
+              f"(budget {result['budget_ms']}ms)", file=sys.stderr)
+        if result['eagerly_loaded']:
+            print(f"   loaded at startup: {', '.join(result['eagerly_loaded'])}", file=sys.stderr)
+
+    report = {'python': platform.python_version(), 'runs': args.runs, 'targets': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Mock Places API - A local stand-in for the Google Maps endpoints we call
+Serves text search (with next_page_token pagination), place details and
+geocoding with deterministic fake businesses, plus optional latency and
+OVER_QUERY_LIMIT errors. Point LeadScraper or api/scrape.py at it with
+PLACES_API_BASE_URL=http://127.0.0.1:<port>.
+"""
+
+import json
+import time
+import random
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict
+from urllib.parse import urlparse, parse_qs
+
+PAGE_SIZE = 20
+BUSINESS_TYPES = [
+    ['restaurant', 'food', 'point_of_interest', 'establishment'],
+    ['cafe', 'food', 'point_of_interest', 'establishment'],
+    ['meal_takeaway', 'restaurant', 'food', 'point_of_interest', 'establishment'],
+    ['bar', 'point_of_interest', 'establishment'],
+]
+
+
+def _seed(*parts) -> int:
+    """Stable seed from strings, so every run serves the same businesses"""
+    return int(hashlib.md5('|'.join(map(str, parts)).encode('utf-8')).hexdigest()[:8], 16)
+
+
+class MockPlacesServer:
+    def __init__(self, places_per_query: int = 60, pool_size: int = 1000, latency: float = 0.0,
+                 quota_error_rate: float = 0.0, website_for: Callable[[int], str] = None, seed: int = 0):
+        """
+        Configure the mock API
+
+        Args:
+            places_per_query: Results a text search returns across all pages
+            pool_size: Distinct businesses queries draw from (so queries overlap)
+            latency: Seconds added to every response
+            quota_error_rate: Fraction of requests answered with OVER_QUERY_LIMIT
+            website_for: Callable(business number) -> website URL, or None
+                         for businesses without one
+            seed: Changes which businesses each query returns
+        """
+        self.places_per_query = places_per_query
+        self.pool_size = pool_size
+        self.latency = latency
+        self.quota_error_rate = quota_error_rate
+        self.website_for = website_for
+        self.seed = seed
+        self.calls = {}
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+        self._page_tokens = {}
+        self._server = None
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def start(self) -> 'MockPlacesServer':
+        """Serve on a free local port in a background thread"""
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server._handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name='mock-places', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Shut the server down"""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def total_calls(self) -> int:
+        """Requests served, counting quota errors once (they are also tallied under their endpoint)"""
+        with self._lock:
+            return sum(count for endpoint, count in self.calls.items() if endpoint != 'over_query_limit')
+
+    # Fake data
+
+    def business(self, number: int) -> Dict:
+        """Details of business number n, the same on every run"""
+        rng = random.Random(_seed(self.seed, 'business', number))
+        street = rng.choice(['High Street', 'Church Road', 'Station Road', 'Market Street', 'Mill Lane'])
+        details = {
+            'name': f"{rng.choice(['The', 'Ye Olde', 'Little', 'Big', 'Royal'])} "
+                    f"{rng.choice(['Oak', 'Crown', 'Bean', 'Fork', 'Lantern', 'Anchor'])} {number}",
+            'formatted_address': f"{rng.randint(1, 300)} {street}, London E{rng.randint(1, 20)} "
+                                 f"{rng.randint(1, 9)}{rng.choice('ABDEFGHJ')}{rng.choice('LNPQRSTU')}, UK",
+            'formatted_phone_number': f"020 {rng.randint(7000, 8999)} {rng.randint(1000, 9999)}",
+            'rating': round(rng.uniform(3.0, 5.0), 1),
+            'user_ratings_total': rng.randint(0, 2500),
+            'price_level': rng.randint(1, 3),
+            'business_status': 'OPERATIONAL' if rng.random() > 0.03 else 'CLOSED_PERMANENTLY',
+            'types': rng.choice(BUSINESS_TYPES),
+            'opening_hours': {'open_now': rng.random() > 0.3},
+        }
+        website = self.website_for(number) if self.website_for else None
+        if website:
+            details['website'] = website
+        return details
+
+    def search_results(self, query: str) -> list:
+        """Business numbers a text search returns, in result order"""
+        rng = random.Random(_seed(self.seed, 'query', query.lower()))
+        return rng.sample(range(self.pool_size), min(self.places_per_query, self.pool_size))
+
+    # Request handling
+
+    def _count(self, endpoint: str):
+        with self._lock:
+            self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+
+    def _send(self, handler, payload: Dict, status: int = 200):
+        body = json.dumps(payload).encode('utf-8')
+        handler.send_response(status)
+        handler.send_header('Content-Type', 'application/json; charset=UTF-8')
+        handler.send_header('Content-Length', str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def _handle(self, handler):
+        parsed = urlparse(handler.path)
+        params = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+        path = parsed.path.rstrip('/')
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        if path in ('/maps/api/place/textsearch/json', '/maps/api/place/text/search/json'):
+            endpoint = 'textsearch'
+        elif path == '/maps/api/place/details/json':
+            endpoint = 'details'
+        elif path == '/maps/api/geocode/json':
+            endpoint = 'geocode'
+        else:
+            self._send(handler, {'status': 'NOT_FOUND'}, 404)
+            return
+        self._count(endpoint)
+
+        if not params.get('key'):
+            self._send(handler, {'status': 'REQUEST_DENIED', 'error_message': 'API key missing'})
+            return
+        with self._lock:
+            over_quota = self._random.random() < self.quota_error_rate
+        if over_quota:
+            self._count('over_query_limit')
+            self._send(handler, {'status': 'OVER_QUERY_LIMIT', 'error_message': 'Mock quota exceeded'})
+            return
+
+        self._send(handler, getattr(self, f"_{endpoint}")(params))
+
+    def _textsearch(self, params: Dict) -> Dict:
+        token = params.get('pagetoken')
+        if token:
+            with self._lock:
+                query, offset = self._page_tokens.get(token, (None, 0))
+            if query is None:
+                return {'status': 'INVALID_REQUEST', 'results': []}
+        else:
+            query, offset = params.get('query', ''), 0
+
+        numbers = self.search_results(query)
+        page = numbers[offset:offset + PAGE_SIZE]
+        results = []
+        for number in page:
+            details = self.business(number)
+            results.append({
+                'place_id': f"mock_place_{number}",
+                'name': details['name'],
+                'formatted_address': details['formatted_address'],
+                'rating': details['rating'],
+                'types': details['types'],
+                'business_status': details['business_status']
+            })
+
+        payload = {'status': 'OK' if results else 'ZERO_RESULTS', 'results': results}
+        if offset + PAGE_SIZE < len(numbers):
+            next_token = hashlib.md5(f"{query}|{offset + PAGE_SIZE}".encode('utf-8')).hexdigest()
+            with self._lock:
+                self._page_tokens[next_token] = (query, offset + PAGE_SIZE)
+            payload['next_page_token'] = next_token
+        return payload
+
+    def _details(self, params: Dict) -> Dict:
+        # The googlemaps client sends "placeid", plain HTTP callers "place_id"
+        place_id = params.get('place_id') or params.get('placeid', '')
+        if not place_id.startswith('mock_place_'):
+            return {'status': 'NOT_FOUND'}
+        details = self.business(int(place_id[len('mock_place_'):]))
+        details['place_id'] = place_id
+
+        # Only return what was asked for, like the real API ("type" maps to "types")
+        fields = [field for field in params.get('fields', '').split(',') if field]
+        if fields:
+            wanted = {'types' if field == 'type' else field for field in fields} | {'place_id'}
+            details = {key: value for key, value in details.items() if key in wanted}
+        if 'types' in details:
+            # The googlemaps client asks for "type"; api/scrape.py reads result['type']
+            details['type'] = details['types']
+        return {'status': 'OK', 'result': details}
+
+    def _geocode(self, params: Dict) -> Dict:
+        address = params.get('address', '')
+        rng = random.Random(_seed(self.seed, 'geocode', address.lower()))
+        lat, lng = 51.5 + rng.uniform(-0.05, 0.05), -0.12 + rng.uniform(-0.05, 0.05)
+        return {'status': 'OK', 'results': [{
+            'formatted_address': address,
+            'geometry': {
+                'location': {'lat': lat, 'lng': lng},
+                'viewport': {
+                    'northeast': {'lat': lat + 0.05, 'lng': lng + 0.08},
+                    'southwest': {'lat': lat - 0.05, 'lng': lng - 0.08}
+                }
+            }
+        }]}
+
+
+def main():
+    """Run the mock API on its own (e.g. for the web app or api/scrape.py)"""
+    import argparse
+    parser = argparse.ArgumentParser(description="Local stand-in for the Places API")
+    parser.add_argument('--places', type=int, default=60, help="Results per text search")
+    parser.add_argument('--latency-ms', type=float, default=0, help="Added response latency")
+    parser.add_argument('--quota-error-rate', type=float, default=0, help="Fraction of OVER_QUERY_LIMIT replies")
+    args = parser.parse_args()
+
+    server = MockPlacesServer(args.places, latency=args.latency_ms / 1000,
+                              quota_error_rate=args.quota_error_rate).start()
+    print(f"🧪 Mock Places API on {server.base_url}")
+    print(f"   export PLACES_API_BASE_URL={server.base_url}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Mock Websites - Local stand-ins for the business websites we crawl
+One HTTP server answers for every site. Each business gets its own
+loopback address (127.0.a.b, all routed to lo on Linux), so per-host
+logic such as the circuit breaker and the HTTP cache sees one host per
+site. Sites mix the layouts we meet in practice: email on a contact page,
+a mailto on the homepage, JSON-LD markup, no email at all, and broken
+servers.
+"""
+
+import json
+import time
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+# Share of sites per layout (the rest have no email anywhere)
+SITE_MIX = [
+    ('contact_page', 0.60),
+    ('mailto', 0.15),
+    ('json_ld', 0.10),
+    ('broken', 0.05),
+]
+PAGE_PADDING = 30 * 1024  # Real homepages are mostly markup we have to parse past
+MAX_SITES = 250 * 254
+
+
+def site_layout(number: int, seed: int = 0) -> str:
+    """Layout of site number n, the same on every run"""
+    roll = random.Random(f"{seed}|site|{number}").random()
+    for layout, share in SITE_MIX:
+        if roll < share:
+            return layout
+        roll -= share
+    return 'no_email'
+
+
+def _address(number: int) -> str:
+    """Loopback address for site number n (127.0.0.1 is left for the APIs)"""
+    number = number % MAX_SITES
+    return f"127.0.{1 + number // 254}.{1 + number % 254}"
+
+
+def _number(host: str) -> Optional[int]:
+    """Site number from the address a request was sent to"""
+    try:
+        _, _, high, low = host.split(':')[0].split('.')
+        return (int(high) - 1) * 254 + int(low) - 1
+    except ValueError:
+        return None
+
+
+def _padding(number: int) -> str:
+    """Filler markup so pages weigh about as much as a real homepage"""
+    item = f'<div class="menu-item"><h3>Dish {number}</h3><p>Freshly made every day with local produce.</p></div>\n'
+    return item * (PAGE_PADDING // len(item))
+
+
+class MockWebsiteFarm:
+    def __init__(self, latency: float = 0.0, seed: int = 0):
+        """
+        Configure the farm
+
+        Args:
+            latency: Seconds added to every response
+            seed: Changes which layout each site gets
+        """
+        self.latency = latency
+        self.seed = seed
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def url_for(self, number: int) -> str:
+        """Homepage URL of site number n"""
+        return f"http://{_address(number)}:{self.port}/"
+
+    def email_for(self, number: int) -> str:
+        return f"hello@site{number}.example.co.uk"
+
+    def start(self) -> 'MockWebsiteFarm':
+        """Serve on every loopback address in a background thread"""
+        farm = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                farm._handle(self)
+
+            def do_HEAD(self):
+                farm._handle(self, head=True)
+
+            def log_message(self, *args):
+                pass
+
+        # Bound to all interfaces so 127.0.a.b all reach this server
+        self._server = ThreadingHTTPServer(('', 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name='mock-websites', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Shut the server down"""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def _send(self, handler, body: str, status: int = 200, head: bool = False):
+        data = body.encode('utf-8')
+        handler.send_response(status)
+        handler.send_header('Content-Type', 'text/html; charset=utf-8')
+        handler.send_header('Content-Length', str(len(data)))
+        handler.end_headers()
+        if not head:
+            handler.wfile.write(data)
+
+    def _handle(self, handler, head: bool = False):
+        with self._lock:
+            self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        number = _number(handler.headers.get('Host') or '')
+        if number is None:
+            self._send(handler, 'Unknown site', 404, head)
+            return
+
+        layout = site_layout(number, self.seed)
+        path = handler.path.split('?')[0].rstrip('/') or '/'
+        if layout == 'broken':
+            self._send(handler, 'Internal Server Error', 500, head)
+        elif path == '/':
+            self._send(handler, self._homepage(number, layout), head=head)
+        elif path == '/contact' and layout == 'contact_page':
+            self._send(handler, self._page(number, 'Contact us',
+                                           f"<p>Drop us a line at {self.email_for(number)}</p>"), head=head)
+        elif path in ('/about', '/contact'):
+            self._send(handler, self._page(number, 'About us', '<p>A family business since 1987.</p>'), head=head)
+        else:
+            self._send(handler, self._page(number, 'Not found', ''), 404, head)
+
+    def _page(self, number: int, title: str, content: str, head_extra: str = '') -> str:
+        return (f"<!DOCTYPE html><html><head><title>{title} - Site {number}</title>{head_extra}</head>"
+                f"<body><nav><a href=\"/\">Home</a> <a href=\"/about\">About</a> "
+                f"<a href=\"/contact\">Contact</a></nav><main>{content}</main>"
+                f"<section class=\"menu\">{_padding(number)}</section></body></html>")
+
+    def _homepage(self, number: int, layout: str) -> str:
+        if layout == 'mailto':
+            return self._page(number, 'Welcome',
+                              f"<p>Bookings: <a href=\"mailto:{self.email_for(number)}\">email us</a></p>")
+        if layout == 'json_ld':
+            markup = json.dumps({'@context': 'https://schema.org', '@type': 'Restaurant',
+                                 'name': f"Site {number}", 'email': self.email_for(number)})
+            return self._page(number, 'Welcome', '<p>Welcome!</p>',
+                              f"<script type=\"application/ld+json\">{markup}</script>")
+        return self._page(number, 'Welcome', '<p>Welcome! Find our details on the contact page.</p>')
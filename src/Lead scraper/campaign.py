@@ -0,0 +1,476 @@
+#!/usr/bin/env python3
+"""
+Campaign Runner - Scrape a whole locations × queries matrix in one go
+Every (location, query) cell runs as its own lead store job through the
+streaming pipeline, several cells at a time. A place found by one cell is
+not fetched again by the others, and the combined leads are deduped once
+more (dedupe.py) into one consolidated CSV, next to a per-cell stats CSV.
+
+Progress is saved after every cell, so an interrupted campaign picks up
+where it stopped. --shard i/n runs every n-th cell, to split a campaign
+across processes or machines sharing the lead database; a later run without
+--shard resumes all the shards' cells and writes the consolidated output.
+
+A matrix is a YAML file:
+
+    name: london_property
+    locations: ["Hackney, London, UK", "Camden, London, UK"]
+    queries: [estate agents, letting agents]
+    max_results: 20      # optional, per cell
+    emails: true         # optional, check websites for emails
+    radius: 5000         # optional, metres
+
+or a CSV file with a "location" and a "query" column, whose values are
+crossed (blank cells are ignored, so the columns can differ in length).
+
+With --enqueue the cells go on the shared task queue instead (task_queue.py)
+and any number of `python3 worker.py` processes, on this machine or others
+sharing the data directory, scrape them; the campaign waits for the queue to
+empty and writes the consolidated output as usual.
+
+Usage: python3 campaign.py campaigns/london.yaml [--workers 3] [--shard 1/4] [--fresh]
+       python3 campaign.py campaigns/london.yaml --enqueue [--no-wait]
+"""
+
+import os
+import csv
+import sys
+import json
+import glob
+import time
+import argparse
+import threading
+import pandas as pd
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config import CAMPAIGN_WORKERS, MAX_RESULTS_PER_QUERY, OUTPUT_DIRECTORY, SEARCH_RADIUS
+from task_queue import Broker, get_broker
+from email_scraper import EmailLeadScraper
+from lead_record import LEAD_FIELDS
+from lead_store import get_lead_store, StoreLeadSink
+from pipeline import LeadPipeline
+from job_control import JobControl
+from dedupe import dedupe_leads
+from metrics import get_metrics
+from run_log import get_log
+from profiling import profile_run
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+CELL_FIELDS = [
+    'location', 'query', 'status', 'job_id', 'places', 'duplicates', 'leads',
+    'with_emails', 'api_requests', 'seconds', 'error'
+]
+
+# Seconds between queue checks while workers scrape an enqueued campaign
+QUEUE_POLL_INTERVAL = 2
+
+
+def load_matrix(path: str) -> Dict:
+    """
+    Read a campaign matrix from a YAML or CSV file
+
+    Args:
+        path: .yaml/.yml or .csv file
+
+    Returns:
+        Dictionary with name, locations, queries, max_results, emails and radius
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.yaml', '.yml'):
+        if yaml is None:
+            raise ValueError("PyYAML is needed for YAML campaigns (pip install pyyaml); use a CSV matrix instead")
+        with open(path, 'r', encoding='utf-8') as f:
+            spec = yaml.safe_load(f) or {}
+    elif extension == '.csv':
+        with open(path, 'r', newline='', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+        spec = {
+            'locations': [row.get('location') for row in rows],
+            'queries': [row.get('query') for row in rows]
+        }
+    else:
+        raise ValueError(f"Campaign matrix must be a .yaml or .csv file: {path}")
+
+    def distinct(values) -> List[str]:
+        seen = []
+        for value in values or []:
+            value = str(value or '').strip()
+            if value and value not in seen:
+                seen.append(value)
+        return seen
+
+    matrix = {
+        'name': str(spec.get('name') or os.path.splitext(os.path.basename(path))[0]),
+        'locations': distinct(spec.get('locations')),
+        'queries': distinct(spec.get('queries')),
+        'max_results': int(spec.get('max_results') or MAX_RESULTS_PER_QUERY),
+        'emails': bool(spec.get('emails', True)),
+        'radius': int(spec.get('radius') or SEARCH_RADIUS)
+    }
+    if not matrix['locations'] or not matrix['queries']:
+        raise ValueError(f"Campaign matrix needs at least one location and one query: {path}")
+    return matrix
+
+
+def parse_shard(value: Optional[str]) -> Optional[Tuple[int, int]]:
+    """"2/4" -> (2, 4), the second of four shards"""
+    if not value:
+        return None
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise ValueError(f"Shard must look like 2/4, not {value}")
+    if not 1 <= index <= count:
+        raise ValueError(f"Shard {index} is outside 1..{count}")
+    return index, count
+
+
+def cell_key(location: str, query: str) -> str:
+    return f"{location} | {query}"
+
+
+class Campaign:
+    def __init__(self, matrix: Dict, workers: int = None, shard: Tuple[int, int] = None, fresh: bool = False,
+                 claim: Callable = None, release: Callable = None):
+        """
+        Prepare a campaign
+
+        Args:
+            matrix: Campaign matrix (see load_matrix)
+            workers: Cells scraped at the same time (default: CAMPAIGN_WORKERS)
+            shard: (i, n) to run only every n-th cell, starting with the i-th
+            fresh: Ignore progress saved by earlier runs
+            claim: Callable(place) -> bool deciding whether this campaign
+                   still needs a place (default: in-process, first cell wins)
+            release: Callable(place) giving back a claimed place whose
+                     details couldn't be fetched, so another cell can try it
+        """
+        self.matrix = matrix
+        self.name = matrix['name']
+        self.workers = workers or CAMPAIGN_WORKERS
+        self.shard = shard
+        self.cells = [(location, query) for location in matrix['locations'] for query in matrix['queries']]
+        if shard:
+            self.cells = self.cells[shard[0] - 1::shard[1]]
+            self.label = f"{self.name}_shard{shard[0]}of{shard[1]}"
+        else:
+            self.label = self.name
+
+        self.state_dir = os.path.join(OUTPUT_DIRECTORY, 'campaigns')
+        self.state_path = os.path.join(self.state_dir, f"{self.label}.json")
+        self.state = {} if fresh else self._load_state()
+        self.control = JobControl()
+        self.resolver = None
+        self.claim = claim or self._claim
+        self.release = release or self._release
+        self._seen = set()
+        self._lock = threading.Lock()
+
+    # Saved progress
+
+    def _load_state(self) -> Dict:
+        """Cell stats saved by earlier runs (an unsharded run also picks up every shard's)"""
+        paths = [self.state_path]
+        if not self.shard:
+            paths += sorted(glob.glob(os.path.join(self.state_dir, f"{self.name}_shard*of*.json")))
+        state = {}
+        for path in paths:
+            try:
+                with open(path, 'r') as f:
+                    state.update(json.load(f))
+            except (FileNotFoundError, ValueError):
+                continue
+        return state
+
+    def _save_state(self):
+        """Write cell stats to disk atomically"""
+        os.makedirs(self.state_dir, exist_ok=True)
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    # Scraping
+
+    def _claim(self, place: Dict) -> bool:
+        """True the first time any cell meets a place"""
+        with self._lock:
+            if place['place_id'] in self._seen:
+                return False
+            self._seen.add(place['place_id'])
+            return True
+
+    def _release(self, place: Dict):
+        """Forget a place so the next cell that meets it tries again"""
+        with self._lock:
+            self._seen.discard(place['place_id'])
+
+    def run_cell(self, location: str, query: str) -> Tuple[List[Dict], Dict]:
+        """
+        Scrape one cell as its own lead store job
+
+        Returns:
+            (leads, cell stats)
+        """
+        store = get_lead_store()
+        scraper = EmailLeadScraper()
+        # One geocode cache for the whole campaign
+        self.resolver = self.resolver or scraper.location_resolver
+        scraper.location_resolver = self.resolver
+        name = os.path.splitext(scraper.output_filename('csv', [query, location], prefix=self.name))[0]
+        scraper.job_id = store.start_job('campaign', [query], location, name=name)
+
+        stats = {'location': location, 'query': query, 'job_id': scraper.job_id,
+                 'places': 0, 'duplicates': 0}
+
+        def on_search(query, places):
+            stats['places'] += len(places)
+
+        def place_filter(place):
+            if self.claim(place):
+                return True
+            stats['duplicates'] += 1
+            return False
+
+        def enrich(lead, deadline):
+            # Website only, as in the web app; a failure leaves the lead without emails
+            lead['emails'] = ''
+            if lead.get('website'):
+                emails = scraper.scrape_website_for_emails(lead['website'], deadline=deadline)
+                lead['emails'] = ', '.join(emails) if emails else ''
+            return lead
+
+        sink = StoreLeadSink(store, scraper.job_id)
+        pipeline = LeadPipeline(
+            scraper,
+            enricher=enrich if self.matrix['emails'] else None,
+            sink=sink,
+            on_search=on_search,
+            place_filter=place_filter,
+            place_release=self.release,
+            control=self.control
+        )
+
+        started = time.time()
+        try:
+            leads = pipeline.run([query], location, self.matrix['max_results'], self.matrix['radius'])
+        finally:
+            sink.close()
+            stats['status'] = 'cancelled' if self.control.cancelled else 'completed'
+            store.finish_job(scraper.job_id, stats['status'])
+
+        stats.update({
+            'leads': len(leads),
+            'with_emails': sum(1 for lead in leads if lead.get('emails')),
+            'api_requests': get_metrics().summary(scraper.job_id)['places_api_requests_total'],
+            'seconds': round(time.time() - started, 1)
+        })
+        return leads, stats
+
+    def run(self) -> Optional[str]:
+        """
+        Scrape every cell not finished yet, then write the consolidated output
+
+        Returns:
+            Path of the consolidated CSV, or None if no leads were found
+        """
+        log = get_log()
+        self.resolver = self.resolver or EmailLeadScraper().location_resolver
+        leads_by_cell, todo = self._resume()
+
+        print(f"🚀 Campaign {self.label}: {len(self.cells)} cells "
+              f"({len(self.matrix['locations'])} locations × {len(self.matrix['queries'])} queries"
+              f"{', this shard' if self.shard else ''})")
+        if len(todo) < len(self.cells):
+            print(f"♻️  Resuming: {len(self.cells) - len(todo)} cells already done")
+        print(f"⚙️  {len(todo)} cells to scrape, {self.workers} at a time")
+
+        progress = log.progress('cells', total=len(todo), every=1)
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='cell') as pool:
+            futures = {pool.submit(self.run_cell, location, query): (location, query) for location, query in todo}
+            try:
+                for future in as_completed(futures):
+                    location, query = futures[future]
+                    key = cell_key(location, query)
+                    try:
+                        leads, stats = future.result()
+                    except Exception as e:
+                        leads, stats = [], {'location': location, 'query': query, 'status': 'failed', 'error': str(e)}
+                        log.error('cell_failed', "❌ {cell} failed: {error}", cell=key, error=str(e))
+                    leads_by_cell[key] = leads
+                    self.state[key] = stats
+                    self._save_state()
+                    log.debug('cell_done', "✅ {cell}: {leads} leads, {duplicates} already found elsewhere",
+                              cell=key, leads=stats.get('leads', 0), duplicates=stats.get('duplicates', 0))
+                    progress.update(leads=stats.get('leads', 0), duplicates=stats.get('duplicates', 0))
+            except KeyboardInterrupt:
+                # Running cells wind down; finished ones are saved and skipped next time
+                self.control.cancel('Interrupted by user')
+                print(f"\n❌ Campaign interrupted; run it again to resume.")
+                raise
+        progress.close()
+
+        return self.consolidate(leads_by_cell)
+
+    def _resume(self) -> Tuple[Dict[str, List[Dict]], List[Tuple[str, str]]]:
+        """Leads of cells finished by earlier runs (from the lead store), and the cells still to do"""
+        store = get_lead_store()
+        leads_by_cell = {}
+        todo = []
+        for location, query in self.cells:
+            stats = self.state.get(cell_key(location, query))
+            if stats and stats.get('status') == 'completed':
+                leads = store.leads(job_id=stats['job_id'])
+                leads_by_cell[cell_key(location, query)] = leads
+                self._seen.update(lead['place_id'] for lead in leads if lead.get('place_id'))
+            else:
+                todo.append((location, query))
+        return leads_by_cell, todo
+
+    # Distributed runs (worker.py)
+
+    @property
+    def queue(self) -> str:
+        return f"campaign:{self.label}"
+
+    def enqueue(self, broker: Broker, wait: bool = True) -> Optional[str]:
+        """
+        Put every unfinished cell on the task queue for worker.py processes
+
+        Args:
+            broker: Task queue shared with the workers
+            wait: Wait for the workers to finish, then write the consolidated output
+
+        Returns:
+            Path of the consolidated CSV when waiting, else None
+        """
+        _, todo = self._resume()
+        for location, query in todo:
+            broker.enqueue('scrape_cell', {'matrix': self.matrix, 'location': location, 'query': query},
+                           queue=self.queue, key=cell_key(location, query))
+        print(f"📤 Queued {len(todo)} cells on {self.queue} ({len(self.cells) - len(todo)} already done)")
+        print(f"👷 Start workers with: python3 worker.py --queue {self.queue}")
+        if not wait:
+            return None
+        return self.collect(broker)
+
+    def collect(self, broker: Broker) -> Optional[str]:
+        """Wait until the campaign's queue is empty, record the cells' results and consolidate"""
+        log = get_log()
+        counts = broker.stats(self.queue)
+        # Progress counts the tasks still open when we started waiting
+        started_finished = finished = counts['done'] + counts['failed']
+        progress = log.progress('tasks', total=sum(counts.values()) - started_finished, every=1)
+        try:
+            while counts['queued'] or counts['leased']:
+                time.sleep(QUEUE_POLL_INTERVAL)
+                counts = broker.stats(self.queue)
+                # Scrape tasks add enrichment tasks as they go, so the total grows
+                progress.total = sum(counts.values()) - started_finished
+                now_finished = counts['done'] + counts['failed']
+                if now_finished > finished:
+                    progress.update(now_finished - finished)
+                    finished = now_finished
+        except KeyboardInterrupt:
+            print(f"\n⏸️  Stopped waiting; the workers carry on. Run with --enqueue again to collect.")
+            raise
+        progress.close()
+
+        for result in broker.results(self.queue, 'scrape_cell').values():
+            location, query = result['payload']['location'], result['payload']['query']
+            if result['status'] == 'done':
+                self.state[cell_key(location, query)] = result['result']
+            else:
+                self.state[cell_key(location, query)] = {'location': location, 'query': query,
+                                                         'status': 'failed', 'error': result['error']}
+        self._save_state()
+
+        leads_by_cell, _ = self._resume()
+        for key, leads in leads_by_cell.items():
+            # Emails were added by enrichment tasks after the cell finished
+            self.state[key]['with_emails'] = sum(1 for lead in leads if lead.get('emails'))
+        self._save_state()
+        return self.consolidate(leads_by_cell)
+
+    def consolidate(self, leads_by_cell: Dict[str, List[Dict]]) -> Optional[str]:
+        """Dedupe every cell's leads into one CSV and write the per-cell stats next to it"""
+        all_leads = []
+        for location, query in self.cells:
+            for lead in leads_by_cell.get(cell_key(location, query), []):
+                all_leads.append(dict(lead, location_used=location))
+        if not all_leads:
+            print("❌ No leads found.")
+            return None
+
+        merged, _ = dedupe_leads(all_leads)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_file = os.path.join(OUTPUT_DIRECTORY, f"campaign_{self.label}_{timestamp}.csv")
+        cells_file = os.path.join(OUTPUT_DIRECTORY, f"campaign_{self.label}_{timestamp}_cells.csv")
+
+        fields = LEAD_FIELDS + (['emails'] if self.matrix['emails'] else []) + ['location_used', 'cluster_id', 'cluster_size']
+        pd.DataFrame(merged).reindex(columns=fields).to_csv(output_file, index=False)
+        rows = [dict({'location': location, 'query': query},
+                     **self.state.get(cell_key(location, query), {'status': 'pending'}))
+                for location, query in self.cells]
+        pd.DataFrame(rows).reindex(columns=CELL_FIELDS).to_csv(cells_file, index=False)
+        get_lead_store().record_export(output_file, lead_count=len(merged))
+
+        statuses = [row.get('status') for row in rows]
+        print(f"\n🎉 Campaign {self.label} done: {statuses.count('completed')}/{len(rows)} cells completed")
+        print(f"📊 {len(all_leads)} leads → {len(merged)} unique after deduping across cells")
+        if self.matrix['emails']:
+            with_emails = sum(1 for lead in merged if lead.get('emails'))
+            print(f"📧 Leads with emails: {with_emails}/{len(merged)}")
+        print(f"💾 Leads: {output_file}")
+        print(f"💾 Per-cell stats: {cells_file}")
+        get_metrics().save_run_summary(output_file)
+        return output_file
+
+
+def main():
+    """Main function with command line arguments"""
+    parser = argparse.ArgumentParser(description="Scrape a locations × queries matrix into one deduped lead file")
+    parser.add_argument('matrix', help="Campaign matrix (.yaml or .csv)")
+    parser.add_argument('--workers', type=int, help=f"Cells scraped at the same time (default: {CAMPAIGN_WORKERS})")
+    parser.add_argument('--shard', help="Only run shard i of n, e.g. 2/4")
+    parser.add_argument('--max-results', type=int, help="Results per cell (overrides the matrix)")
+    parser.add_argument('--no-emails', action='store_true', help="Don't check websites for emails")
+    parser.add_argument('--fresh', action='store_true', help="Start over instead of resuming saved progress")
+    parser.add_argument('--enqueue', action='store_true', help="Queue the cells for worker.py processes")
+    parser.add_argument('--no-wait', action='store_true', help="With --enqueue, return once the cells are queued")
+    parser.add_argument('--broker', help="Task queue URL for --enqueue (default: TASK_QUEUE_URL)")
+    parser.add_argument('--profile', action='store_true',
+                        help="Sample the run and save a flame graph (.collapsed) next to the output")
+    args = parser.parse_args()
+
+    try:
+        matrix = load_matrix(args.matrix)
+        if args.max_results:
+            matrix['max_results'] = args.max_results
+        if args.no_emails:
+            matrix['emails'] = False
+        if args.enqueue and args.fresh:
+            raise ValueError("--fresh can't be used with --enqueue (queued cells are never scraped twice)")
+        campaign = Campaign(matrix, args.workers, parse_shard(args.shard), args.fresh)
+        with profile_run(args.profile):
+            if args.enqueue:
+                campaign.enqueue(get_broker(args.broker), wait=not args.no_wait)
+            else:
+                campaign.run()
+    except KeyboardInterrupt:
+        return 130
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
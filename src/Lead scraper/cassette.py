@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Cassette - Record and replay HTTP traffic for offline regression runs
+A requests transport adapter that either records every response (status,
+headers, body and how long it took) to a gzip-compressed JSON-lines
+cassette, or serves a recorded cassette back without touching the network,
+at the recorded speed or faster. API keys are stripped from recorded URLs.
+
+Driven by environment variables so any entry point can use it:
+    LEADSCRAPER_CASSETTE=data/london.jsonl.gz
+    LEADSCRAPER_CASSETTE_MODE=record|replay    (default: replay)
+    LEADSCRAPER_REPLAY_SPEED=1                 (2 = twice as fast, 0 = no delays)
+
+Record from a fresh working directory: requests answered by the geocode or
+HTTP caches never reach the cassette, so a warm cache makes a short recording.
+"""
+
+import os
+import gzip
+import atexit
+import json
+import time
+import base64
+import threading
+from collections import defaultdict
+from typing import Dict, Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+MODES = ('record', 'replay')
+
+# Query parameters that must never be written to a cassette
+SECRET_PARAMS = {'key', 'client', 'signature'}
+
+# Headers describing the wire encoding of a body we store decoded
+WIRE_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding'}
+
+
+class CassetteMiss(requests.RequestException):
+    """
+    Replay was asked for a request the cassette has no recording of
+
+    Deliberately not a ConnectionError: a miss says nothing about the host,
+    so fetchers must not count it against the host's circuit breaker.
+    """
+
+
+def request_key(method: str, url: str) -> str:
+    """
+    Identity of a request in a cassette: method plus URL with sorted,
+    secret-free query parameters
+
+    Args:
+        method: HTTP method
+        url: Full request URL
+
+    Returns:
+        String such as "GET https://maps.googleapis.com/...?placeid=abc"
+    """
+    parts = urlsplit(url)
+    query = sorted((name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+                   if name not in SECRET_PARAMS)
+    return f"{method.upper()} {urlunsplit(parts._replace(query=urlencode(query), fragment=''))}"
+
+
+class CassetteAdapter(HTTPAdapter):
+    def __init__(self, path: str, mode: str = 'replay', speed: float = 1.0):
+        """
+        Open a cassette
+
+        Args:
+            path: Cassette file (gzip-compressed JSON lines)
+            mode: 'record' (real requests, saved as they complete) or
+                  'replay' (recorded responses only)
+            speed: Replay speed multiplier; 0 serves responses without delay
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        super().__init__()
+        self.path = path
+        self.mode = mode
+        self.speed = speed
+        self._lock = threading.Lock()
+        self._recordings = defaultdict(list)
+        self._positions = defaultdict(int)
+        self._file = None
+        self.misses = 0
+
+        if mode == 'record':
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = gzip.open(path, 'wt', encoding='utf-8')
+            print(f"📼 Recording HTTP traffic to: {path}")
+        else:
+            self._load()
+            print(f"📼 Replaying {sum(map(len, self._recordings.values()))} responses from: {path}")
+
+    def _load(self):
+        with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._recordings[entry['key']].append(entry)
+
+    def send(self, request, **kwargs):
+        if self.mode == 'replay':
+            return self._replay(request)
+
+        started = time.time()
+        try:
+            response = super().send(request, **kwargs)
+            content = response.content  # Read the whole body now so its time is recorded too
+        except requests.RequestException as e:
+            # Failures are part of the campaign too (dead sites, lost URL races)
+            self._write({
+                'key': request_key(request.method, request.url),
+                'error': type(e).__name__,
+                'message': str(e),
+                'elapsed': round(time.time() - started, 4)
+            })
+            raise
+        self._record(request, response, content, time.time() - started)
+        return response
+
+    def _record(self, request, response, content: bytes, elapsed: float):
+        entry = {
+            'key': request_key(request.method, request.url),
+            'status': response.status_code,
+            'reason': response.reason,
+            'url': request_key('GET', response.url or request.url).split(' ', 1)[1],
+            'headers': {name: value for name, value in response.headers.items()
+                        if name.lower() not in WIRE_HEADERS},
+            'elapsed': round(elapsed, 4)
+        }
+        try:
+            entry['body'] = content.decode('utf-8')
+        except UnicodeDecodeError:
+            entry['body_b64'] = base64.b64encode(content).decode('ascii')
+        self._write(entry)
+
+    def _write(self, entry: Dict):
+        line = json.dumps(entry, ensure_ascii=False) + '\n'
+        with self._lock:
+            if self._file:
+                self._file.write(line)
+
+    def _replay(self, request) -> requests.Response:
+        key = request_key(request.method, request.url)
+        with self._lock:
+            recordings = self._recordings.get(key)
+            if not recordings:
+                self.misses += 1
+                raise CassetteMiss(f"No recording for {key}", request=request)
+            # Repeated requests get the recorded responses in order, then the last one again
+            position = self._positions[key]
+            self._positions[key] = position + 1
+            entry = recordings[min(position, len(recordings) - 1)]
+
+        if self.speed > 0:
+            time.sleep(entry['elapsed'] / self.speed)
+
+        if 'error' in entry:
+            error = getattr(requests.exceptions, entry['error'], None)
+            if not (isinstance(error, type) and issubclass(error, requests.RequestException)):
+                error = requests.ConnectionError
+            raise error(entry.get('message', ''), request=request)
+
+        response = requests.Response()
+        response.status_code = entry['status']
+        response.reason = entry.get('reason')
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response.url = entry.get('url') or request.url
+        response.request = request
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        if 'body_b64' in entry:
+            response._content = base64.b64decode(entry['body_b64'])
+        else:
+            response._content = entry['body'].encode('utf-8')
+        response._content_consumed = True
+        return response
+
+    def finish(self):
+        """Flush and close a recording (the adapter is shared, so Session.close() leaves it open)"""
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+
+# Process-wide cassette shared by every session
+_shared_cassette = None
+_shared_cassette_lock = threading.Lock()
+
+
+def get_cassette() -> Optional[CassetteAdapter]:
+    """Return the process-wide cassette, or None when LEADSCRAPER_CASSETTE is not set"""
+    global _shared_cassette
+    # Read when first needed rather than at import, so values from .env count
+    path = os.getenv('LEADSCRAPER_CASSETTE')
+    if not path:
+        return None
+    with _shared_cassette_lock:
+        if _shared_cassette is None:
+            _shared_cassette = CassetteAdapter(path, os.getenv('LEADSCRAPER_CASSETTE_MODE', 'replay'),
+                                               float(os.getenv('LEADSCRAPER_REPLAY_SPEED', '1')))
+            atexit.register(_shared_cassette.finish)
+        return _shared_cassette
+
+
+def replaying() -> bool:
+    """Whether a cassette is configured in replay mode (no real traffic at all)"""
+    return bool(os.getenv('LEADSCRAPER_CASSETTE')) and os.getenv('LEADSCRAPER_CASSETTE_MODE', 'replay') == 'replay'
+
+
+def install_cassette(session: requests.Session) -> requests.Session:
+    """
+    Route a session through the process-wide cassette, if one is configured
+
+    Args:
+        session: Session to mount the cassette on
+
+    Returns:
+        The same session
+    """
+    cassette = get_cassette()
+    if cassette:
+        session.mount('http://', cassette)
+        session.mount('https://', cassette)
+    return session
+
+
+def cassette_session() -> Optional[requests.Session]:
+    """A session going through the cassette, or None when none is configured"""
+    if not os.getenv('LEADSCRAPER_CASSETTE'):
+        return None
+    return install_cassette(requests.Session())
+
+
+def summarize(path: str) -> Dict:
+    """Request counts and recorded time per host in a cassette"""
+    hosts = defaultdict(lambda: {'requests': 0, 'errors': 0, 'seconds': 0.0, 'bytes': 0})
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                host = hosts[urlsplit(entry['key'].split(' ', 1)[1]).netloc]
+                host['requests'] += 1
+                host['errors'] += 'error' in entry
+                host['seconds'] += entry['elapsed']
+                host['bytes'] += len(entry.get('body') or entry.get('body_b64') or '')
+    return dict(hosts)
+
+
+def main():
+    """Print what a cassette contains"""
+    import argparse
+    parser = argparse.ArgumentParser(description="Inspect a recorded HTTP cassette")
+    parser.add_argument('cassette', help="Cassette file (.jsonl.gz)")
+    args = parser.parse_args()
+
+    hosts = summarize(args.cassette)
+    print(f"📼 {args.cassette}")
+    for host, stats in sorted(hosts.items(), key=lambda item: -item[1]['requests']):
+        print(f"   {host}: {stats['requests']} requests ({stats['errors']} failed), {stats['seconds']:.1f}s recorded, "
+              f"{stats['bytes'] / 1024:.0f} KB")
+    total = sum(stats['requests'] for stats in hosts.values())
+    print(f"   Total: {total} requests from {len(hosts)} hosts")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Host Circuit Breaker - Stop wasting timeouts on dead lead websites
+A host that fails is skipped for the rest of the job. Its failure count is
+written to a blocklist file, so failures add up across runs (each run may
+only see one before the circuit opens), and once a host reaches
+HOST_BLOCK_THRESHOLD later runs skip it too until the entry expires.
+Only failures with the full PAGE_TIMEOUT count: a request whose timeout was
+cut short by a lead's time budget says nothing about the host (see
+counts_as_failure).
+"""
+
+import os
+import json
+import time
+import threading
+from typing import Dict
+from urllib.parse import urlparse
+
+from config import (HOST_BLOCKLIST_FILE, CIRCUIT_FAILURE_THRESHOLD, HOST_BLOCK_THRESHOLD,
+                    CIRCUIT_RESET_TIMEOUT, HOST_BLOCK_TTL, PAGE_TIMEOUT)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class HostBlocked(Exception):
+    """Raised when a request is skipped because the host's circuit is open"""
+    pass
+
+
+def host_for(url: str) -> str:
+    """Host (and port, if any) a URL belongs to, ignoring case and a leading www."""
+    if '://' not in url:
+        url = 'https://' + url
+    host = urlparse(url).netloc.rsplit('@', 1)[-1].lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    return host
+
+
+def counts_as_failure(timeout: float) -> bool:
+    """
+    Whether a failed request says anything about the host
+
+    Args:
+        timeout: Timeout the request was made with
+
+    Returns:
+        False when the timeout was shortened by a deadline (the lead or job
+        ran out of time, not the host), True when it had the full PAGE_TIMEOUT
+    """
+    return timeout >= PAGE_TIMEOUT
+
+
+class HostCircuitBreaker:
+    def __init__(self, path: str = None, failure_threshold: int = None,
+                 reset_timeout: float = None, block_ttl: float = None,
+                 block_threshold: int = None, persist: bool = True):
+        """
+        Initialize the breaker
+
+        Args:
+            path: JSON blocklist shared between runs
+            failure_threshold: Failures that open a host's circuit for this run
+            reset_timeout: Seconds before an open host gets one trial request
+                           again within the same run
+            block_ttl: Seconds a failed host stays on the persisted blocklist
+            block_threshold: Failures before a host is written to the blocklist
+            persist: Read and write the blocklist at all (False keeps every
+                     failure in memory, e.g. while replaying a cassette)
+        """
+        self.path = path or HOST_BLOCKLIST_FILE
+        self.failure_threshold = failure_threshold or CIRCUIT_FAILURE_THRESHOLD
+        self.block_threshold = max(block_threshold or HOST_BLOCK_THRESHOLD, self.failure_threshold)
+        self.persist = persist
+        self.reset_timeout = CIRCUIT_RESET_TIMEOUT if reset_timeout is None else reset_timeout
+        self.block_ttl = HOST_BLOCK_TTL if block_ttl is None else block_ttl
+        self._lock = threading.Lock()
+        self._hosts = {}
+        self._blocklist = self._load_blocklist() if persist else {}
+
+        # Hosts blocked by earlier runs start open until their entry expires;
+        # ones that only failed before start closed with those failures counted
+        now = time.time()
+        for host, entry in self._blocklist.items():
+            blocked = entry.get('until', 0) > now
+            self._hosts[host] = {
+                'state': OPEN if blocked else CLOSED,
+                'failures': entry.get('failures', 1),
+                'retry_at': entry['until'] if blocked else 0,
+                'trial': False
+            }
+
+    def _load_blocklist(self) -> Dict:
+        """
+        Load unexpired entries from disk
+
+        An entry with "until" blocks its host until then; one with only
+        "expires" records failures that count toward block_threshold until then.
+        """
+        try:
+            with open(self.path, 'r') as f:
+                entries = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+        now = time.time()
+        return {host: entry for host, entry in entries.items()
+                if max(entry.get('until', 0), entry.get('expires', 0)) > now}
+
+    def _save_blocklist(self, host: str, entry: Dict = None):
+        """
+        Write one host's entry (None removes it) to the blocklist on disk
+
+        The file is re-read first, so entries other processes wrote since this
+        breaker loaded it are kept rather than overwritten.
+        """
+        if not self.persist:
+            return
+        entries = self._load_blocklist()
+        if entry is None:
+            entries.pop(host, None)
+        elif entry['failures'] >= entries.get(host, {}).get('failures', 0):
+            # Another process may have counted more failures meanwhile
+            entries[host] = entry
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # A temp file per process, so parallel writers don't clobber each other's
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(entries, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"⚠️  Could not write host blocklist: {str(e)}")
+
+    def state(self, url: str) -> str:
+        """Current circuit state for a URL's host"""
+        with self._lock:
+            entry = self._hosts.get(host_for(url))
+            return entry['state'] if entry else CLOSED
+
+    def allow(self, url: str) -> bool:
+        """
+        Check whether a request to this URL's host should go ahead
+
+        An open circuit turns half-open once its retry time passes and lets a
+        single trial request through; everything else is skipped.
+        """
+        host = host_for(url)
+        with self._lock:
+            entry = self._hosts.get(host)
+            if entry is None or entry['state'] == CLOSED:
+                return True
+
+            if entry['state'] == OPEN:
+                if time.time() < entry['retry_at']:
+                    return False
+                entry['state'] = HALF_OPEN
+                entry['trial'] = False
+
+            # Half-open: only one trial request at a time
+            if entry['trial']:
+                return False
+            entry['trial'] = True
+            return True
+
+    def record_success(self, url: str):
+        """Close the host's circuit and drop it from the blocklist"""
+        host = host_for(url)
+        with self._lock:
+            self._hosts.pop(host, None)
+            if self._blocklist.pop(host, None) is not None:
+                self._save_blocklist(host)
+
+    def record_failure(self, url: str, reason: str = ''):
+        """
+        Count a failure, opening the circuit once the threshold is reached
+
+        The count (including failures from earlier runs) is saved for
+        block_ttl; once it reaches block_threshold the host is blocked for
+        later runs too.
+        """
+        host = host_for(url)
+        now = time.time()
+        with self._lock:
+            entry = self._hosts.setdefault(host, {
+                'state': CLOSED,
+                'failures': 0,
+                'retry_at': 0,
+                'trial': False
+            })
+            entry['failures'] += 1
+            entry['trial'] = False
+
+            if entry['state'] == HALF_OPEN or entry['failures'] >= self.failure_threshold:
+                entry['state'] = OPEN
+                entry['retry_at'] = now + self.reset_timeout
+
+            saved = {'failures': entry['failures'], 'reason': reason[:200]}
+            if entry['failures'] >= self.block_threshold:
+                saved['until'] = now + self.block_ttl
+            else:
+                saved['expires'] = now + self.block_ttl
+            self._blocklist[host] = saved
+            self._save_blocklist(host, saved)
+
+
+_shared_breaker = None
+_shared_breaker_lock = threading.Lock()
+
+
+def get_circuit_breaker() -> HostCircuitBreaker:
+    """
+    Return the process-wide breaker shared by all fetchers
+
+    While a cassette is replaying, failures stay in memory: an offline run
+    must not add hosts to the real blocklist.
+    """
+    global _shared_breaker
+    # Imported here so importing this module doesn't load requests
+    from cassette import replaying
+    with _shared_breaker_lock:
+        if _shared_breaker is None:
+            _shared_breaker = HostCircuitBreaker(persist=not replaying())
+        return _shared_breaker
@@ -6,6 +6,8 @@ Combine all lead files with emails into one master file
 import pandas as pd
 import os
 from datetime import datetime
+from dedupe import dedupe_dataframe
+from run_log import get_log
 
 def combine_lead_files():
     """Combine all lead files with emails"""
@@ -19,22 +21,21 @@ def combine_lead_files():
         print("❌ No email files found.")
         return
     
-    print(f"📁 Found {len(email_files)} email files:")
+    log = get_log()
+    log.info('files_found', "📁 Found {count} email files", count=len(email_files))
     for i, file in enumerate(email_files, 1):
-        print(f"   {i}. {file}")
+        log.debug('file', "   {i}. {file}", i=i, file=file)
     
     all_leads = []
     
     for file in email_files:
         file_path = os.path.join(data_dir, file)
-        print(f"\n📖 Loading: {file}")
-        
         try:
             df = pd.read_csv(file_path)
-            print(f"   ✅ Loaded {len(df)} leads")
+            log.debug('file_loaded', "📖 Loaded {count} leads from: {file}", file=file, count=len(df))
             all_leads.append(df)
         except Exception as e:
-            print(f"   ❌ Error loading {file}: {e}")
+            log.warning('file_failed', "   ❌ Error loading {file}: {error}", file=file, error=str(e))
     
     if not all_leads:
         print("❌ No data loaded.")
@@ -44,9 +45,10 @@ def combine_lead_files():
     print(f"\n🔄 Combining {len(all_leads)} files...")
     combined_df = pd.concat(all_leads, ignore_index=True)
     
-    # Remove duplicates based on place_id
+    # Resolve duplicates by place_id, or by phone/website/postcode and name
+    # for leads without one
     print(f"📊 Before deduplication: {len(combined_df)} leads")
-    combined_df = combined_df.drop_duplicates(subset=['place_id'], keep='first')
+    combined_df, clusters_df = dedupe_dataframe(combined_df)
     print(f"📊 After deduplication: {len(combined_df)} leads")
     
     # Sort by business type and name
@@ -55,10 +57,13 @@ def combine_lead_files():
     # Save combined file
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     output_file = os.path.join(data_dir, f"ALL_LEADS_WITH_EMAILS_{timestamp}.csv")
+    clusters_file = os.path.join(data_dir, f"ALL_LEADS_WITH_EMAILS_{timestamp}_clusters.csv")
     combined_df.to_csv(output_file, index=False)
+    clusters_df.to_csv(clusters_file, index=False)
     
     print(f"\n🎉 Combined file created!")
     print(f"💾 Saved to: {output_file}")
+    print(f"💾 Duplicate clusters: {clusters_file}")
     
     # Show statistics
     total_leads = len(combined_df)
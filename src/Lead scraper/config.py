@@ -19,6 +19,9 @@ SEARCH_QUERIES = [
 # Location Configuration
 DEFAULT_LOCATION = "London, UK"  # Change this to your target area
 SEARCH_RADIUS = 5000  # Search radius in meters (5km)
+GEOCODE_CACHE_FILE = "data/geocode_cache.json"  # Resolved locations (lat/lng + viewport)
+GEOCODE_FAILURE_TTL = 24 * 3600  # Seconds before a location the Geocoding API couldn't find is tried again
+GEOCODE_ERROR_TTL = 5 * 60  # Seconds before a location whose lookup errored is tried again
 
 # Results Configuration
 MAX_RESULTS_PER_QUERY = 10  # Limit to avoid API rate limits
@@ -28,11 +31,67 @@ TOTAL_MAX_RESULTS = 100  # Overall limit for all queries
 SAVE_CSV = True
 SAVE_EXCEL = True
 OUTPUT_DIRECTORY = "data"
+LEAD_DB_FILE = "data/leads.db"  # Every scraped lead, upserted by place_id; CSV/Excel are exports of it
 
 # API Configuration
 API_DELAY = 0.1  # Delay between API calls in seconds
 MAX_RETRIES = 3  # Number of retries for failed requests
 
+# Pipeline Configuration
+PIPELINE_QUEUE_SIZE = 50  # Max items waiting between two pipeline stages
+DETAILS_WORKERS = 4  # Threads fetching place details
+ENRICH_WORKERS = 8  # Threads crawling websites for emails
+CAMPAIGN_WORKERS = 3  # Campaign cells scraped at once (each runs its own pipeline)
+HTML_PARSER = "lxml"  # BeautifulSoup parser ("lxml" or "html.parser")
+HTML_PARSER_WORKERS = None  # Parser processes (None = one per CPU core, 0 = parse in-thread)
+PARSE_TIMEOUT = 15  # Max seconds to wait for a parser process to handle one page
+JOB_INDEX_CACHE_SIZE = 5  # Jobs whose lead indexes the web app keeps in memory
+METRICS_JOB_HISTORY = 20  # Recent jobs whose per-job metrics are kept
+PROFILE_INTERVAL = 0.01  # Seconds between stack samples with --profile
+
+# Task Queue (worker.py)
+TASK_QUEUE_URL = "sqlite:///data/tasks.db"  # Broker shared by campaign --enqueue and the workers
+TASK_VISIBILITY_TIMEOUT = 300  # Seconds a leased task stays hidden unless its worker extends the lease
+TASK_MAX_ATTEMPTS = 3  # Tries before a task is marked failed
+WORKER_CONCURRENCY = 2  # Tasks each worker process runs at once
+
+# Web App (web_scraper.py)
+JOB_STATE_URL = "sqlite:///data/web_jobs.db"  # Job status shared by every web app process (env: LEADSCRAPER_JOB_STATE)
+JOB_STATE_INTERVAL = 1  # Seconds between a job's progress writes (they double as its heartbeat)
+JOB_STALE_AFTER = 60  # A job without a heartbeat for this long is reported as failed
+WEB_JOB_WORKERS = 2  # Scraping jobs each web app process runs at once (more wait as queued)
+WEB_MAX_ACTIVE_JOBS = 4  # Jobs queued or running across all processes before /scrape says busy
+
+# Logging
+LOG_LEVEL = "INFO"  # Console level (DEBUG shows every lead as it is processed)
+LOG_FILE = None  # JSON-lines event log, e.g. "data/run_log.jsonl" (None = off)
+LOG_FILE_LEVEL = "DEBUG"  # Lowest level written to LOG_FILE
+PROGRESS_EVERY = 25  # Print a progress summary every this many leads...
+PROGRESS_INTERVAL = 10  # ...or this many seconds
+
+# Time Budgets
+PAGE_TIMEOUT = 10  # Max seconds for a single website request
+HOST_REQUEST_INTERVAL = 1  # Min seconds between requests to the same website, across enrich threads
+MAX_PAGE_BYTES = 2000000  # Stop reading a page after this many bytes
+LEAD_TIME_BUDGET = 30  # Max seconds spent enriching one lead
+JOB_DEADLINE = 1800  # Max seconds for a whole web scraping job (30 minutes)
+
+# Host Circuit Breaker
+CIRCUIT_FAILURE_THRESHOLD = 1  # Failures before a host is skipped for the rest of the run
+HOST_BLOCK_THRESHOLD = 3  # Failures (added up across runs within HOST_BLOCK_TTL) before later runs skip a host
+CIRCUIT_RESET_TIMEOUT = 300  # Seconds before a failed host gets one trial request again
+HOST_BLOCK_TTL = 7 * 24 * 3600  # Seconds a failed host stays blocked for later runs
+HOST_BLOCKLIST_FILE = "data/host_blocklist.json"
+
+# URL Resolution
+URL_CACHE_FILE = "data/url_cache.json"  # Working scheme://host per domain
+URL_RACE_WORKERS = 32  # Threads racing http/https/www variants
+HTTP_CACHE_FILE = "data/http_cache.db"  # ETag/Last-Modified, body hash and results per page
+
+# Deduplication
+DEFAULT_PHONE_REGION = "GB"  # Country assumed for phone numbers without a +country code
+DEDUPE_MAX_BLOCK_SIZE = 50  # Leads sharing a phone/domain/postcode compared pairwise before splitting by name
+
 # Business Types to Focus On (optional filtering)
 TARGET_BUSINESS_TYPES = [
     "restaurant",
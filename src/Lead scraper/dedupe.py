@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+Dedupe - Entity resolution for leads with or without a place_id
+Leads are normalized (name, phone in E.164, website domain, postcode) and
+grouped into blocks sharing a phone number, domain or postcode. Only leads
+within the same block are compared, and matches are joined with union-find
+into clusters, each folded into one merged lead. Work grows with the number
+of leads, not with the number of pairs.
+
+Usage: python3 dedupe.py data/leads_a.csv data/leads_b.csv ...
+"""
+
+import os
+import re
+import sys
+import unicodedata
+import pandas as pd
+from datetime import datetime
+from difflib import SequenceMatcher
+from typing import Dict, List, Tuple
+
+from config import DEFAULT_PHONE_REGION, DEDUPE_MAX_BLOCK_SIZE
+from circuit_breaker import host_for
+
+try:
+    import phonenumbers
+except ImportError:
+    phonenumbers = None
+
+# Calling codes used when phonenumbers isn't installed
+COUNTRY_CODES = {
+    'GB': '44', 'IE': '353', 'US': '1', 'CA': '1', 'AU': '61', 'NZ': '64',
+    'FR': '33', 'DE': '49', 'ES': '34', 'IT': '39', 'NL': '31', 'IN': '91'
+}
+
+# Words that don't help tell two businesses apart
+NAME_STOPWORDS = {
+    'the', 'and', 'ltd', 'limited', 'llp', 'plc', 'inc', 'llc', 'co', 'company',
+    'uk', 'group'
+}
+
+# Shared hosts many unrelated businesses use as their "website"
+GENERIC_DOMAINS = {
+    'facebook.com', 'm.facebook.com', 'instagram.com', 'twitter.com', 'x.com',
+    'linktr.ee', 'sites.google.com', 'business.site', 'g.page', 'goo.gl',
+    'tripadvisor.co.uk', 'tripadvisor.com', 'yell.com', 'just-eat.co.uk',
+    'deliveroo.co.uk', 'ubereats.com', 'wixsite.com', 'squarespace.com'
+}
+
+UK_POSTCODE_PATTERN = re.compile(r'\b([A-Z]{1,2}\d[A-Z\d]?)\s*(\d[A-Z]{2})\b')
+ZIP_PATTERN = re.compile(r'\b(\d{5})(?:-\d{4})?\b')
+
+# Name similarity needed for a match, by what else the two leads share
+PHONE_MATCH_SIMILARITY = 0.6
+DOMAIN_MATCH_SIMILARITY = 0.6
+POSTCODE_MATCH_SIMILARITY = 0.85
+
+
+def _text(value) -> str:
+    """Missing values (None, NaN) as empty strings"""
+    if value is None or value != value:
+        return ''
+    return str(value).strip()
+
+
+def normalize_name(name) -> str:
+    """Lower-case, accent-free name without punctuation or company suffixes"""
+    name = unicodedata.normalize('NFKD', _text(name)).encode('ascii', 'ignore').decode('ascii')
+    name = re.sub(r'[^a-z0-9]+', ' ', name.lower().replace('&', ' and '))
+    return ' '.join(word for word in name.split() if word not in NAME_STOPWORDS)
+
+
+def normalize_phone(phone, region: str = None) -> str:
+    """
+    Phone number in E.164 form (e.g. +442071234567)
+
+    Args:
+        phone: Phone number as scraped ("020 7123 4567", "+44 20 7123 4567")
+        region: Country assumed for national numbers (default: DEFAULT_PHONE_REGION)
+
+    Returns:
+        E.164 string, or '' if it doesn't look like a phone number
+    """
+    # "+44 (0)20 ..." writes the national trunk prefix next to the country code
+    phone = _text(phone).replace('(0)', '')
+    if not phone:
+        return ''
+    region = (region or DEFAULT_PHONE_REGION).upper()
+
+    if phonenumbers is not None:
+        try:
+            parsed = phonenumbers.parse(phone, region)
+            if phonenumbers.is_possible_number(parsed):
+                return phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.E164)
+        except phonenumbers.NumberParseException:
+            pass
+        return ''
+
+    digits = re.sub(r'\D', '', phone)
+    if phone.startswith('+'):
+        number = digits
+    elif digits.startswith('00'):
+        number = digits[2:]
+    else:
+        country_code = COUNTRY_CODES.get(region, '')
+        if country_code == '1' and len(digits) == 11 and digits.startswith('1'):
+            number = digits
+        elif country_code == '1' and len(digits) == 10:
+            number = '1' + digits
+        elif digits.startswith('0') and country_code:
+            number = country_code + digits[1:]
+        elif country_code and digits.startswith(country_code) and len(digits) > 10:
+            number = digits
+        else:
+            return ''
+    return '+' + number if 8 <= len(number) <= 15 else ''
+
+
+def normalize_domain(website) -> str:
+    """Registrable-looking host of a website, '' for shared hosts like facebook.com"""
+    website = _text(website)
+    if not website:
+        return ''
+    domain = host_for(website).split(':')[0]
+    if domain in GENERIC_DOMAINS or any(domain.endswith('.' + generic) for generic in GENERIC_DOMAINS):
+        return ''
+    return domain
+
+
+def normalize_postcode(address) -> str:
+    """UK postcode (or US ZIP code) found in an address, without spaces"""
+    address = _text(address).upper()
+    match = UK_POSTCODE_PATTERN.search(address)
+    if match:
+        return match.group(1) + match.group(2)
+    match = ZIP_PATTERN.search(address)
+    return match.group(1) if match else ''
+
+
+class UnionFind:
+    """
+    Disjoint sets over row numbers, with path halving and union by size
+
+    Optional labels (e.g. place_ids) keep two sets with different non-empty
+    labels apart, so a lead without a place_id can't bridge two places.
+    """
+
+    def __init__(self, size: int, labels: List[str] = None):
+        self.parent = list(range(size))
+        self.size = [1] * size
+        self.labels = list(labels) if labels else None
+
+    def find(self, row: int) -> int:
+        parent = self.parent
+        while parent[row] != row:
+            parent[row] = parent[parent[row]]
+            row = parent[row]
+        return row
+
+    def union(self, a: int, b: int):
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return
+        if self.labels:
+            label_a, label_b = self.labels[a], self.labels[b]
+            if label_a and label_b and label_a != label_b:
+                return
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size[b]
+        if self.labels:
+            self.labels[a] = self.labels[a] or self.labels[b]
+
+
+def _keys(lead: Dict, region: str) -> Dict:
+    """Normalized comparison keys for one lead"""
+    return {
+        'place_id': _text(lead.get('place_id')),
+        'name': normalize_name(lead.get('name')),
+        'phone': normalize_phone(lead.get('phone'), region),
+        'domain': normalize_domain(lead.get('website')),
+        'postcode': normalize_postcode(lead.get('address'))
+    }
+
+
+def _name_similarity(a: str, b: str) -> float:
+    """How alike two normalized names are (0-1)"""
+    if a == b:
+        return 1.0
+    if not a or not b:
+        return 0.0
+    matcher = SequenceMatcher(None, a, b)
+    if matcher.real_quick_ratio() < PHONE_MATCH_SIMILARITY:
+        return 0.0
+    return matcher.ratio()
+
+
+def is_match(a: Dict, b: Dict) -> bool:
+    """
+    Whether two leads (as normalized keys) are the same business
+
+    Different place_ids are always different places. Otherwise a shared
+    phone number needs loosely similar names; a shared postcode needs
+    near-identical names, or similar names plus the same website domain; a
+    shared domain alone needs near-identical names and a missing postcode.
+    """
+    if a['place_id'] and b['place_id']:
+        return a['place_id'] == b['place_id']
+
+    similarity = _name_similarity(a['name'], b['name'])
+    if a['phone'] and a['phone'] == b['phone'] and similarity >= PHONE_MATCH_SIMILARITY:
+        return True
+    same_domain = a['domain'] and a['domain'] == b['domain']
+    if a['postcode'] and a['postcode'] == b['postcode']:
+        if similarity >= POSTCODE_MATCH_SIMILARITY:
+            return True
+        if same_domain and similarity >= DOMAIN_MATCH_SIMILARITY:
+            return True
+    elif same_domain and not (a['postcode'] and b['postcode']):
+        # Chains share a domain across branches, so only trust it when one
+        # side has no postcode to tell the branches apart
+        return similarity >= POSTCODE_MATCH_SIMILARITY
+    return False
+
+
+def _blocks(keys: List[Dict]) -> Dict[str, List[int]]:
+    """Rows grouped by each blocking key they have"""
+    blocks = {}
+    for row, key in enumerate(keys):
+        for field in ('phone', 'domain', 'postcode'):
+            if key[field]:
+                blocks.setdefault(f"{field}:{key[field]}", []).append(row)
+    return blocks
+
+
+def _compare_block(rows: List[int], keys: List[Dict], groups: UnionFind, max_size: int):
+    """Union matching rows within one block"""
+    if len(rows) > max_size:
+        # Split oversized blocks (a busy postcode, a chain's shared phone)
+        # by the start of the name so each part stays small
+        sub_blocks = {}
+        for row in rows:
+            sub_blocks.setdefault(keys[row]['name'][:4], []).append(row)
+        if len(sub_blocks) > 1:
+            for sub_rows in sub_blocks.values():
+                _compare_block(sub_rows, keys, groups, max_size)
+            return
+        # Still one huge block: only join identical names
+        by_name = {}
+        for row in rows:
+            first = by_name.setdefault(keys[row]['name'], row)
+            if first != row and is_match(keys[first], keys[row]):
+                groups.union(first, row)
+        return
+
+    for i, a in enumerate(rows):
+        for b in rows[i + 1:]:
+            if groups.find(a) != groups.find(b) and is_match(keys[a], keys[b]):
+                groups.union(a, b)
+
+
+def _fill_rank(lead: Dict) -> Tuple:
+    """Sort key choosing which lead of a cluster the merged record starts from"""
+    filled = sum(1 for value in lead.values() if _text(value))
+    return (bool(_text(lead.get('place_id'))), filled, _text(lead.get('scraped_at')))
+
+
+def merge_cluster(leads: List[Dict]) -> Dict:
+    """
+    Fold a cluster of duplicate leads into one record
+
+    Starts from the most complete lead (with a place_id, newest scrape),
+    fills its empty fields from the others and unions their emails.
+    """
+    ordered = sorted(leads, key=_fill_rank, reverse=True)
+    merged = dict(ordered[0])
+    emails = []
+    for lead in ordered:
+        for key, value in lead.items():
+            if not _text(merged.get(key)) and _text(value):
+                merged[key] = value
+        for email in _text(lead.get('emails')).split(','):
+            email = email.strip()
+            if email and email.lower() not in (e.lower() for e in emails):
+                emails.append(email)
+    if 'emails' in merged or emails:
+        merged['emails'] = ', '.join(emails)
+    return merged
+
+
+def dedupe_leads(leads: List[Dict], region: str = None,
+                 max_block_size: int = None) -> Tuple[List[Dict], List[List[int]]]:
+    """
+    Resolve duplicate leads into clusters
+
+    Args:
+        leads: Lead dictionaries (place_id may be missing)
+        region: Country assumed for national phone numbers
+        max_block_size: Blocks larger than this are split before comparing
+
+    Returns:
+        (merged leads, clusters) where clusters[i] lists the input rows
+        merged into merged[i]; merged leads carry cluster_id and cluster_size
+    """
+    keys = [_keys(lead, region) for lead in leads]
+    groups = UnionFind(len(leads), [key['place_id'] for key in keys])
+
+    # Same place_id, or same name at the same postcode: no comparison needed
+    exact = {}
+    for row, key in enumerate(keys):
+        identities = []
+        if key['place_id']:
+            identities.append('id:' + key['place_id'])
+        if key['name'] and key['postcode']:
+            identities.append(f"name:{key['name']}|{key['postcode']}")
+        for identity in identities:
+            first = exact.setdefault(identity, row)
+            if first != row and is_match(keys[first], key):
+                groups.union(first, row)
+
+    for rows in _blocks(keys).values():
+        if len(rows) > 1:
+            _compare_block(rows, keys, groups, max_block_size or DEDUPE_MAX_BLOCK_SIZE)
+
+    members = {}
+    for row in range(len(leads)):
+        members.setdefault(groups.find(row), []).append(row)
+
+    clusters = sorted(members.values(), key=lambda rows: rows[0])
+    merged = []
+    for cluster_id, rows in enumerate(clusters, 1):
+        lead = merge_cluster([leads[row] for row in rows])
+        lead['cluster_id'] = cluster_id
+        lead['cluster_size'] = len(rows)
+        merged.append(lead)
+    return merged, clusters
+
+
+def dedupe_dataframe(df: pd.DataFrame, region: str = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    DataFrame wrapper around dedupe_leads
+
+    Returns:
+        (merged DataFrame, clusters DataFrame with one row per input lead:
+        cluster_id, row and the lead's name/address/phone/website/place_id)
+    """
+    leads = df.fillna('').to_dict('records')
+    merged, clusters = dedupe_leads(leads, region)
+
+    members = []
+    for cluster_id, rows in enumerate(clusters, 1):
+        for row in rows:
+            lead = leads[row]
+            members.append({
+                'cluster_id': cluster_id,
+                'row': row,
+                **{field: lead.get(field, '') for field in ('name', 'address', 'phone', 'website', 'place_id')}
+            })
+    return pd.DataFrame(merged), pd.DataFrame(members)
+
+
+def main():
+    """Dedupe one or more lead CSV files into a merged file and a clusters file"""
+    files = [f for f in sys.argv[1:] if f.endswith('.csv')]
+    if not files:
+        print("Usage: python3 dedupe.py data/leads_a.csv [data/leads_b.csv ...]")
+        return 1
+
+    df = pd.concat([pd.read_csv(f, dtype=str, keep_default_na=False) for f in files], ignore_index=True)
+    print(f"📖 Loaded {len(df)} leads from {len(files)} file(s)")
+
+    started = datetime.now()
+    merged, members = dedupe_dataframe(df)
+    elapsed = (datetime.now() - started).total_seconds()
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    output_dir = os.path.dirname(files[0]) or '.'
+    merged_file = os.path.join(output_dir, f"DEDUPED_LEADS_{timestamp}.csv")
+    clusters_file = os.path.join(output_dir, f"DEDUPED_LEADS_{timestamp}_clusters.csv")
+    merged.to_csv(merged_file, index=False)
+    members.to_csv(clusters_file, index=False)
+
+    print(f"📊 {len(df)} leads → {len(merged)} unique ({len(df) - len(merged)} duplicates) in {elapsed:.1f}s")
+    print(f"💾 Merged leads: {merged_file}")
+    print(f"💾 Clusters: {clusters_file}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Email Cleaning - Vectorized cleanup of a lead file's emails column
+The comma-joined emails column is exploded to one row per address,
+normalized and validated with pandas string operations, tagged as scraped
+or guessed, deduplicated across leads and folded back onto the leads,
+without looping over rows in Python.
+"""
+
+import pandas as pd
+from typing import Tuple
+
+from page_parser import ASSET_EXTENSIONS
+
+# Same shape as the extraction patterns in page_parser, anchored to the whole value
+EMAIL_REGEX = r'[a-z0-9._%+-]+@[a-z0-9-]+(?:\.[a-z0-9-]+)*\.[a-z]{2,}'
+ASSET_REGEX = '(?:' + '|'.join(ext.replace('.', r'\.') for ext in ASSET_EXTENSIONS) + ')$'
+
+# Mailboxes add_emails_to_dataframe guessed when a website had no email
+GUESSED_MAILBOXES = ['info', 'contact', 'hello', 'admin']
+
+SOURCE_SCRAPED = 'scraped'
+SOURCE_GUESSED = 'guessed'
+
+
+def explode_emails(df: pd.DataFrame, column: str = 'emails') -> pd.DataFrame:
+    """
+    One row per valid, normalized email address
+
+    Args:
+        df: Lead DataFrame with a comma-joined emails column
+        column: Name of that column
+
+    Returns:
+        DataFrame indexed like df (one entry per address) with an 'email' column
+    """
+    emails = df[column].fillna('').astype(str).str.split(',').explode()
+    emails = (emails.str.strip()
+                    .str.lower()
+                    .str.replace(r'^mailto:', '', regex=True)
+                    .str.replace(r'\s+', '', regex=True)
+                    .str.strip('.'))
+    valid = (emails.str.fullmatch(EMAIL_REGEX, na=False)
+             & ~emails.str.contains('..', regex=False, na=False)
+             & ~emails.str.contains(ASSET_REGEX, regex=True, na=False))
+    return emails[valid].to_frame('email')
+
+
+def tag_sources(emails: pd.DataFrame, df: pd.DataFrame, website_column: str = 'website',
+                source_column: str = 'email_source') -> pd.Series:
+    """
+    Scraped or guessed, per exploded email
+
+    Rows written by add_emails carry an email_source and are trusted. For
+    rows without one, an address is taken as guessed when it is one of the
+    generic mailboxes add_emails guessed at the website's exact netloc
+    (e.g. info@www.example.co.uk).
+    """
+    if website_column in df.columns:
+        netloc = (df[website_column].fillna('').astype(str).str.lower()
+                                    .str.extract(r'^(?:[a-z][a-z0-9+.-]*://)?([^/?#]+)', expand=False)
+                                    .fillna('')
+                                    .reindex(emails.index))
+        mailbox = emails['email'].str.split('@').str[0]
+        domain = emails['email'].str.split('@').str[1]
+        guessed = mailbox.isin(GUESSED_MAILBOXES) & (domain == netloc)
+    else:
+        guessed = pd.Series(False, index=emails.index)
+
+    if source_column in df.columns:
+        recorded = df[source_column].fillna('').astype(str).reindex(emails.index)
+        guessed = guessed.where(recorded == '', recorded == SOURCE_GUESSED)
+
+    return guessed.map({True: SOURCE_GUESSED, False: SOURCE_SCRAPED})
+
+
+def clean_email_column(df: pd.DataFrame, column: str = 'emails',
+                       website_column: str = 'website') -> Tuple[pd.DataFrame, dict]:
+    """
+    Normalize, validate, tag and deduplicate a lead file's emails
+
+    Each address is kept on one lead only: scraped beats guessed, and the
+    earlier lead in df wins ties. The result has 'emails' (scraped
+    addresses), 'guessed_emails' and 'email_source' (scraped, guessed or '').
+
+    Args:
+        df: Lead DataFrame
+        column: Comma-joined emails column
+        website_column: Column holding each lead's website
+
+    Returns:
+        (cleaned DataFrame, statistics dictionary)
+    """
+    original_index = df.index
+    df = df.reset_index(drop=True)
+    if column not in df.columns:
+        df[column] = ''
+    raw_count = int(df[column].fillna('').astype(str).str.count('@').sum())
+
+    emails = explode_emails(df, column)
+    emails['source'] = tag_sources(emails, df, website_column)
+    emails['order'] = emails.index
+    valid_count = len(emails)
+
+    # Scraped addresses first, then earlier leads, so drop_duplicates keeps the best owner
+    emails['rank'] = (emails['source'] == SOURCE_GUESSED).astype(int)
+    emails = emails.sort_values(['rank', 'order'], kind='stable')
+    emails = emails.drop_duplicates(subset='email', keep='first').sort_values('order', kind='stable')
+
+    folded = emails.groupby([emails.index, 'source'])['email'].agg(', '.join).unstack('source')
+    scraped = folded[SOURCE_SCRAPED] if SOURCE_SCRAPED in folded else pd.Series(dtype=object)
+    guessed = folded[SOURCE_GUESSED] if SOURCE_GUESSED in folded else pd.Series(dtype=object)
+
+    df[column] = scraped.reindex(df.index).fillna('')
+    df['guessed_emails'] = guessed.reindex(df.index).fillna('')
+    df['email_source'] = ''
+    df.loc[df['guessed_emails'] != '', 'email_source'] = SOURCE_GUESSED
+    df.loc[df[column] != '', 'email_source'] = SOURCE_SCRAPED
+    df.index = original_index
+
+    stats = {
+        'raw': raw_count,
+        'invalid': raw_count - valid_count,
+        'duplicates': valid_count - len(emails),
+        'scraped': int((emails['source'] == SOURCE_SCRAPED).sum()),
+        'guessed': int((emails['source'] == SOURCE_GUESSED).sum())
+    }
+    return df, stats
@@ -5,98 +5,40 @@ This version tries to find emails from websites and other sources
 """
 
 import os
-import re
 import time
 import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
-from lead_scraper import LeadScraper
-import pandas as pd
-from datetime import datetime
+from lead_scraper import LeadScraper, LEAD_FIELDS
+from pipeline import LeadPipeline, CsvLeadSink, TeeSink
+from lead_store import get_lead_store, StoreLeadSink
+from page_parser import extract_emails_from_text, is_valid_email
+from website_emails import WebsiteEmailFinder, USER_AGENT
+from job_control import Deadline
+from metrics import get_metrics
+from profiling import profile_run, take_profile_flag
+from run_log import get_log
+from config import LEAD_TIME_BUDGET
 
 class EmailLeadScraper(LeadScraper):
     def __init__(self, api_key=None):
         super().__init__(api_key)
-        self.email_patterns = [
-            r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',
-            r'\b[A-Za-z0-9._%+-]+\s*@\s*[A-Za-z0-9.-]+\s*\.\s*[A-Z|a-z]{2,}\b'
-        ]
+        self.output_file = None
         self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+        self.session.headers.update({'User-Agent': USER_AGENT})
+        self.email_finder = WebsiteEmailFinder(self.session)
     
     def extract_emails_from_text(self, text):
         """Extract email addresses from text"""
-        emails = set()
-        for pattern in self.email_patterns:
-            found_emails = re.findall(pattern, text, re.IGNORECASE)
-            for email in found_emails:
-                # Clean up the email
-                email = email.strip().replace(' ', '')
-                if self.is_valid_email(email):
-                    emails.add(email.lower())
-        return list(emails)
+        return extract_emails_from_text(text)
     
     def is_valid_email(self, email):
         """Basic email validation"""
-        if not email or len(email) < 5:
-            return False
-        if email.count('@') != 1:
-            return False
-        if email.startswith('.') or email.endswith('.'):
-            return False
-        if '..' in email:
-            return False
-        return True
+        return is_valid_email(email)
     
-    def scrape_website_for_emails(self, url, max_pages=3):
-        """Scrape a website for email addresses"""
-        emails = set()
-        
-        try:
-            # Clean and validate URL
-            if not url.startswith(('http://', 'https://')):
-                url = 'https://' + url
-            
-            # Get main page
-            response = self.session.get(url, timeout=10)
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'html.parser')
-                
-                # Extract emails from main page
-                page_text = soup.get_text()
-                page_emails = self.extract_emails_from_text(page_text)
-                emails.update(page_emails)
-                
-                # Look for contact/about pages
-                contact_links = []
-                for link in soup.find_all('a', href=True):
-                    href = link.get('href', '').lower()
-                    text = link.get_text().lower()
-                    if any(word in href or word in text for word in ['contact', 'about', 'info']):
-                        full_url = urljoin(url, link['href'])
-                        contact_links.append(full_url)
-                
-                # Check contact pages (limit to avoid too many requests)
-                for contact_url in contact_links[:max_pages-1]:
-                    try:
-                        time.sleep(1)  # Be respectful
-                        contact_response = self.session.get(contact_url, timeout=10)
-                        if contact_response.status_code == 200:
-                            contact_soup = BeautifulSoup(contact_response.content, 'html.parser')
-                            contact_text = contact_soup.get_text()
-                            contact_emails = self.extract_emails_from_text(contact_text)
-                            emails.update(contact_emails)
-                    except:
-                        continue
-                        
-        except Exception as e:
-            print(f"   ⚠️  Could not scrape website {url}: {str(e)}")
-        
-        return list(emails)
+    def scrape_website_for_emails(self, url, max_pages=3, deadline=None):
+        """Scrape a website for email addresses, stopping when the deadline passes"""
+        return self.email_finder.find_emails(url, max_pages, deadline)
     
-    def find_emails_from_google(self, business_name, location):
+    def find_emails_from_google(self, business_name, location, deadline=None):
         """Try to find emails using Google search"""
         emails = set()
         
@@ -109,71 +51,112 @@ class EmailLeadScraper(LeadScraper):
             ]
             
             for query in search_queries:
+                if deadline and deadline.expired():
+                    break
                 try:
                     time.sleep(2)  # Be respectful to Google
                     # Note: This is a simplified approach. For production, consider using Google Custom Search API
-                    print(f"   🔍 Searching Google for: {query}")
+                    get_log().debug('google_search', "   🔍 Searching Google for: {query}", query=query)
                     # In a real implementation, you'd use Google Custom Search API here
                     # For now, we'll skip this to avoid rate limiting
                 except:
                     continue
                     
         except Exception as e:
-            print(f"   ⚠️  Google search failed: {str(e)}")
+            get_log().warning('google_search_failed', "   ⚠️  Google search failed: {error}", error=str(e))
         
         return list(emails)
     
-    def enhance_lead_with_email(self, lead):
-        """Enhance a lead with email information"""
-        print(f"   📧 Looking for email for: {lead['name']}")
-        
+    def enhance_lead_with_email(self, lead, deadline=None):
+        """
+        Enhance a lead with email information
+        
+        Args:
+            lead: Lead dictionary
+            deadline: Time budget for this lead (default: LEAD_TIME_BUDGET seconds)
+        
+        Returns:
+            The lead with an 'emails' field
+        """
+        log = get_log()
+        log.debug('email_lookup', "   📧 Looking for email for: {name}", name=lead['name'])
+        
+        if deadline is None:
+            deadline = Deadline(LEAD_TIME_BUDGET)
         emails = []
         
         # Try to get email from website
         if lead.get('website'):
-            print(f"   🌐 Checking website: {lead['website']}")
-            website_emails = self.scrape_website_for_emails(lead['website'])
+            log.debug('website_check', "   🌐 Checking website: {url}", url=lead['website'])
+            website_emails = self.scrape_website_for_emails(lead['website'], deadline=deadline)
             emails.extend(website_emails)
         
         # Try Google search if no website or no emails found
-        if not emails and lead.get('name'):
-            print(f"   🔍 Searching Google for contact info...")
-            google_emails = self.find_emails_from_google(lead['name'], lead.get('address', ''))
+        if not emails and lead.get('name') and not deadline.expired():
+            log.debug('google_lookup', "   🔍 Searching Google for contact info...")
+            google_emails = self.find_emails_from_google(lead['name'], lead.get('address', ''), deadline)
             emails.extend(google_emails)
         
         # Add emails to lead
         if emails:
             lead['emails'] = ', '.join(emails)
-            print(f"   ✅ Found emails: {', '.join(emails)}")
+            log.debug('emails_found', "   ✅ Found emails: {emails}", name=lead['name'], emails=lead['emails'])
         else:
             lead['emails'] = ''
-            print(f"   ❌ No emails found")
+            log.debug('emails_missing', "   ❌ No emails found", name=lead['name'])
         
         return lead
     
-    def scrape_leads_with_emails(self, queries, location=None, max_results=20, enhance_with_emails=True):
-        """Scrape leads and optionally enhance with email addresses"""
+    def scrape_leads_with_emails(self, queries, location=None, max_results=20, enhance_with_emails=True, output_file=None, control=None):
+        """
+        Scrape leads and optionally enhance with email addresses
+        
+        Search, details, email enrichment and CSV writing run as concurrent
+        pipeline stages, so each lead is written as soon as it is enriched.
+        
+        Args:
+            queries: List of search terms
+            location: Location to search around
+            max_results: Maximum number of results per query
+            enhance_with_emails: Whether to look for emails on each website
+            output_file: CSV path to stream leads into (default: data/leads_*.csv)
+            control: Optional JobControl used to cancel the run
+        
+        Returns:
+            List of lead dictionaries
+        """
         print("🚀 Starting enhanced lead scraping with email extraction...")
         
-        # First, get the basic leads
-        leads = self.scrape_leads(queries, location, max_results)
+        if not output_file:
+            output_file = os.path.join('data', self.output_filename('csv', queries))
+        
+        fieldnames = LEAD_FIELDS + ['emails'] if enhance_with_emails else LEAD_FIELDS
+        store = get_lead_store()
+        self.job_id = store.start_job('scrape', queries, location,
+                                      name=os.path.splitext(os.path.basename(output_file))[0])
+        sink = TeeSink(CsvLeadSink(output_file, fieldnames=fieldnames), StoreLeadSink(store, self.job_id))
+        pipeline = LeadPipeline(
+            self,
+            enricher=self.enhance_lead_with_email if enhance_with_emails else None,
+            sink=sink,
+            control=control
+        )
         
-        if enhance_with_emails and leads:
-            print(f"\n📧 Enhancing {len(leads)} leads with email addresses...")
-            print("⚠️  This may take a while as we check websites...")
-            
-            enhanced_leads = []
-            for i, lead in enumerate(leads, 1):
-                print(f"\n📋 Processing lead {i}/{len(leads)}")
-                enhanced_lead = self.enhance_lead_with_email(lead)
-                enhanced_leads.append(enhanced_lead)
-                
-                # Add delay to be respectful
-                time.sleep(1)
-            
-            self.results = enhanced_leads
-            return enhanced_leads
+        if enhance_with_emails:
+            print("⚠️  Leads are written as soon as their websites have been checked...")
+        
+        try:
+            leads = pipeline.run(queries, location, max_results)
+        finally:
+            sink.close()
+            store.finish_job(self.job_id, 'cancelled' if control and control.cancelled else 'completed')
         
+        if sink.count:
+            print(f"💾 Streamed {sink.count} leads to: {output_file}")
+            store.record_export(output_file, self.job_id, sink.count)
+            self.output_file = output_file
+        
+        self.results = leads
         return leads
 
 def main():
@@ -230,13 +213,15 @@ def main():
         
         # Save results
         if leads:
-            csv_file = scraper.save_to_csv()
+            csv_file = scraper.output_file or scraper.save_to_csv()
             excel_file = scraper.save_to_excel()
             
             print(f"\n📁 Files saved:")
             print(f"   CSV: {csv_file}")
             print(f"   Excel: {excel_file}")
             
+            get_metrics().save_run_summary(csv_file, scraper.job_id)
+            
             # Show email statistics
             if include_emails:
                 leads_with_emails = [lead for lead in leads if lead.get('emails')]
@@ -255,4 +240,5 @@ def main():
         print(f"❌ Error: {str(e)}")
 
 if __name__ == "__main__":
-    main()
+    with profile_run(take_profile_flag()):
+        main()
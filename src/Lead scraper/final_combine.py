@@ -6,6 +6,8 @@ Create final combined lead file with proper statistics
 import pandas as pd
 import os
 from datetime import datetime
+from email_cleaning import clean_email_column
+from run_log import get_log
 
 def create_final_combined_file():
     """Create the final combined lead file"""
@@ -19,22 +21,21 @@ def create_final_combined_file():
         print("❌ No email files found.")
         return
     
-    print(f"📁 Found {len(email_files)} email files:")
+    log = get_log()
+    log.info('files_found', "📁 Found {count} email files", count=len(email_files))
     for i, file in enumerate(email_files, 1):
-        print(f"   {i}. {file}")
+        log.debug('file', "   {i}. {file}", i=i, file=file)
     
     all_leads = []
     
     for file in email_files:
         file_path = os.path.join(data_dir, file)
-        print(f"\n📖 Loading: {file}")
-        
         try:
             df = pd.read_csv(file_path)
-            print(f"   ✅ Loaded {len(df)} leads")
+            log.debug('file_loaded', "📖 Loaded {count} leads from: {file}", file=file, count=len(df))
             all_leads.append(df)
         except Exception as e:
-            print(f"   ❌ Error loading {file}: {e}")
+            log.warning('file_failed', "   ❌ Error loading {file}: {error}", file=file, error=str(e))
     
     if not all_leads:
         print("❌ No data loaded.")
@@ -49,14 +50,15 @@ def create_final_combined_file():
     combined_df = combined_df.drop_duplicates(subset=['place_id'], keep='first')
     print(f"📊 After deduplication: {len(combined_df)} leads")
     
-    # Clean up email column - replace empty strings and NaN with empty string
-    combined_df['emails'] = combined_df['emails'].fillna('')
-    combined_df['emails'] = combined_df['emails'].astype(str)
-    combined_df['emails'] = combined_df['emails'].replace('nan', '')
-    
     # Sort by business type and name
     combined_df = combined_df.sort_values(['query_used', 'name'])
     
+    # Normalize, validate and dedupe emails; guessed info@ addresses move
+    # to their own column so 'emails' only holds addresses found on websites
+    combined_df, email_stats = clean_email_column(combined_df)
+    print(f"📧 Emails: {email_stats['scraped']} scraped, {email_stats['guessed']} guessed, "
+          f"{email_stats['duplicates']} duplicates and {email_stats['invalid']} invalid removed")
+    
     # Save combined file
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     output_file = os.path.join(data_dir, f"MASTER_LEADS_WITH_EMAILS_{timestamp}.csv")
@@ -72,6 +74,7 @@ def create_final_combined_file():
     print(f"\n📊 Final Statistics:")
     print(f"   Total unique leads: {total_leads}")
     print(f"   Leads with emails: {leads_with_emails}")
+    print(f"   Leads with only a guessed email: {len(combined_df[combined_df['email_source'] == 'guessed'])}")
     print(f"   Success rate: {leads_with_emails/total_leads*100:.1f}%")
     
     # Show breakdown by business type
@@ -5,6 +5,8 @@ Custom script to get a large number of leads
 """
 
 from lead_scraper import LeadScraper
+from metrics import get_metrics
+from profiling import profile_run, take_profile_flag
 import time
 
 def get_500_property_leads():
@@ -78,6 +80,7 @@ def get_500_property_leads():
             print(f"\n📁 Files saved:")
             print(f"   CSV: {csv_file}")
             print(f"   Excel: {excel_file}")
+            get_metrics().save_run_summary(csv_file, scraper.job_id)
             
             # Show sample results
             print(f"\n📋 Sample results:")
@@ -103,4 +106,5 @@ def get_500_property_leads():
         return None
 
 if __name__ == "__main__":
-    get_500_property_leads()
+    with profile_run(take_profile_flag()):
+        get_500_property_leads()
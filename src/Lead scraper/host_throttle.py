@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Host Throttle - Politeness limit for requests to lead websites
+Enrichment runs on several threads, and leads often share a website (chains,
+franchises, directory pages), so the pause between requests is kept per host
+and shared by every thread: each host gets at most one request every
+HOST_REQUEST_INTERVAL seconds, while different hosts are fetched in parallel.
+"""
+
+import time
+import threading
+
+from config import HOST_REQUEST_INTERVAL
+from circuit_breaker import host_for
+from job_control import Deadline, JobCancelled
+
+# Hosts remembered before slots that have already passed are forgotten
+MAX_TRACKED_HOSTS = 10000
+
+
+class HostThrottle:
+    def __init__(self, interval: float = None):
+        """
+        Space out requests to each host
+
+        Args:
+            interval: Minimum seconds between two requests to the same host
+                      (default: HOST_REQUEST_INTERVAL; 0 turns the limit off)
+        """
+        self.interval = HOST_REQUEST_INTERVAL if interval is None else interval
+        self._next_slot = {}  # host -> monotonic time its next request may start
+        self._lock = threading.Lock()
+
+    def wait(self, url: str, deadline: Deadline = None):
+        """
+        Block until a request to url's host is allowed, and reserve that slot
+
+        Args:
+            url: URL about to be requested
+            deadline: Optional time budget of the caller
+
+        Raises:
+            JobCancelled: If the slot comes after the deadline (nothing is reserved)
+        """
+        if self.interval <= 0:
+            return
+        host = host_for(url)
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, 0.0))
+            remaining = deadline.remaining() if deadline else None
+            if remaining is not None and slot - now >= remaining:
+                raise JobCancelled(deadline.reason())
+            if len(self._next_slot) >= MAX_TRACKED_HOSTS:
+                self._next_slot = {h: t for h, t in self._next_slot.items() if t > now}
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+_shared_throttle = None
+_shared_throttle_lock = threading.Lock()
+
+
+def get_host_throttle() -> HostThrottle:
+    """Return the process-wide throttle shared by all fetchers"""
+    global _shared_throttle
+    with _shared_throttle_lock:
+        if _shared_throttle is None:
+            _shared_throttle = HostThrottle()
+        return _shared_throttle
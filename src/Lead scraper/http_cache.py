@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+HTTP Cache - Conditional GETs and cached extraction results for websites
+Each fetched URL keeps its ETag, Last-Modified, a hash of the body and the
+extraction result, under the URL that was requested (and the URL it
+redirected to). Refreshes send If-None-Match / If-Modified-Since, and a
+304 or an unchanged body reuses the stored result without re-parsing.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, Iterable, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+from config import HTTP_CACHE_FILE
+
+
+class HttpCache:
+    def __init__(self, path: str = None):
+        """
+        Open (or create) the cache database
+
+        Args:
+            path: SQLite file holding the cache
+        """
+        self.path = path or HTTP_CACHE_FILE
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                content_hash TEXT,
+                result TEXT,
+                fetched_at REAL
+            )
+        ''')
+        self._conn.commit()
+
+    @staticmethod
+    def content_hash(content: bytes) -> str:
+        """Hash used to spot unchanged bodies"""
+        return hashlib.sha256(content).hexdigest()
+
+    @staticmethod
+    def cache_key(url: str) -> str:
+        """Normalize a URL so "https://Example.com" and "https://example.com/" share an entry"""
+        parts = urlsplit(url)
+        return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or '/', parts.query, ''))
+
+    def get(self, url: str) -> Optional[Dict]:
+        """Cached entry for a URL, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT etag, last_modified, content_hash, result, fetched_at FROM pages WHERE url = ?',
+                (self.cache_key(url),)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            'etag': row[0],
+            'last_modified': row[1],
+            'content_hash': row[2],
+            'result': json.loads(row[3]) if row[3] else None,
+            'fetched_at': row[4]
+        }
+
+    def conditional_headers(self, url: str) -> Dict:
+        """If-None-Match / If-Modified-Since headers for a refresh of url"""
+        entry = self.get(url)
+        headers = {}
+        if entry and entry['result'] is not None:
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def store(self, url: str, response_headers, content_hash: str, result: Dict, aliases: Iterable[str] = ()):
+        """
+        Remember validators, body hash and extraction result for url
+
+        Args:
+            url: URL the page was requested from; later requests look it up by this
+            response_headers: Headers of the 200 response (ETag, Last-Modified)
+            content_hash: content_hash() of the body
+            result: Extraction result to reuse while the page is unchanged
+            aliases: Other URLs to file the same entry under (e.g. where url redirected)
+        """
+        keys = {self.cache_key(key) for key in (url, *aliases) if key}
+        row = (response_headers.get('ETag'), response_headers.get('Last-Modified'),
+               content_hash, json.dumps(result), time.time())
+        with self._lock:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO pages (url, etag, last_modified, content_hash, result, fetched_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                [(key, *row) for key in keys]
+            )
+            self._conn.commit()
+
+    def touch(self, url: str):
+        """Mark a cached entry as revalidated now"""
+        with self._lock:
+            self._conn.execute('UPDATE pages SET fetched_at = ? WHERE url = ?', (time.time(), self.cache_key(url)))
+            self._conn.commit()
+
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_http_cache() -> HttpCache:
+    """Return the process-wide HTTP cache shared by all fetchers"""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = HttpCache()
+        return _shared_cache
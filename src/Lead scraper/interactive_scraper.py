@@ -6,6 +6,8 @@ Interactive Lead Scraper - Easy input interface
 import os
 import sys
 from lead_scraper import LeadScraper
+from metrics import get_metrics
+from profiling import profile_run, take_profile_flag
 
 def get_user_input():
     """Get input from user interactively"""
@@ -88,6 +90,7 @@ def main():
             print(f"\n📁 Files saved:")
             print(f"   CSV: {csv_file}")
             print(f"   Excel: {excel_file}")
+            get_metrics().save_run_summary(csv_file, scraper.job_id)
             
             # Show sample results
             print(f"\n📋 Sample results:")
@@ -105,4 +108,5 @@ def main():
         print(f"❌ Error: {str(e)}")
 
 if __name__ == "__main__":
-    main()
+    with profile_run(take_profile_flag()):
+        main()
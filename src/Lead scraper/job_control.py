@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Job Control - Deadlines and cooperative cancellation
+Long-running work checks these between stages and caps its network timeouts
+with them, so a job stops promptly when it is cancelled or out of time.
+"""
+
+import time
+import threading
+from typing import Optional
+
+
+class JobCancelled(Exception):
+    """Raised when a job is cancelled or runs out of time"""
+    pass
+
+
+class Deadline:
+    def __init__(self, seconds: float = None, parent: 'Deadline' = None):
+        """
+        A point in time after which work should stop
+
+        Args:
+            seconds: Time budget from now (None = no limit of its own)
+            parent: Enclosing deadline (e.g. the job) that also bounds this one
+        """
+        self.expires_at = time.monotonic() + seconds if seconds is not None else None
+        self.parent = parent
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left, or None if there is no limit"""
+        remaining = None
+        if self.expires_at is not None:
+            remaining = max(self.expires_at - time.monotonic(), 0.0)
+        if self.parent is not None:
+            parent_remaining = self.parent.remaining()
+            if parent_remaining is not None:
+                remaining = parent_remaining if remaining is None else min(remaining, parent_remaining)
+        return remaining
+
+    def expired(self) -> bool:
+        """True once the budget (or the parent's) is used up"""
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    def timeout(self, cap: float) -> float:
+        """
+        Network timeout to use for the next request
+
+        Args:
+            cap: Timeout to use when plenty of time is left
+
+        Returns:
+            The smaller of cap and the time remaining
+
+        Raises:
+            JobCancelled: If no time is left
+        """
+        remaining = self.remaining()
+        if remaining is None:
+            return cap
+        if remaining <= 0:
+            raise JobCancelled(self.reason())
+        return min(cap, remaining)
+
+    def reason(self) -> str:
+        """Why the deadline is over"""
+        if self.parent is not None and self.parent.expired():
+            return self.parent.reason()
+        return 'Time budget exceeded'
+
+    def check(self):
+        """Raise JobCancelled if the deadline has passed"""
+        if self.expired():
+            raise JobCancelled(self.reason())
+
+
+class JobControl(Deadline):
+    def __init__(self, deadline_seconds: float = None):
+        """
+        Cancellation handle and global deadline for one job
+
+        Args:
+            deadline_seconds: Total time the job may run (None = no limit)
+        """
+        super().__init__(deadline_seconds)
+        self._cancelled = threading.Event()
+        self._reason = None
+
+    def cancel(self, reason: str = 'Cancelled by user'):
+        """Ask the job to stop; in-flight work stops at its next check"""
+        self._reason = reason
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        """True if the job was cancelled or its deadline has passed"""
+        return self._cancelled.is_set() or super().expired()
+
+    def remaining(self) -> Optional[float]:
+        if self._cancelled.is_set():
+            return 0.0
+        return super().remaining()
+
+    def reason(self) -> str:
+        if self._cancelled.is_set():
+            return self._reason
+        return 'Job deadline exceeded'
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Job State - Status of web app scraping jobs, shared by every app process
+Under gunicorn (or any server with several worker processes) the request
+asking for a job's progress rarely reaches the process running the job, so
+status, progress and cancellation live here instead of in module globals.
+The running process publishes its progress through a JobReporter, which
+also acts as the job's heartbeat: a job whose heartbeats stop (its process
+died) is reported as failed instead of running forever.
+
+The default store is a SQLite file that every process on the machine can
+use at once (JOB_STATE_URL in config.py, or the LEADSCRAPER_JOB_STATE
+environment variable). Other stores register a URL scheme:
+
+    register_job_state('redis', RedisJobState)
+    state = get_job_state('redis://state-host:6379/0')
+"""
+
+import os
+import time
+import socket
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Optional
+
+from config import JOB_STATE_URL, JOB_STATE_INTERVAL, JOB_STALE_AFTER
+from run_log import get_log
+
+# Statuses of a job that has not finished yet
+ACTIVE_STATUSES = ('queued', 'running')
+
+# Fields a job's owner can update
+FIELDS = ('status', 'progress', 'current_query', 'total_queries', 'leads_found', 'message', 'error')
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS web_jobs (
+        job_id TEXT PRIMARY KEY,
+        status TEXT NOT NULL,
+        progress INTEGER NOT NULL DEFAULT 0,
+        current_query TEXT NOT NULL DEFAULT '',
+        total_queries INTEGER NOT NULL DEFAULT 0,
+        leads_found INTEGER NOT NULL DEFAULT 0,
+        message TEXT NOT NULL DEFAULT '',
+        error TEXT,
+        cancel_requested INTEGER NOT NULL DEFAULT 0,
+        owner TEXT,
+        created_at REAL,
+        updated_at REAL
+    );
+    CREATE INDEX IF NOT EXISTS idx_web_jobs_active ON web_jobs (status, created_at);
+'''
+
+
+def process_owner() -> str:
+    """Identifies this process in a job's owner column"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobState(ABC):
+    """Shared job status store; subclasses keep it somewhere every app process can reach"""
+
+    @abstractmethod
+    def create(self, job_id: str, total_queries: int, message: str = '') -> Dict:
+        """Record a new queued job and return its status"""
+
+    @abstractmethod
+    def update(self, job_id: str, **fields):
+        """Change some of a job's FIELDS (and refresh its heartbeat)"""
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Dict]:
+        """A job's status, or None"""
+
+    @abstractmethod
+    def latest(self) -> Optional[Dict]:
+        """The most recently started job's status, or None"""
+
+    @abstractmethod
+    def active(self) -> List[Dict]:
+        """Jobs that are queued or running, in any process"""
+
+    @abstractmethod
+    def request_cancel(self, job_id: str) -> bool:
+        """Ask the process running a job to stop it; False if it isn't active"""
+
+    @abstractmethod
+    def cancel_requested(self, job_id: str) -> bool:
+        """Whether a job has been asked to stop"""
+
+
+class SqliteJobState(JobState):
+    def __init__(self, path: str, stale_after: float = None):
+        """
+        Open (or create) a SQLite job state file
+
+        Args:
+            path: SQLite file shared by the app processes
+            stale_after: Seconds without a heartbeat before an active job
+                         counts as failed (default: JOB_STALE_AFTER)
+        """
+        self.path = path
+        self.stale_after = stale_after or JOB_STALE_AFTER
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    def _status(self, row) -> Optional[Dict]:
+        """A row as a status dict, failing it first if its owner stopped heartbeating"""
+        if row is None:
+            return None
+        job = dict(row)
+        if job['status'] in ACTIVE_STATUSES and time.time() - job['updated_at'] > self.stale_after:
+            job['status'] = 'failed'
+            job['error'] = 'The process running this job stopped responding'
+            job['message'] = f"Error: {job['error']}"
+            with self._lock, self._conn:
+                self._conn.execute(
+                    'UPDATE web_jobs SET status = ?, error = ?, message = ? WHERE job_id = ? AND updated_at = ?',
+                    (job['status'], job['error'], job['message'], job['job_id'], job['updated_at'])
+                )
+        job['is_running'] = job['status'] in ACTIVE_STATUSES
+        job['cancel_requested'] = bool(job['cancel_requested'])
+        return job
+
+    def create(self, job_id: str, total_queries: int, message: str = '') -> Dict:
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT INTO web_jobs (job_id, status, total_queries, message, owner, created_at, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (job_id, 'queued', total_queries, message, process_owner(), now, now)
+            )
+        return self.get(job_id)
+
+    def update(self, job_id: str, **fields):
+        unknown = set(fields) - set(FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown job state fields: {', '.join(sorted(unknown))}")
+        columns = [f"{field} = ?" for field in fields] + ['updated_at = ?']
+        with self._lock, self._conn:
+            self._conn.execute(f"UPDATE web_jobs SET {', '.join(columns)} WHERE job_id = ?",
+                               (*fields.values(), time.time(), job_id))
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute('SELECT * FROM web_jobs WHERE job_id = ?', (job_id,)).fetchone()
+        return self._status(row)
+
+    def latest(self) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute('SELECT * FROM web_jobs ORDER BY created_at DESC LIMIT 1').fetchone()
+        return self._status(row)
+
+    def active(self) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT * FROM web_jobs WHERE status IN ({', '.join('?' * len(ACTIVE_STATUSES))}) "
+                'ORDER BY created_at', ACTIVE_STATUSES
+            ).fetchall()
+        return [job for job in map(self._status, rows) if job['is_running']]
+
+    def request_cancel(self, job_id: str) -> bool:
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                f"UPDATE web_jobs SET cancel_requested = 1 "
+                f"WHERE job_id = ? AND status IN ({', '.join('?' * len(ACTIVE_STATUSES))})",
+                (job_id, *ACTIVE_STATUSES)
+            )
+        return cursor.rowcount > 0
+
+    def cancel_requested(self, job_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute('SELECT cancel_requested FROM web_jobs WHERE job_id = ?',
+                                     (job_id,)).fetchone()
+        return bool(row and row[0])
+
+
+class JobReporter:
+    """
+    Publishes a running job's progress to the shared state
+
+    Progress callbacks only change a dict in memory; a background thread
+    writes the latest values every JOB_STATE_INTERVAL seconds (which doubles
+    as the job's heartbeat) and passes cancellation requests made from any
+    process on to the job's JobControl.
+    """
+
+    def __init__(self, state: JobState, job_id: str, control=None, interval: float = None):
+        """
+        Start publishing
+
+        Args:
+            state: Shared job state
+            job_id: Job being reported
+            control: JobControl to cancel when another process asks to
+            interval: Seconds between writes (default: JOB_STATE_INTERVAL)
+        """
+        self.state = state
+        self.job_id = job_id
+        self.control = control
+        self.interval = interval or JOB_STATE_INTERVAL
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._publish, name='job-state', daemon=True)
+        self._thread.start()
+
+    def set(self, **fields):
+        """Record new progress; it is written at the next interval"""
+        with self._lock:
+            self._pending.update(fields)
+
+    def flush(self):
+        """Write pending progress now (an empty write still refreshes the heartbeat)"""
+        with self._lock:
+            fields, self._pending = self._pending, {}
+        self.state.update(self.job_id, **fields)
+
+    def _publish(self):
+        """Heartbeat loop; a failed write is logged and never stops it"""
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                fields, self._pending = self._pending, {}
+            try:
+                self.state.update(self.job_id, **fields)
+                if self.control is not None and not self.control.cancelled \
+                        and self.state.cancel_requested(self.job_id):
+                    self.control.cancel()
+            except sqlite3.OperationalError:
+                # A busy database only delays this update
+                with self._lock:
+                    self._pending = {**fields, **self._pending}
+            except Exception as e:
+                # Drop the fields that failed (e.g. a value the store can't
+                # serialize) so the next heartbeat can still be written
+                get_log().error('job_state_failed', "❌ Could not publish job {job_id} state: {error}",
+                                job_id=self.job_id, error=repr(e))
+
+    def close(self, **fields):
+        """Stop publishing and write the job's final state"""
+        self._stop.set()
+        self._thread.join()
+        self.set(**fields)
+        self.flush()
+
+
+# Job state stores by URL scheme: factory(url) -> JobState
+JOB_STATES: Dict[str, Callable[[str], JobState]] = {}
+
+
+def register_job_state(scheme: str, factory: Callable[[str], JobState]):
+    """Make get_job_state() build stores for URLs with this scheme"""
+    JOB_STATES[scheme] = factory
+
+
+def _sqlite_job_state(url: str) -> SqliteJobState:
+    """sqlite:///data/web_jobs.db (relative path) or sqlite:////srv/web_jobs.db (absolute)"""
+    if not url.startswith('sqlite:///'):
+        raise ValueError(f"SQLite job state URLs look like sqlite:///data/web_jobs.db, not {url}")
+    return SqliteJobState(url[len('sqlite:///'):])
+
+
+register_job_state('sqlite', _sqlite_job_state)
+
+_job_states = {}
+_job_states_lock = threading.Lock()
+
+
+def get_job_state(url: str = None) -> JobState:
+    """
+    Return the shared job state store for a URL
+
+    Args:
+        url: Store URL (default: LEADSCRAPER_JOB_STATE or JOB_STATE_URL)
+    """
+    url = url or os.getenv('LEADSCRAPER_JOB_STATE') or JOB_STATE_URL
+    scheme = url.split('://', 1)[0]
+    if scheme not in JOB_STATES:
+        raise ValueError(f"No job state store registered for {scheme}:// (known: {', '.join(sorted(JOB_STATES))})")
+    with _job_states_lock:
+        if url not in _job_states:
+            _job_states[url] = JOB_STATES[scheme](url)
+        return _job_states[url]
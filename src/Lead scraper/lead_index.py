@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Lead Index - In-memory indexes for browsing a job's leads
+Leads are indexed as they arrive: a sorted rating array plus one integer
+bitmap (bit i = row i) per type, per search query and for "has email".
+Filters become a few bitwise ANDs, so paging through a large job never
+walks every lead.
+"""
+
+import bisect
+import threading
+from typing import Dict, Iterable, List
+
+SORT_FIELDS = ('rating', 'reviews', 'name', 'newest')
+
+
+def _number(value) -> float:
+    """Numeric value of a rating/review column (0 when missing)"""
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _bits(mask: int) -> str:
+    """Bitmap as a string where character i is '1' if row i is set"""
+    return bin(mask)[:1:-1]
+
+
+def _rows(mask: int) -> List[int]:
+    """Row numbers set in a bitmap, ascending"""
+    return [row for row, bit in enumerate(_bits(mask)) if bit == '1']
+
+
+def _mask(rows: Iterable[int], size: int) -> int:
+    """Bitmap with the given rows set (built in one pass, not one shift per row)"""
+    buffer = bytearray((size + 7) // 8)
+    for row in rows:
+        buffer[row >> 3] |= 1 << (row & 7)
+    return int.from_bytes(buffer, 'little')
+
+
+class LeadIndex:
+    def __init__(self, leads: Iterable[Dict] = None):
+        """
+        Build an index, optionally from leads already scraped
+
+        Args:
+            leads: Lead dictionaries to index straight away
+        """
+        self._lock = threading.Lock()
+        self._leads = []
+        self._ratings = []  # Sorted ratings...
+        self._rating_rows = []  # ...and the row each one belongs to
+        self._types = {}
+        self._queries = {}
+        self._with_email = 0
+
+        for lead in leads or []:
+            self.add(lead)
+
+    def __len__(self) -> int:
+        return len(self._leads)
+
+    def add(self, lead: Dict):
+        """Index one lead (called as each lead reaches the sink)"""
+        with self._lock:
+            row = len(self._leads)
+            bit = 1 << row
+            self._leads.append(lead)
+
+            rating = _number(lead.get('rating'))
+            position = bisect.bisect_right(self._ratings, rating)
+            self._ratings.insert(position, rating)
+            self._rating_rows.insert(position, row)
+
+            for place_type in str(lead.get('types') or '').split(','):
+                place_type = place_type.strip()
+                if place_type:
+                    self._types[place_type] = self._types.get(place_type, 0) | bit
+
+            query = lead.get('query_used') or ''
+            self._queries[query] = self._queries.get(query, 0) | bit
+
+            if lead.get('emails'):
+                self._with_email |= bit
+
+    def types(self) -> Dict[str, int]:
+        """Lead count per place type, most common first"""
+        with self._lock:
+            counts = {place_type: bin(mask).count('1') for place_type, mask in self._types.items()}
+        return dict(sorted(counts.items(), key=lambda item: -item[1]))
+
+    def search(self, min_rating: float = None, has_email: bool = None, place_type: str = None,
+               query: str = None, sort: str = 'rating', descending: bool = True,
+               page: int = 1, per_page: int = 50) -> Dict:
+        """
+        Filter, sort and page the indexed leads
+
+        Args:
+            min_rating: Only leads rated at least this
+            has_email: Only leads with (True) or without (False) emails
+            place_type: Only leads of this Google place type (e.g. "cafe")
+            query: Only leads found by this search term
+            sort: One of SORT_FIELDS
+            descending: Sort order
+            page: 1-based page number
+            per_page: Leads per page
+
+        Returns:
+            Dictionary with 'leads' (this page), 'total', 'page' and 'per_page'
+        """
+        if sort not in SORT_FIELDS:
+            raise ValueError(f"Unsupported sort field: {sort}")
+        page = max(page, 1)
+        per_page = max(per_page, 1)
+        start = (page - 1) * per_page
+
+        with self._lock:
+            size = len(self._leads)
+            mask = (1 << size) - 1
+
+            if place_type is not None:
+                mask &= self._types.get(place_type, 0)
+            if query is not None:
+                mask &= self._queries.get(query, 0)
+            if has_email is not None:
+                mask &= self._with_email if has_email else ~self._with_email
+            rating_start = 0
+            if min_rating is not None:
+                rating_start = bisect.bisect_left(self._ratings, min_rating)
+                mask &= _mask(self._rating_rows[rating_start:], size)
+
+            total = bin(mask).count('1')
+
+            if sort == 'rating':
+                # Walk the rating index and keep only the rows that matched
+                bits = _bits(mask)
+                ordered = self._rating_rows[rating_start:]
+                if descending:
+                    ordered = reversed(ordered)
+                page_rows = []
+                matched = 0
+                for row in ordered:
+                    if row < len(bits) and bits[row] == '1':
+                        if matched >= start:
+                            page_rows.append(row)
+                            if len(page_rows) == per_page:
+                                break
+                        matched += 1
+            else:
+                rows = _rows(mask)
+                if sort == 'reviews':
+                    rows.sort(key=lambda row: _number(self._leads[row].get('total_reviews')), reverse=descending)
+                elif sort == 'name':
+                    rows.sort(key=lambda row: str(self._leads[row].get('name', '')).lower(), reverse=descending)
+                elif descending:
+                    rows.reverse()
+                page_rows = rows[start:start + per_page]
+
+            leads = [self._leads[row] for row in page_rows]
+
+        return {'leads': leads, 'total': total, 'page': page, 'per_page': per_page}
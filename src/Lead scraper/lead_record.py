@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Lead Record - Compact in-memory representation of a lead
+A lead is a slotted object instead of a 12-key dict. Fields that repeat
+across a job (query, types, business status, price level) are interned so
+every lead shares one string, and scraped_at is kept as a float timestamp
+until it is written out. LeadRecord still behaves like a dict
+(lead['name'], lead.get('website'), dict(lead)), and lead_row() is the one
+serializer every exporter uses.
+"""
+
+import sys
+import threading
+from collections.abc import MutableMapping
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Sequence
+
+# Column order for lead files
+LEAD_FIELDS = [
+    'name', 'address', 'phone', 'website', 'rating', 'total_reviews',
+    'price_level', 'business_status', 'types', 'place_id', 'query_used',
+    'scraped_at'
+]
+
+# Fields with few distinct values per job, stored as shared interned strings
+CATEGORICAL_FIELDS = ('price_level', 'business_status', 'types', 'query_used')
+
+_FIELDS = tuple(LEAD_FIELDS) + ('emails',)
+_FIELD_SET = frozenset(_FIELDS)
+
+# Joined type strings by the tuple of types they came from
+_types_cache = {}
+_types_cache_lock = threading.Lock()
+
+
+def _intern(value):
+    """Intern strings so repeated values share one object"""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def join_types(types: Sequence[str]) -> str:
+    """
+    Comma-join a place's types, reusing the string for type lists seen before
+
+    Args:
+        types: Google place types (e.g. ["cafe", "food"])
+
+    Returns:
+        Interned "cafe, food" string
+    """
+    key = tuple(types)
+    joined = _types_cache.get(key)
+    if joined is None:
+        joined = sys.intern(', '.join(key))
+        with _types_cache_lock:
+            _types_cache[key] = joined
+    return joined
+
+
+class LeadRecord(MutableMapping):
+    """One lead, stored in slots; unknown keys go to a small overflow dict"""
+
+    __slots__ = _FIELDS + ('_extra',)
+
+    def __init__(self, values: Dict = None, **fields):
+        if values:
+            fields = {**values, **fields}
+        for key, value in fields.items():
+            self[key] = value
+
+    def __getitem__(self, key):
+        if key in _FIELD_SET:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        try:
+            return self._extra[key]
+        except (AttributeError, KeyError):
+            raise KeyError(key) from None
+
+    def __setitem__(self, key, value):
+        if key in _FIELD_SET:
+            if key in CATEGORICAL_FIELDS:
+                value = _intern(value)
+            elif key == 'scraped_at' and isinstance(value, datetime):
+                value = value.timestamp()
+            setattr(self, key, value)
+            return
+        try:
+            self._extra[key] = value
+        except AttributeError:
+            self._extra = {key: value}
+
+    def __delitem__(self, key):
+        if key in _FIELD_SET:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+            return
+        try:
+            del self._extra[key]
+        except (AttributeError, KeyError):
+            raise KeyError(key) from None
+
+    def __iter__(self) -> Iterator[str]:
+        for key in _FIELDS:
+            if hasattr(self, key):
+                yield key
+        yield from getattr(self, '_extra', ())
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"LeadRecord({lead_row(self)!r})"
+
+    def to_dict(self) -> Dict:
+        """Plain dict with serialized values (see lead_row)"""
+        return lead_row(self)
+
+
+def _serialize(key: str, value):
+    """Format one field for CSV/Excel/JSON output"""
+    if value is None:
+        return ''
+    if key == 'scraped_at' and isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value).isoformat()
+    return value
+
+
+def lead_row(lead, fields: Iterable[str] = None) -> Dict:
+    """
+    Serialize a lead (LeadRecord or plain dict) for output
+
+    Args:
+        lead: Lead to serialize
+        fields: Columns to include, in order (default: every field the lead has)
+
+    Returns:
+        Dict of column -> value, with scraped_at as an ISO timestamp and
+        missing fields as empty strings
+    """
+    keys = lead.keys() if fields is None else fields
+    return {key: _serialize(key, lead.get(key)) for key in keys}
+
+
+def lead_rows(leads: Iterable, fields: Iterable[str] = None) -> List[Dict]:
+    """Serialize many leads (see lead_row)"""
+    if fields is not None:
+        fields = list(fields)
+    return [lead_row(lead, fields) for lead in leads]
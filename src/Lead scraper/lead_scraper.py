@@ -4,17 +4,35 @@ Lead Scraper - Extract business information using Google Places API
 """
 
 import os
+import csv
 import json
 import time
-import pandas as pd
 from datetime import datetime
 from dotenv import load_dotenv
-import googlemaps
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple, Union
+from location_resolver import LocationResolver
+from lead_store import get_lead_store
+from lead_record import LeadRecord, LEAD_FIELDS, join_types, lead_rows
+from cassette import cassette_session
+from metrics import get_metrics, job_context
+from profiling import profile_run, take_profile_flag
+from run_log import get_log
 
 # Load environment variables
 load_dotenv()
 
+# Place Details fields requested for every lead
+DETAIL_FIELDS = [
+    'name', 'formatted_address', 'formatted_phone_number', 
+    'website', 'rating', 'user_ratings_total', 'price_level',
+    'opening_hours', 'type', 'business_status'
+]
+
+def count_api_error(endpoint: str, error: Exception):
+    """Count a failed Places API request by its status (OVER_QUERY_LIMIT, REQUEST_DENIED, ...)"""
+    status = getattr(error, 'status', None) or type(error).__name__
+    get_metrics().inc('places_api_errors', endpoint=endpoint, status=status)
+
 class LeadScraper:
     def __init__(self, api_key=None):
         """Initialize the lead scraper with Google API key"""
@@ -22,68 +40,169 @@ class LeadScraper:
         if not self.api_key:
             raise ValueError("Google API key not found in environment variables or provided parameter")
         
-        self.gmaps = googlemaps.Client(key=self.api_key)
+        # Imported here rather than at the top, so entry points that never build
+        # a scraper don't pay for it at startup (see benchmarks/import_time.py)
+        import googlemaps
+        
+        # PLACES_API_BASE_URL points the client at a local stand-in (see benchmarks/);
+        # LEADSCRAPER_CASSETTE records or replays its traffic (see cassette.py)
+        self.gmaps = googlemaps.Client(
+            key=self.api_key,
+            base_url=os.getenv('PLACES_API_BASE_URL', 'https://maps.googleapis.com'),
+            requests_session=cassette_session()
+        )
+        self.location_resolver = LocationResolver(self.gmaps.geocode)
         self.results = []
+        self.job_id = None
         
-    def search_places(self, query: str, location: str = None, radius: int = 5000) -> List[Dict]:
+    def resolve_location(self, location: Union[str, Tuple[float, float], None]) -> Optional[Tuple[float, float]]:
+        """
+        Turn a location into explicit (lat, lng) coordinates
+        
+        Args:
+            location: Location string (e.g., "London, UK") or (lat, lng) tuple
+        
+        Returns:
+            (lat, lng) tuple, or None if the location can't be resolved
+        """
+        if not location:
+            return None
+        if isinstance(location, (tuple, list)):
+            return tuple(location)
+        return self.location_resolver.latlng(location)
+    
+    def search_places(self, query: str, location: Union[str, Tuple[float, float]] = None, radius: int = 5000) -> List[Dict]:
         """
         Search for places using Google Places API
         
         Args:
             query: Search term (e.g., "restaurants", "coffee shops")
-            location: Location to search around (e.g., "London, UK")
+            location: Location to search around, as a string (e.g., "London, UK")
+                      resolved once through the geocode cache, or a (lat, lng) tuple
             radius: Search radius in meters (default: 5000m = 5km)
         
         Returns:
             List of place dictionaries
         """
         try:
-            print(f"🔍 Searching for: {query}")
+            log = get_log()
+            log.info('search', "🔍 Searching for: {query}", query=query)
+            coordinates = self.resolve_location(location)
             if location:
-                print(f"📍 Location: {location}")
-                print(f"📏 Radius: {radius}m")
+                log.debug('search_area', "📍 Location: {location}\n📏 Radius: {radius}m",
+                          location=str(location), radius=radius)
             
-            # Perform the search
-            places_result = self.gmaps.places(
-                query=query,
-                location=location,
-                radius=radius
-            )
+            # Perform the search around explicit coordinates; if the location
+            # couldn't be geocoded, fall back to putting it in the query text
+            metrics = get_metrics()
+            metrics.api_request('textsearch')
+            with metrics.timer('search'):
+                if coordinates:
+                    places_result = self.gmaps.places(
+                        query=query,
+                        location=coordinates,
+                        radius=radius
+                    )
+                elif location:
+                    places_result = self.gmaps.places(query=f"{query} in {location}")
+                else:
+                    places_result = self.gmaps.places(query=query)
             
             places = places_result.get('results', [])
-            print(f"✅ Found {len(places)} places")
+            log.info('search_done', "✅ Found {count} places", query=query, count=len(places))
             
             return places
             
         except Exception as e:
-            print(f"❌ Error searching places: {str(e)}")
+            count_api_error('textsearch', e)
+            get_log().error('search_failed', "❌ Error searching places: {error}", query=query, error=str(e))
             return []
     
-    def get_place_details(self, place_id: str) -> Optional[Dict]:
+    def get_place_details(self, place_id: str, fields: List[str] = None) -> Optional[Dict]:
         """
         Get detailed information for a specific place
         
         Args:
             place_id: Google Places place_id
+            fields: Place Details fields to request (default: DETAIL_FIELDS);
+                    fewer fields cost less per call
         
         Returns:
             Dictionary with detailed place information
         """
         try:
-            place_details = self.gmaps.place(
-                place_id=place_id,
-                fields=['name', 'formatted_address', 'formatted_phone_number', 
-                       'website', 'rating', 'user_ratings_total', 'price_level',
-                       'opening_hours', 'type', 'business_status']
-            )
+            metrics = get_metrics()
+            metrics.api_request('details')
+            with metrics.timer('details'):
+                place_details = self.gmaps.place(
+                    place_id=place_id,
+                    fields=fields or DETAIL_FIELDS
+                )
             
             return place_details.get('result', {})
             
         except Exception as e:
-            print(f"❌ Error getting place details for {place_id}: {str(e)}")
+            count_api_error('details', e)
+            get_log().warning('details_failed', "❌ Error getting place details for {place_id}: {error}",
+                              place_id=place_id, error=str(e))
             return None
     
-    def scrape_leads(self, queries: List[str], location: str = None, max_results: int = 20) -> List[Dict]:
+    def build_lead(self, place: Dict, details: Dict, query: str) -> Dict:
+        """
+        Combine basic search and detailed place information into a lead
+        
+        Args:
+            place: Place dictionary from a search result
+            details: Place details for the same place_id
+            query: Search term that found the place
+        
+        Returns:
+            LeadRecord (a compact, dict-like lead; see lead_record.py)
+        """
+        return LeadRecord(
+            name=details.get('name', place.get('name', '')),
+            address=details.get('formatted_address', place.get('formatted_address', '')),
+            phone=details.get('formatted_phone_number', ''),
+            website=details.get('website', ''),
+            rating=details.get('rating', 0),
+            total_reviews=details.get('user_ratings_total', 0),
+            price_level=details.get('price_level', ''),
+            business_status=details.get('business_status', ''),
+            types=join_types(details.get('type', [])),
+            place_id=place.get('place_id', ''),
+            query_used=query,
+            scraped_at=time.time()
+        )
+    
+    def output_filename(self, extension: str, search_terms: list = None, prefix: str = 'leads') -> str:
+        """
+        Build a timestamped output filename
+        
+        Args:
+            extension: File extension without the dot (e.g., "csv")
+            search_terms: List of search terms used
+            prefix: Filename prefix
+        
+        Returns:
+            Filename such as leads_coffee_shops_20250917_162922.csv
+        """
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        
+        if search_terms:
+            # Create filename with search terms
+            search_terms_clean = '_'.join([term.replace(' ', '_').replace(',', '') for term in search_terms[:3]])
+            if len(search_terms) > 3:
+                search_terms_clean += f"_and_{len(search_terms)-3}_more"
+            
+            # Limit filename length
+            if len(search_terms_clean) > 50:
+                search_terms_clean = search_terms_clean[:50]
+            
+            return f"{prefix}_{search_terms_clean}_{timestamp}.{extension}"
+        
+        return f"{prefix}_{timestamp}.{extension}"
+    
+    def scrape_leads(self, queries: List[str], location: str = None, max_results: int = 20, radius: int = 5000) -> List[Dict]:
         """
         Scrape leads for multiple search queries
         
@@ -91,53 +210,58 @@ class LeadScraper:
             queries: List of search terms
             location: Location to search around
             max_results: Maximum number of results per query
+            radius: Search radius in meters
         
         Returns:
             List of lead dictionaries
         """
         all_leads = []
         
-        for query in queries:
-            print(f"\n{'='*50}")
-            print(f"Processing query: {query}")
-            print(f"{'='*50}")
-            
-            # Search for places
-            places = self.search_places(query, location)
-            
-            # Limit results
-            places = places[:max_results]
+        # Every lead is upserted into the lead store under this job as it is built
+        store = get_lead_store()
+        self.job_id = store.start_job('scrape', queries, location,
+                                      name=os.path.splitext(self.output_filename('csv', queries))[0])
+        
+        # Time and API use below are attributed to this job (see metrics.py)
+        metrics = get_metrics()
+        log = get_log()
+        with job_context(self.job_id):
+            # Geocode once per job; every query then searches the same coordinates
+            coordinates = self.resolve_location(location) or location
+            progress = log.progress('places', total=len(queries) * max_results)
             
-            for i, place in enumerate(places, 1):
-                print(f"\n📋 Processing place {i}/{len(places)}: {place.get('name', 'Unknown')}")
+            for query in queries:
+                log.debug('query', "\n{rule}\nProcessing query: {query}\n{rule}", rule='=' * 50, query=query)
+                
+                # Search for places
+                places = self.search_places(query, coordinates, radius)
                 
-                # Get detailed information
-                place_id = place.get('place_id')
-                if place_id:
-                    details = self.get_place_details(place_id)
-                    if details:
-                        # Combine basic and detailed information
-                        lead = {
-                            'name': details.get('name', place.get('name', '')),
-                            'address': details.get('formatted_address', place.get('formatted_address', '')),
-                            'phone': details.get('formatted_phone_number', ''),
-                            'website': details.get('website', ''),
-                            'rating': details.get('rating', 0),
-                            'total_reviews': details.get('user_ratings_total', 0),
-                            'price_level': details.get('price_level', ''),
-                            'business_status': details.get('business_status', ''),
-                            'types': ', '.join(details.get('type', [])),
-                            'place_id': place_id,
-                            'query_used': query,
-                            'scraped_at': datetime.now().isoformat()
-                        }
-                        
-                        all_leads.append(lead)
-                        print(f"✅ Added: {lead['name']}")
+                # Limit results
+                places = places[:max_results]
                 
-                # Add delay to respect API rate limits
-                time.sleep(0.1)
+                for i, place in enumerate(places, 1):
+                    log.debug('place', "\n📋 Processing place {i}/{count}: {name}",
+                              i=i, count=len(places), name=place.get('name', 'Unknown'))
+                    
+                    # Get detailed information
+                    added = 0
+                    place_id = place.get('place_id')
+                    if place_id:
+                        details = self.get_place_details(place_id)
+                        if details:
+                            lead = self.build_lead(place, details, query)
+                            all_leads.append(lead)
+                            with metrics.timer('write'):
+                                store.upsert(lead, self.job_id)
+                            added = 1
+                            log.debug('lead_added', "✅ Added: {name}", name=lead['name'], place_id=place_id)
+                    progress.update(leads=added)
+                    
+                    # Add delay to respect API rate limits
+                    time.sleep(0.1)
+            progress.close()
         
+        store.finish_job(self.job_id)
         self.results = all_leads
         return all_leads
     
@@ -157,30 +281,22 @@ class LeadScraper:
             return None
         
         if not filename:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            
-            if search_terms:
-                # Create filename with search terms
-                search_terms_clean = '_'.join([term.replace(' ', '_').replace(',', '') for term in search_terms[:3]])
-                if len(search_terms) > 3:
-                    search_terms_clean += f"_and_{len(search_terms)-3}_more"
-                
-                # Limit filename length
-                if len(search_terms_clean) > 50:
-                    search_terms_clean = search_terms_clean[:50]
-                
-                filename = f"leads_{search_terms_clean}_{timestamp}.csv"
-            else:
-                filename = f"leads_{timestamp}.csv"
+            filename = self.output_filename('csv', search_terms)
         
         filepath = os.path.join('data', filename)
         
         # Create data directory if it doesn't exist
         os.makedirs('data', exist_ok=True)
         
-        # Convert to DataFrame and save
-        df = pd.DataFrame(self.results)
-        df.to_csv(filepath, index=False)
+        # Columns in the order they first appear, as a DataFrame would have them
+        with job_context(self.job_id), get_metrics().timer('export'):
+            rows = lead_rows(self.results)
+            fieldnames = list(dict.fromkeys(key for row in rows for key in row))
+            with open(filepath, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=fieldnames, restval='')
+                writer.writeheader()
+                writer.writerows(rows)
+        get_lead_store().record_export(filepath, self.job_id, len(self.results))
         
         print(f"💾 Saved {len(self.results)} leads to: {filepath}")
         return filepath
@@ -201,30 +317,19 @@ class LeadScraper:
             return None
         
         if not filename:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            
-            if search_terms:
-                # Create filename with search terms
-                search_terms_clean = '_'.join([term.replace(' ', '_').replace(',', '') for term in search_terms[:3]])
-                if len(search_terms) > 3:
-                    search_terms_clean += f"_and_{len(search_terms)-3}_more"
-                
-                # Limit filename length
-                if len(search_terms_clean) > 50:
-                    search_terms_clean = search_terms_clean[:50]
-                
-                filename = f"leads_{search_terms_clean}_{timestamp}.xlsx"
-            else:
-                filename = f"leads_{timestamp}.xlsx"
+            filename = self.output_filename('xlsx', search_terms)
         
         filepath = os.path.join('data', filename)
         
         # Create data directory if it doesn't exist
         os.makedirs('data', exist_ok=True)
         
-        # Convert to DataFrame and save
-        df = pd.DataFrame(self.results)
-        df.to_excel(filepath, index=False)
+        # Convert to DataFrame and save (pandas is only loaded for Excel output)
+        with job_context(self.job_id), get_metrics().timer('export'):
+            import pandas as pd
+            df = pd.DataFrame(lead_rows(self.results))
+            df.to_excel(filepath, index=False)
+        get_lead_store().record_export(filepath, self.job_id, len(self.results))
         
         print(f"💾 Saved {len(self.results)} leads to: {filepath}")
         return filepath
@@ -267,6 +372,8 @@ def main():
             print(f"\n📁 Files saved:")
             print(f"   CSV: {csv_file}")
             print(f"   Excel: {excel_file}")
+            
+            get_metrics().save_run_summary(csv_file, scraper.job_id)
         
     except Exception as e:
         print(f"❌ Error: {str(e)}")
@@ -275,4 +382,6 @@ def main():
     return 0
 
 if __name__ == "__main__":
-    exit(main())
+    with profile_run(take_profile_flag()):
+        code = main()
+    exit(code)
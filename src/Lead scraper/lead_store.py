@@ -0,0 +1,545 @@
+#!/usr/bin/env python3
+"""
+Lead Store - One SQLite database for every scraped lead
+Leads are upserted by place_id, so re-scraping a business updates its row
+instead of adding another full copy of it in another CSV. Jobs remember
+which leads they produced, and CSV/Excel files become exports generated on
+demand and listed from the catalog. A job's leads (and its exports) show
+each business as currently stored, which may be a later scrape by another
+job, not a snapshot of what that job saw.
+
+Usage:
+    python3 lead_store.py import data/*.csv
+    python3 lead_store.py export [--job JOB_ID] [--format xlsx] [--has-email]
+    python3 lead_store.py stats
+"""
+
+import os
+import csv
+import sys
+import time
+import uuid
+import sqlite3
+import hashlib
+import argparse
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from config import LEAD_DB_FILE, OUTPUT_DIRECTORY
+from circuit_breaker import host_for
+from lead_record import lead_row, lead_rows
+from metrics import get_metrics, job_context
+
+# Columns stored for every lead, in export order
+STORE_FIELDS = [
+    'name', 'address', 'phone', 'website', 'rating', 'total_reviews',
+    'price_level', 'business_status', 'types', 'place_id', 'query_used',
+    'scraped_at', 'emails'
+]
+
+EXPORT_FORMATS = ('csv', 'xlsx')
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS leads (
+        lead_key TEXT PRIMARY KEY,
+        place_id TEXT,
+        name TEXT,
+        address TEXT,
+        phone TEXT,
+        website TEXT,
+        domain TEXT,
+        rating REAL,
+        total_reviews INTEGER,
+        price_level TEXT,
+        business_status TEXT,
+        types TEXT,
+        query_used TEXT,
+        scraped_at TEXT,
+        emails TEXT,
+        has_email INTEGER NOT NULL DEFAULT 0,
+        updated_at REAL
+    );
+    CREATE INDEX IF NOT EXISTS idx_leads_query ON leads (query_used);
+    CREATE INDEX IF NOT EXISTS idx_leads_domain ON leads (domain);
+    CREATE INDEX IF NOT EXISTS idx_leads_scraped_at ON leads (scraped_at);
+    CREATE INDEX IF NOT EXISTS idx_leads_has_email ON leads (has_email);
+
+    CREATE TABLE IF NOT EXISTS jobs (
+        job_id TEXT PRIMARY KEY,
+        name TEXT,
+        kind TEXT,
+        queries TEXT,
+        location TEXT,
+        status TEXT,
+        lead_count INTEGER NOT NULL DEFAULT 0,
+        created_at REAL,
+        finished_at REAL
+    );
+    CREATE INDEX IF NOT EXISTS idx_jobs_created_at ON jobs (created_at);
+
+    CREATE TABLE IF NOT EXISTS job_leads (
+        job_id TEXT NOT NULL,
+        lead_key TEXT NOT NULL,
+        PRIMARY KEY (job_id, lead_key)
+    );
+
+    CREATE TABLE IF NOT EXISTS exports (
+        filename TEXT PRIMARY KEY,
+        job_id TEXT,
+        format TEXT,
+        path TEXT,
+        lead_count INTEGER,
+        size INTEGER,
+        created_at REAL
+    );
+    CREATE INDEX IF NOT EXISTS idx_exports_job ON exports (job_id);
+    CREATE INDEX IF NOT EXISTS idx_exports_created_at ON exports (created_at);
+'''
+
+# Columns a newer scrape replaces; emails are kept unless new ones are found
+_UPDATED_COLUMNS = [
+    'name', 'address', 'phone', 'website', 'domain', 'rating', 'total_reviews',
+    'price_level', 'business_status', 'types', 'query_used', 'scraped_at', 'updated_at'
+]
+_NEWER = "excluded.scraped_at >= COALESCE(leads.scraped_at, '')"
+
+UPSERT_SQL = '''
+    INSERT INTO leads (lead_key, place_id, name, address, phone, website, domain,
+                       rating, total_reviews, price_level, business_status, types,
+                       query_used, scraped_at, emails, has_email, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (lead_key) DO UPDATE SET
+        ''' + ',\n        '.join(
+    f"{column} = CASE WHEN {_NEWER} THEN excluded.{column} ELSE leads.{column} END"
+    for column in _UPDATED_COLUMNS
+) + ''',
+        emails = COALESCE(NULLIF(excluded.emails, ''), leads.emails),
+        has_email = MAX(excluded.has_email, leads.has_email)
+'''
+
+
+def _text(value) -> str:
+    """Store missing values (None, NaN) as empty strings"""
+    if value is None or value != value:
+        return ''
+    return str(value).strip()
+
+
+def _number(value, cast):
+    """Parse a numeric column, None when empty"""
+    try:
+        text = _text(value)
+        return cast(float(text)) if text else None
+    except ValueError:
+        return None
+
+
+def lead_key(lead: Dict) -> str:
+    """
+    Key a lead is stored under
+
+    The place_id when there is one; otherwise a hash of name and address, so
+    leads from sources without place_ids still dedupe on re-import.
+    """
+    place_id = _text(lead.get('place_id'))
+    if place_id:
+        return place_id
+    identity = f"{_text(lead.get('name')).lower()}|{_text(lead.get('address')).lower()}"
+    return 'nopid:' + hashlib.sha1(identity.encode('utf-8')).hexdigest()[:16]
+
+
+class LeadStore:
+    def __init__(self, path: str = None, export_dir: str = None):
+        """
+        Open (or create) the lead database
+
+        Args:
+            path: SQLite file holding leads, jobs and the export catalog
+            export_dir: Directory exports are written to
+        """
+        self.path = path or LEAD_DB_FILE
+        self.export_dir = export_dir or OUTPUT_DIRECTORY
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    # Writes
+
+    def _row(self, lead: Dict) -> tuple:
+        """Column values for the upsert statement"""
+        lead = lead_row(lead, STORE_FIELDS)
+        website = _text(lead.get('website'))
+        emails = _text(lead.get('emails'))
+        return (
+            lead_key(lead),
+            _text(lead.get('place_id')),
+            _text(lead.get('name')),
+            _text(lead.get('address')),
+            _text(lead.get('phone')),
+            website,
+            host_for(website) if website else '',
+            _number(lead.get('rating'), float),
+            _number(lead.get('total_reviews'), int),
+            _text(lead.get('price_level')),
+            _text(lead.get('business_status')),
+            _text(lead.get('types')),
+            _text(lead.get('query_used')),
+            _text(lead.get('scraped_at')),
+            emails,
+            1 if emails else 0,
+            time.time()
+        )
+
+    def upsert(self, lead: Dict, job_id: str = None) -> str:
+        """Insert or update one lead, linking it to a job; returns its key"""
+        return self.upsert_many([lead], job_id)[0] if lead else None
+
+    def upsert_many(self, leads: Iterable[Dict], job_id: str = None) -> List[str]:
+        """
+        Insert or update leads in one transaction
+
+        Newer scrapes replace older ones, and an empty emails value never
+        overwrites emails found earlier.
+
+        Args:
+            leads: Lead dictionaries (LEAD_FIELDS plus optional 'emails')
+            job_id: Optional job the leads belong to
+
+        Returns:
+            Keys of the stored leads
+        """
+        rows = [self._row(lead) for lead in leads]
+        with self._lock, self._conn:
+            self._conn.executemany(UPSERT_SQL, rows)
+            if job_id:
+                self._conn.executemany(
+                    'INSERT OR IGNORE INTO job_leads (job_id, lead_key) VALUES (?, ?)',
+                    [(job_id, row[0]) for row in rows]
+                )
+                self._conn.execute(
+                    'UPDATE jobs SET lead_count = (SELECT COUNT(*) FROM job_leads WHERE job_id = ?) '
+                    'WHERE job_id = ?', (job_id, job_id)
+                )
+        return [row[0] for row in rows]
+
+    def start_job(self, kind: str, queries: List[str] = None, location: str = None,
+                  name: str = None, job_id: str = None) -> str:
+        """
+        Record a new job
+
+        Args:
+            kind: What produced the leads (e.g. "scrape", "web", "import")
+            queries: Search terms used
+            location: Location searched
+            name: Base filename for the job's exports
+            job_id: Optional id to use (default: a new random id)
+
+        Returns:
+            The job id
+        """
+        job_id = job_id or uuid.uuid4().hex[:12]
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO jobs (job_id, name, kind, queries, location, status, created_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (job_id, name or f"leads_{job_id}", kind, ', '.join(queries or []),
+                 str(location) if location else '', 'running', time.time())
+            )
+        return job_id
+
+    def finish_job(self, job_id: str, status: str = 'completed'):
+        """Mark a job as finished"""
+        with self._lock, self._conn:
+            self._conn.execute('UPDATE jobs SET status = ?, finished_at = ? WHERE job_id = ?',
+                               (status, time.time(), job_id))
+
+    # Reads
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        """A job's catalog entry, or None"""
+        with self._lock:
+            row = self._conn.execute('SELECT * FROM jobs WHERE job_id = ?', (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def leads(self, job_id: str = None, query: str = None, domain: str = None,
+              has_email: bool = None, since: str = None) -> List[Dict]:
+        """
+        Stored leads, newest scrape first
+
+        Args:
+            job_id: Only leads produced by this job
+            query: Only leads found by this search term
+            domain: Only leads whose website is on this domain
+            has_email: Only leads with (True) or without (False) emails
+            since: Only leads scraped at or after this ISO timestamp
+
+        Returns:
+            Lead dictionaries with STORE_FIELDS keys
+        """
+        sql = f"SELECT {', '.join('l.' + field for field in STORE_FIELDS)} FROM leads l"
+        clauses = []
+        params = []
+        if job_id:
+            sql += ' JOIN job_leads j ON j.lead_key = l.lead_key'
+            clauses.append('j.job_id = ?')
+            params.append(job_id)
+        if query:
+            clauses.append('l.query_used = ?')
+            params.append(query)
+        if domain:
+            clauses.append('l.domain = ?')
+            params.append(host_for(domain))
+        if has_email is not None:
+            clauses.append('l.has_email = ?')
+            params.append(1 if has_email else 0)
+        if since:
+            clauses.append('l.scraped_at >= ?')
+            params.append(since)
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += ' ORDER BY l.scraped_at DESC'
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [{field: '' if row[field] is None else row[field] for field in STORE_FIELDS}
+                for row in rows]
+
+    def count(self) -> Dict:
+        """Lead, email and job totals"""
+        with self._lock:
+            leads, with_email = self._conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(has_email), 0) FROM leads').fetchone()
+            jobs = self._conn.execute('SELECT COUNT(*) FROM jobs').fetchone()[0]
+            exports = self._conn.execute('SELECT COUNT(*) FROM exports').fetchone()[0]
+        return {'leads': leads, 'with_email': with_email, 'jobs': jobs, 'exports': exports}
+
+    # Exports
+
+    def export(self, job_id: str = None, fmt: str = 'csv', filename: str = None, **filters) -> Optional[str]:
+        """
+        Write leads to a CSV or Excel file and add it to the catalog
+
+        Each lead is written with its latest stored values, so a job's export
+        includes newer data (phone, rating, emails) that later jobs scraped
+        for the same place_id. A finished job's existing export is reused
+        rather than rewritten, so repeated downloads are cheap and imported
+        files are never replaced; it holds the values as of when it was
+        written.
+
+        Args:
+            job_id: Only export this job's leads (default: every stored lead)
+            fmt: "csv" or "xlsx"
+            filename: Optional filename (default: the job's name)
+            **filters: Extra filters passed to leads()
+
+        Returns:
+            Path to the export, or None when there were no leads
+        """
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {fmt}")
+
+        if job_id and not filename and not any(value is not None for value in filters.values()):
+            existing = self._finished_export(job_id, fmt)
+            if existing:
+                return existing
+
+        leads = self.leads(job_id=job_id, **filters)
+        if not leads:
+            return None
+
+        if not filename:
+            job = self.get_job(job_id) if job_id else None
+            base = job['name'] if job else f"leads_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            filename = f"{base}.{fmt}"
+        filepath = os.path.join(self.export_dir, filename)
+        os.makedirs(self.export_dir, exist_ok=True)
+
+        # Only keep the emails column when the leads came from an email job
+        fieldnames = STORE_FIELDS if any(lead['emails'] for lead in leads) else STORE_FIELDS[:-1]
+        with job_context(job_id), get_metrics().timer('export'):
+            if fmt == 'csv':
+                with open(filepath, 'w', newline='', encoding='utf-8') as f:
+                    writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction='ignore')
+                    writer.writeheader()
+                    writer.writerows(lead_rows(leads, fieldnames))
+            else:
+                import pandas as pd
+                pd.DataFrame(lead_rows(leads, fieldnames)).to_excel(filepath, index=False)
+
+        self.record_export(filepath, job_id, len(leads))
+        return filepath
+
+    def record_export(self, filepath: str, job_id: str = None, lead_count: int = None):
+        """Add a file written elsewhere (e.g. save_to_csv) to the catalog"""
+        filename = os.path.basename(filepath)
+        fmt = os.path.splitext(filename)[1].lstrip('.').lower()
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO exports (filename, job_id, format, path, lead_count, size, created_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (filename, job_id, fmt, filepath, lead_count,
+                 os.path.getsize(filepath) if os.path.exists(filepath) else 0, time.time())
+            )
+
+    def _finished_export(self, job_id: str, fmt: str) -> Optional[str]:
+        """Path of an export written after the job finished, if it still exists"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT e.path FROM exports e JOIN jobs j ON j.job_id = e.job_id '
+                'WHERE e.job_id = ? AND e.format = ? AND j.finished_at IS NOT NULL '
+                'AND e.created_at >= j.finished_at ORDER BY e.created_at DESC LIMIT 1',
+                (job_id, fmt)
+            ).fetchone()
+        return row['path'] if row and os.path.exists(row['path']) else None
+
+    def export_path(self, filename: str) -> Optional[str]:
+        """Path of a catalogued export, or None"""
+        with self._lock:
+            row = self._conn.execute('SELECT path FROM exports WHERE filename = ?', (filename,)).fetchone()
+        return row['path'] if row else None
+
+    def catalog(self, page: int = 1, per_page: int = 20) -> Dict:
+        """
+        One page of jobs, newest first, with their exports
+
+        Args:
+            page: 1-based page number
+            per_page: Jobs per page
+
+        Returns:
+            Dictionary with 'jobs', 'page', 'per_page' and 'total'
+        """
+        page = max(page, 1)
+        per_page = max(min(per_page, 200), 1)
+        with self._lock:
+            total = self._conn.execute('SELECT COUNT(*) FROM jobs').fetchone()[0]
+            jobs = [dict(row) for row in self._conn.execute(
+                'SELECT * FROM jobs ORDER BY created_at DESC LIMIT ? OFFSET ?',
+                (per_page, (page - 1) * per_page)
+            )]
+            job_ids = [job['job_id'] for job in jobs]
+            exports = [dict(row) for row in self._conn.execute(
+                f"SELECT * FROM exports WHERE job_id IN ({', '.join('?' * len(job_ids))}) "
+                'ORDER BY created_at DESC', job_ids
+            )] if job_ids else []
+
+        for job in jobs:
+            job['exports'] = [export for export in exports if export['job_id'] == job['job_id']]
+        return {'jobs': jobs, 'page': page, 'per_page': per_page, 'total': total}
+
+    # Legacy files
+
+    def import_csv(self, filepath: str) -> int:
+        """
+        Import a legacy lead CSV as a job of its own
+
+        Args:
+            filepath: CSV with LEAD_FIELDS columns (and optionally 'emails')
+
+        Returns:
+            Number of leads imported
+        """
+        with open(filepath, 'r', newline='', encoding='utf-8') as f:
+            leads = [row for row in csv.DictReader(f) if row.get('name') or row.get('place_id')]
+
+        name = os.path.splitext(os.path.basename(filepath))[0]
+        queries = sorted({lead.get('query_used', '') for lead in leads} - {''})
+        job_id = self.start_job('import', queries, name=name)
+        self.upsert_many(leads, job_id)
+        self.finish_job(job_id)
+        self.record_export(filepath, job_id, len(leads))
+        return len(leads)
+
+
+class StoreLeadSink:
+    """Pipeline sink upserting each finished lead into the store"""
+
+    def __init__(self, store: LeadStore, job_id: str):
+        self.store = store
+        self.job_id = job_id
+        self.count = 0
+
+    def write(self, lead: Dict):
+        """Upsert one lead under the sink's job"""
+        self.store.upsert(lead, self.job_id)
+        self.count += 1
+
+    def close(self):
+        """Nothing to flush; every write is committed"""
+        pass
+
+
+_shared_store = None
+_shared_store_lock = threading.Lock()
+
+
+def get_lead_store() -> LeadStore:
+    """Return the process-wide lead store"""
+    global _shared_store
+    with _shared_store_lock:
+        if _shared_store is None:
+            _shared_store = LeadStore()
+        return _shared_store
+
+
+def main():
+    """Command line interface for importing and exporting leads"""
+    parser = argparse.ArgumentParser(description="Manage the lead database")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = subparsers.add_parser('import', help="Import legacy lead CSV files")
+    import_parser.add_argument('files', nargs='+', help="CSV files to import")
+
+    export_parser = subparsers.add_parser('export', help="Export leads to CSV or Excel")
+    export_parser.add_argument('--job', help="Only export this job's leads")
+    export_parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv')
+    export_parser.add_argument('--query', help="Only leads found by this search term")
+    export_parser.add_argument('--domain', help="Only leads on this website domain")
+    export_parser.add_argument('--has-email', action='store_true', help="Only leads with emails")
+    export_parser.add_argument('--filename', help="Output filename")
+
+    subparsers.add_parser('stats', help="Show database totals")
+    args = parser.parse_args()
+
+    store = get_lead_store()
+
+    if args.command == 'import':
+        for filepath in args.files:
+            if not filepath.endswith('.csv'):
+                continue
+            try:
+                count = store.import_csv(filepath)
+                print(f"✅ Imported {count} leads from: {filepath}")
+            except Exception as e:
+                print(f"❌ Could not import {filepath}: {str(e)}")
+
+    elif args.command == 'export':
+        filepath = store.export(
+            job_id=args.job,
+            fmt=args.format,
+            filename=args.filename,
+            query=args.query,
+            domain=args.domain,
+            has_email=True if args.has_email else None
+        )
+        if not filepath:
+            print("❌ No leads matched")
+            return 1
+        print(f"💾 Exported to: {filepath}")
+
+    counts = store.count()
+    print(f"\n📊 Lead database: {counts['leads']} leads ({counts['with_email']} with emails), "
+          f"{counts['jobs']} jobs, {counts['exports']} exports")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Location Resolver - Geocode each location string once and cache the result
+"""
+
+import os
+import json
+import time
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+from config import GEOCODE_CACHE_FILE, GEOCODE_ERROR_TTL, GEOCODE_FAILURE_TTL
+from metrics import get_metrics
+
+
+class LocationResolver:
+    def __init__(self, geocoder: Callable, cache_path: str = None):
+        """
+        Initialize the resolver
+
+        Args:
+            geocoder: Callable taking an address string and returning a list of
+                      Geocoding API results (e.g. googlemaps.Client.geocode)
+            cache_path: JSON file used to persist resolved locations
+        """
+        self.geocoder = geocoder
+        self.cache_path = cache_path or GEOCODE_CACHE_FILE
+        self._lock = threading.Lock()
+        self._cache = self._load_cache()
+
+    def _load_cache(self) -> Dict:
+        """Load previously resolved locations from disk"""
+        try:
+            with open(self.cache_path, 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _save_cache(self):
+        """Write the cache to disk atomically"""
+        directory = os.path.dirname(self.cache_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.cache_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self._cache, f, indent=2)
+        os.replace(tmp_path, self.cache_path)
+
+    @staticmethod
+    def cache_key(location: str) -> str:
+        """Normalize a location string so "London, UK" and "london,  uk" share an entry"""
+        return ' '.join(location.lower().split())
+
+    def resolve(self, location: str) -> Optional[Dict]:
+        """
+        Resolve a free-text location to coordinates and a viewport
+
+        Args:
+            location: Location string (e.g., "London, UK")
+
+        Returns:
+            Dictionary with lat, lng, formatted_address and viewport, or None.
+            Failed lookups are cached too, so an unknown location isn't
+            geocoded again until GEOCODE_FAILURE_TTL (GEOCODE_ERROR_TTL after
+            an API error) has passed
+        """
+        if not location:
+            return None
+
+        key = self.cache_key(location)
+        with self._lock:
+            cached = self._cache.get(key)
+        if cached and 'failed_at' in cached and not self._failure_fresh(cached):
+            cached = None
+        metrics = get_metrics()
+        metrics.cache('geocode', bool(cached))
+        if cached:
+            return None if 'failed_at' in cached else cached
+
+        try:
+            metrics.api_request('geocode')
+            with metrics.timer('geocode'):
+                results = self.geocoder(location)
+        except Exception as e:
+            metrics.inc('places_api_errors', endpoint='geocode', status=getattr(e, 'status', None) or type(e).__name__)
+            print(f"❌ Error geocoding {location}: {str(e)}")
+            self._store(key, {'query': location, 'failed_at': time.time(), 'reason': 'error'})
+            return None
+
+        if not results:
+            print(f"⚠️  Could not geocode location: {location}")
+            self._store(key, {'query': location, 'failed_at': time.time(), 'reason': 'not_found'})
+            return None
+
+        geometry = results[0].get('geometry', {})
+        point = geometry.get('location', {})
+        viewport = geometry.get('viewport') or {
+            'northeast': point,
+            'southwest': point
+        }
+        resolved = {
+            'query': location,
+            'formatted_address': results[0].get('formatted_address', location),
+            'lat': point.get('lat'),
+            'lng': point.get('lng'),
+            'viewport': viewport
+        }
+        if resolved['lat'] is None or resolved['lng'] is None:
+            self._store(key, {'query': location, 'failed_at': time.time(), 'reason': 'not_found'})
+            return None
+
+        self._store(key, resolved)
+        return resolved
+
+    @staticmethod
+    def _failure_fresh(entry: Dict) -> bool:
+        """Whether a cached failed lookup is still recent enough to skip the geocoder"""
+        ttl = GEOCODE_ERROR_TTL if entry.get('reason') == 'error' else GEOCODE_FAILURE_TTL
+        return time.time() - entry['failed_at'] < ttl
+
+    def _store(self, key: str, entry: Dict):
+        """Cache a resolved location (or a failed lookup) and persist it"""
+        with self._lock:
+            self._cache[key] = entry
+            try:
+                self._save_cache()
+            except OSError as e:
+                print(f"⚠️  Could not write geocode cache: {str(e)}")
+
+    def latlng(self, location: str) -> Optional[Tuple[float, float]]:
+        """Return (lat, lng) for a location string, or None if it can't be resolved"""
+        resolved = self.resolve(location)
+        if not resolved:
+            return None
+        return resolved['lat'], resolved['lng']
+
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Metrics - Per-stage timings, counters and cache hit rates
+Stages (search, details, fetch, parse, extract, export, ...) are timed into
+fixed-bucket latency histograms, process-wide and per job. Counters track
+Places API requests (our quota use), API errors and cache hits/misses. The
+web app serves everything in Prometheus text format on /metrics; CLI runs
+write a JSON summary next to their output file.
+
+Work is attributed to a job through job_context(), which the pipeline sets
+on each of its worker threads.
+"""
+
+import os
+import json
+import time
+import bisect
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+from config import METRICS_JOB_HISTORY
+
+# Upper bounds (seconds) of the latency histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+PREFIX = 'leadscraper'
+
+_local = threading.local()
+
+# Stage each thread is currently timing, by thread ident (read by the sampling profiler)
+_active_stages = {}
+
+
+@contextmanager
+def job_context(job_id: Optional[str]):
+    """Attribute metrics recorded on this thread to a job while the block runs"""
+    previous = getattr(_local, 'job_id', None)
+    _local.job_id = job_id
+    try:
+        yield
+    finally:
+        _local.job_id = previous
+
+
+def current_job() -> Optional[str]:
+    """Job metrics on this thread are attributed to, if any"""
+    return getattr(_local, 'job_id', None)
+
+
+def active_stages() -> Dict[int, str]:
+    """Snapshot of the innermost stage each thread is in, by thread ident"""
+    return dict(_active_stages)
+
+
+class Histogram:
+    """Latency histogram with fixed bucket bounds (Prometheus style)"""
+
+    __slots__ = ('bounds', 'counts', 'sum', 'count', 'max')
+
+    def __init__(self, bounds: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # The last bucket is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate a quantile by interpolating inside its bucket"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.bounds[i - 1] if i > 0 else 0.0
+                upper = self.bounds[i] if i < len(self.bounds) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / count, self.max)
+            seen += count
+        return self.max
+
+    def to_dict(self) -> Dict:
+        return {
+            'count': self.count,
+            'total_seconds': round(self.sum, 3),
+            'mean': round(self.sum / self.count, 4) if self.count else None,
+            'p50': _round(self.quantile(0.50)),
+            'p95': _round(self.quantile(0.95)),
+            'max': round(self.max, 4)
+        }
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 4) if value is not None else None
+
+
+def _labels(labels: Dict) -> Tuple:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: Tuple, extra: Tuple = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in pairs) + '}'
+
+
+class _JobMetrics:
+    __slots__ = ('stages', 'counters', 'started')
+
+    def __init__(self):
+        self.stages = {}
+        self.counters = {}
+        self.started = time.time()
+
+
+class _Timer:
+    """Context manager timing one stage call (a plain class is cheaper than @contextmanager)"""
+
+    __slots__ = ('metrics', 'stage', 'started', 'ident', 'outer')
+
+    def __init__(self, metrics: 'Metrics', stage: str):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.ident = threading.get_ident()
+        self.outer = _active_stages.get(self.ident)
+        _active_stages[self.ident] = self.stage
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.observe(self.stage, time.perf_counter() - self.started)
+        if self.outer is None:
+            _active_stages.pop(self.ident, None)
+        else:
+            _active_stages[self.ident] = self.outer
+        if exc_type is not None:
+            self.metrics.inc('stage_errors', stage=self.stage)
+        return False
+
+
+class Metrics:
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, job_history: int = None):
+        """
+        Create an empty registry
+
+        Args:
+            buckets: Histogram bucket upper bounds in seconds
+            job_history: Most recent jobs to keep per-job metrics for
+        """
+        self.buckets = buckets
+        self.job_history = job_history or METRICS_JOB_HISTORY
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._counters = {}
+        self._jobs = OrderedDict()
+        self._started = time.time()
+        self.last_output_file = None
+
+    def _job(self, job_id: str) -> _JobMetrics:
+        """Per-job metrics, created on first use (caller holds the lock)"""
+        job = self._jobs.get(job_id)
+        if job is None:
+            job = self._jobs[job_id] = _JobMetrics()
+            while len(self._jobs) > self.job_history:
+                self._jobs.popitem(last=False)
+        return job
+
+    def timer(self, stage: str) -> _Timer:
+        """Time a block as one call of a stage: with metrics.timer('details'): ..."""
+        return _Timer(self, stage)
+
+    def observe(self, stage: str, seconds: float):
+        """Record one call of a stage that took the given time"""
+        job_id = current_job()
+        with self._lock:
+            histogram = self._stages.get(stage)
+            if histogram is None:
+                histogram = self._stages[stage] = Histogram(self.buckets)
+            histogram.observe(seconds)
+            if job_id:
+                stages = self._job(job_id).stages
+                histogram = stages.get(stage)
+                if histogram is None:
+                    histogram = stages[stage] = Histogram(self.buckets)
+                histogram.observe(seconds)
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        """Add to a counter, e.g. inc('places_api_requests', endpoint='details')"""
+        key = (name, _labels(labels))
+        job_id = current_job()
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+            if job_id:
+                counters = self._job(job_id).counters
+                counters[key] = counters.get(key, 0) + amount
+
+    def cache(self, cache: str, hit: bool):
+        """Count a lookup in one of our caches"""
+        self.inc('cache_requests', cache=cache, result='hit' if hit else 'miss')
+
+    def api_request(self, endpoint: str):
+        """Count one billable Places API request"""
+        self.inc('places_api_requests', endpoint=endpoint)
+
+    # Reporting
+
+    def prometheus(self) -> str:
+        """All process-wide metrics in Prometheus text exposition format"""
+        with self._lock:
+            stages = {stage: (list(h.counts), h.sum, h.count) for stage, h in self._stages.items()}
+            counters = dict(self._counters)
+
+        lines = [
+            f"# HELP {PREFIX}_stage_seconds Time spent per call of each pipeline stage",
+            f"# TYPE {PREFIX}_stage_seconds histogram"
+        ]
+        for stage, (counts, total, count) in sorted(stages.items()):
+            labels = (('stage', stage),)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f"{PREFIX}_stage_seconds_bucket{_format_labels(labels, (('le', le),))} {cumulative}")
+            lines.append(f"{PREFIX}_stage_seconds_sum{_format_labels(labels)} {total:.6f}")
+            lines.append(f"{PREFIX}_stage_seconds_count{_format_labels(labels)} {count}")
+
+        names = sorted({name for name, _ in counters})
+        for name in names:
+            lines.append(f"# TYPE {PREFIX}_{name}_total counter")
+            for (counter, labels), value in sorted(counters.items()):
+                if counter == name:
+                    lines.append(f"{PREFIX}_{name}_total{_format_labels(labels)} {value:g}")
+
+        lines.append(f"# TYPE {PREFIX}_uptime_seconds gauge")
+        lines.append(f"{PREFIX}_uptime_seconds {time.time() - self._started:.1f}")
+        return '\n'.join(lines) + '\n'
+
+    def summary(self, job_id: str = None) -> Dict:
+        """
+        Stage timings, counters, cache hit rates and API use as a dictionary
+
+        Args:
+            job_id: Only this job's metrics (default: the whole process)
+
+        Returns:
+            Dictionary ready for JSON
+        """
+        with self._lock:
+            if job_id is not None:
+                job = self._jobs.get(job_id)
+                stages = dict(job.stages) if job else {}
+                counters = dict(job.counters) if job else {}
+                started = job.started if job else time.time()
+            else:
+                stages, counters, started = dict(self._stages), dict(self._counters), self._started
+            stage_stats = {stage: histogram.to_dict() for stage, histogram in stages.items()}
+
+        api_requests = {}
+        api_errors = {}
+        caches = {}
+        other = {}
+        for (name, labels), value in counters.items():
+            labels = dict(labels)
+            if name == 'places_api_requests':
+                api_requests[labels.get('endpoint', '')] = int(value)
+            elif name == 'places_api_errors':
+                key = f"{labels.get('endpoint', '')}:{labels.get('status', '')}"
+                api_errors[key] = int(value)
+            elif name == 'cache_requests':
+                cache = caches.setdefault(labels.get('cache', ''), {'hit': 0, 'miss': 0})
+                cache[labels.get('result', 'miss')] += int(value)
+            else:
+                suffix = ','.join(f"{key}={val}" for key, val in sorted(labels.items()))
+                other[f"{name}{{{suffix}}}" if suffix else name] = value
+
+        for cache in caches.values():
+            lookups = cache['hit'] + cache['miss']
+            cache['hit_rate'] = round(cache['hit'] / lookups, 3) if lookups else None
+
+        return {
+            'job_id': job_id,
+            'elapsed_seconds': round(time.time() - started, 2),
+            'stages': dict(sorted(stage_stats.items(), key=lambda item: -item[1]['total_seconds'])),
+            'places_api_requests': api_requests,
+            'places_api_requests_total': sum(api_requests.values()),
+            'places_api_errors': api_errors,
+            'caches': caches,
+            'counters': other
+        }
+
+    def write_summary(self, path: str, job_id: str = None) -> str:
+        """Write summary() as JSON and return the path"""
+        with open(path, 'w') as f:
+            json.dump(self.summary(job_id), f, indent=2)
+        return path
+
+    def save_run_summary(self, output_file: str, job_id: str = None) -> str:
+        """
+        Write a CLI run's summary next to its output file and print the highlights
+
+        Args:
+            output_file: The run's CSV/Excel file (data/leads_x.csv -> data/leads_x_metrics.json)
+            job_id: The run's job (default: everything this process did)
+
+        Returns:
+            Path of the JSON summary
+        """
+        self.last_output_file = output_file
+        path = os.path.splitext(output_file)[0] + '_metrics.json'
+        summary = self.summary(job_id)
+        with open(path, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+        print(f"\n⏱️  Where the time went:")
+        for stage, stats in list(summary['stages'].items())[:5]:
+            print(f"   {stage}: {stats['count']} calls, {stats['total_seconds']}s total, p95 {stats['p95']}s")
+        print(f"   Places API requests: {summary['places_api_requests_total']}")
+        for cache, stats in summary['caches'].items():
+            if stats['hit_rate'] is not None:
+                print(f"   {cache} cache hit rate: {stats['hit_rate']:.0%}")
+        print(f"📈 Metrics saved to: {path}")
+        return path
+
+
+# Process-wide registry shared by every scraper and the web app
+_shared_metrics = None
+_shared_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> Metrics:
+    """Return the process-wide metrics registry"""
+    global _shared_metrics
+    with _shared_metrics_lock:
+        if _shared_metrics is None:
+            _shared_metrics = Metrics()
+        return _shared_metrics
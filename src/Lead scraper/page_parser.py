@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Page Parser - CPU-bound HTML parsing and email extraction
+Everything here works on raw bytes and returns plain data, so it can run in
+a process pool away from the threads doing network I/O.
+"""
+
+import re
+import json
+import time
+import atexit
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse, urldefrag, unquote
+
+from config import HTML_PARSER, HTML_PARSER_WORKERS, PARSE_TIMEOUT
+from run_log import get_log
+
+EMAIL_PATTERNS = [
+    re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', re.IGNORECASE),
+    re.compile(r'\b[A-Za-z0-9._%+-]+\s*@\s*[A-Za-z0-9.-]+\s*\.\s*[A-Z|a-z]{2,}\b', re.IGNORECASE)
+]
+
+# Structured contact markers, matched on raw bytes without building a tree
+MAILTO_PATTERN = re.compile(rb'mailto:([^"\'?<>\s]+)', re.IGNORECASE)
+JSON_LD_PATTERN = re.compile(
+    rb'<script[^>]+type\s*=\s*["\']application/ld\+json["\'][^>]*>(.*?)</script>',
+    re.IGNORECASE | re.DOTALL
+)
+ITEMPROP_EMAIL_PATTERN = re.compile(
+    rb'<[^>]*itemprop\s*=\s*["\']email["\'][^>]*>([^<]*)',
+    re.IGNORECASE
+)
+CONTENT_ATTR_PATTERN = re.compile(rb'content\s*=\s*["\']([^"\']+)["\']', re.IGNORECASE)
+
+# Words that mark a link as a likely contact page, with their score when
+# found in the link's path or text
+CONTACT_WORDS = {'contact': 60, 'email': 30, 'about': 20, 'info': 10}
+
+# Paths that are almost always the contact page itself
+CONTACT_PATHS = {'/contact', '/contact-us', '/contactus', '/contact_us', '/get-in-touch'}
+
+# Seconds between deadline checks while waiting for a parser process, so a
+# cancelled job stops waiting promptly
+PARSE_POLL_INTERVAL = 0.5
+
+# Links to these are never worth fetching for emails
+ASSET_EXTENSIONS = (
+    '.pdf', '.jpg', '.jpeg', '.png', '.gif', '.svg', '.webp', '.ico', '.css',
+    '.js', '.zip', '.doc', '.docx', '.xls', '.xlsx', '.mp4', '.mp3'
+)
+
+
+def is_valid_email(email: str) -> bool:
+    """Basic email validation"""
+    if not email or len(email) < 5:
+        return False
+    if email.count('@') != 1:
+        return False
+    if email.startswith('.') or email.endswith('.'):
+        return False
+    if '..' in email:
+        return False
+    if email.lower().endswith(ASSET_EXTENSIONS):
+        # e.g. logo@2x.png picked up from an image filename
+        return False
+    return True
+
+
+def _site_host(url: str) -> str:
+    """Host of a URL without a leading www."""
+    host = (urlparse(url).hostname or '').lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+def is_confident_email(email: str, site_url: str, from_mailto: bool = False) -> bool:
+    """
+    Whether an email is good enough to stop looking at further pages
+
+    Emails from mailto: links, or on the website's own domain, count as
+    confident; addresses that just appear in page text elsewhere don't.
+    """
+    if from_mailto:
+        return True
+    site_host = _site_host(site_url)
+    domain = email.rsplit('@', 1)[-1].lower()
+    return bool(site_host) and (domain == site_host or site_host.endswith('.' + domain)
+                                or domain.endswith('.' + site_host))
+
+
+def score_contact_link(url: str, text: str, site_host: str) -> int:
+    """
+    Score a link as a contact-page candidate (0 = not worth fetching)
+
+    Args:
+        url: Absolute link URL
+        text: Link text
+        site_host: Host of the page the link was found on (without www.)
+
+    Returns:
+        Higher scores for exact contact paths and contact wording
+    """
+    parsed = urlparse(url)
+    if parsed.scheme not in ('http', 'https'):
+        return 0
+    if _site_host(url) != site_host:
+        return 0
+
+    path = parsed.path.lower().rstrip('/')
+    if path.endswith(ASSET_EXTENSIONS):
+        return 0
+
+    text = text.lower()
+    score = 0
+    if path.rsplit('.', 1)[0] in CONTACT_PATHS:
+        score += 100
+    for word, weight in CONTACT_WORDS.items():
+        if word in path:
+            score += weight
+        if word in text:
+            score += weight * 2 // 3
+
+    if score == 0:
+        return 0
+
+    # Prefer shallow pages such as /contact over /blog/2019/contact-info
+    return max(score - 5 * path.count('/'), 1)
+
+
+def rank_contact_links(links: List[Tuple[str, str]], base_url: str) -> List[str]:
+    """
+    Order candidate links, best contact page first
+
+    Args:
+        links: (absolute url, link text) pairs
+        base_url: URL of the page the links were found on
+
+    Returns:
+        Unique same-host URLs with a positive score, highest score first
+    """
+    site_host = _site_host(base_url)
+    page = urldefrag(base_url)[0].rstrip('/')
+    scores = {}
+    for url, text in links:
+        url = urldefrag(url)[0]
+        if url.rstrip('/') == page:
+            continue
+        score = score_contact_link(url, text, site_host)
+        if score > scores.get(url, 0):
+            scores[url] = score
+    return sorted(scores, key=lambda url: -scores[url])
+
+
+def extract_emails_from_text(text: str) -> List[str]:
+    """Extract email addresses from text"""
+    emails = set()
+    for pattern in EMAIL_PATTERNS:
+        for email in pattern.findall(text):
+            # Clean up the email
+            email = email.strip().replace(' ', '')
+            if is_valid_email(email):
+                emails.add(email.lower())
+    return list(emails)
+
+
+def _json_ld_emails(node, found: set):
+    """Collect "email" values anywhere in a JSON-LD document"""
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key.lower() == 'email' and isinstance(value, str):
+                found.add(value)
+            else:
+                _json_ld_emails(value, found)
+    elif isinstance(node, list):
+        for item in node:
+            _json_ld_emails(item, found)
+
+
+def scan_structured_contacts(content: bytes) -> List[str]:
+    """
+    Find explicitly marked-up emails straight from the raw HTML bytes
+
+    Looks at mailto: links, JSON-LD blocks (e.g. LocalBusiness "email") and
+    schema.org itemprop="email" microdata. This is a handful of regex passes
+    over the bytes, so it costs a fraction of building a BeautifulSoup tree.
+
+    Args:
+        content: Raw response body
+
+    Returns:
+        Valid lower-cased emails (empty if the page has no such markup)
+    """
+    candidates = set()
+
+    for match in MAILTO_PATTERN.finditer(content):
+        candidates.add(match.group(1).decode('utf-8', 'ignore'))
+
+    if b'ld+json' in content:
+        for match in JSON_LD_PATTERN.finditer(content):
+            try:
+                _json_ld_emails(json.loads(match.group(1).decode('utf-8', 'ignore')), candidates)
+            except ValueError:
+                continue
+
+    if b'itemprop' in content:
+        for match in ITEMPROP_EMAIL_PATTERN.finditer(content):
+            attr = CONTENT_ATTR_PATTERN.search(match.group(0))
+            value = attr.group(1) if attr else match.group(1)
+            candidates.add(value.decode('utf-8', 'ignore'))
+
+    emails = set()
+    for candidate in candidates:
+        email = unquote(candidate).strip()
+        if email.lower().startswith('mailto:'):
+            email = email[7:]
+        email = email.split('?')[0].strip()
+        if is_valid_email(email):
+            emails.add(email.lower())
+    return sorted(emails)
+
+
+def _resolve_parser(parser: str) -> str:
+    """Fall back to the standard library parser when lxml isn't installed"""
+    if parser == 'lxml':
+        try:
+            import lxml  # noqa: F401
+        except ImportError:
+            return 'html.parser'
+    return parser
+
+
+def parse_page(content: bytes, base_url: str, parser: str = None) -> Dict:
+    """
+    Parse a page and pull out emails and contact-page links
+
+    Pages with structured contact markup are answered by the byte-level fast
+    path; the full BeautifulSoup parse only runs when there is none.
+
+    Args:
+        content: Raw response body
+        base_url: URL the page was fetched from (for resolving relative links)
+        parser: BeautifulSoup parser name ("lxml" or "html.parser")
+
+    Returns:
+        Dictionary with 'emails', 'confident' (emails good enough to stop
+        crawling) and 'contact_links' (ranked, best first)
+    """
+    structured = scan_structured_contacts(content)
+    if structured:
+        return {'emails': structured, 'confident': structured, 'contact_links': []}
+
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(content, _resolve_parser(parser or HTML_PARSER))
+
+    emails = set(extract_emails_from_text(soup.get_text()))
+    mailto_emails = set()
+    links = []
+
+    for link in soup.find_all('a', href=True):
+        href = link['href'].strip()
+        if href.lower().startswith('mailto:'):
+            email = href[7:].split('?')[0].strip()
+            if is_valid_email(email):
+                mailto_emails.add(email.lower())
+            continue
+        links.append((urljoin(base_url, href), link.get_text()))
+
+    emails |= mailto_emails
+    confident = [email for email in emails
+                 if is_confident_email(email, base_url, email in mailto_emails)]
+
+    return {
+        'emails': sorted(emails),
+        'confident': sorted(confident),
+        'contact_links': rank_contact_links(links, base_url)
+    }
+
+
+class ParserPool:
+    def __init__(self, workers: int = None, parser: str = None):
+        """
+        Run parse_page in a process pool
+
+        Args:
+            workers: Number of parser processes (0 parses on the calling thread)
+            parser: BeautifulSoup parser name
+        """
+        self.workers = HTML_PARSER_WORKERS if workers is None else workers
+        self.parser = parser or HTML_PARSER
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        """Start the worker processes on first use"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers or None)
+            return self._executor
+
+    def _discard_executor(self, executor):
+        """Drop a broken pool so the next parse starts fresh worker processes"""
+        with self._lock:
+            if self._executor is executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def parse(self, content: bytes, base_url: str, deadline=None) -> Optional[Dict]:
+        """
+        Parse a page in a worker process and wait for the result
+
+        Args:
+            content: Raw page body
+            base_url: URL the page was fetched from (for resolving links)
+            deadline: Optional Deadline bounding the wait
+
+        Returns:
+            parse_page's result, or None if the page took longer than the
+            deadline (or PARSE_TIMEOUT) or a worker process died
+        """
+        # Structured markup is cheap enough to scan here, which also saves
+        # shipping the page to a worker process
+        structured = scan_structured_contacts(content)
+        if structured:
+            return {'emails': structured, 'confident': structured, 'contact_links': []}
+
+        if self.workers == 0:
+            return parse_page(content, base_url, self.parser)
+
+        executor = self._get_executor()
+        expires_at = time.monotonic() + PARSE_TIMEOUT
+        try:
+            future = executor.submit(parse_page, content, base_url, self.parser)
+            while True:
+                wait = expires_at - time.monotonic()
+                remaining = deadline.remaining() if deadline else None
+                if remaining is not None:
+                    wait = min(wait, remaining)
+                if wait <= 0:
+                    future.cancel()
+                    get_log().debug('parse_timeout', "   ⏱️  Gave up parsing {url}", url=base_url)
+                    return None
+                try:
+                    return future.result(timeout=min(wait, PARSE_POLL_INTERVAL))
+                except FutureTimeout:
+                    continue
+        except BrokenProcessPool as e:
+            get_log().warning('parser_pool_broken', "⚠️  Parser process died ({error}), restarting the pool",
+                              error=str(e))
+            self._discard_executor(executor)
+            return None
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+_shared_pool = None
+_shared_pool_lock = threading.Lock()
+
+
+def get_parser_pool() -> ParserPool:
+    """Return the process-wide parser pool shared by all fetchers"""
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = ParserPool()
+            atexit.register(_shared_pool.shutdown)
+        return _shared_pool
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Lead Pipeline - Streaming search → details → enrich → sink
+Each stage runs in its own threads and hands work to the next one through a
+bounded queue, so details fetching, website crawling and CSV writing overlap
+and a slow stage holds back the stages feeding it instead of buffering
+everything in memory.
+"""
+
+import os
+import csv
+import time
+import queue
+import threading
+from typing import Callable, Dict, List, Optional
+
+from config import API_DELAY, PIPELINE_QUEUE_SIZE, DETAILS_WORKERS, ENRICH_WORKERS, LEAD_TIME_BUDGET
+from job_control import Deadline, JobControl
+from lead_record import lead_row
+from metrics import get_metrics, job_context
+from run_log import get_log
+
+# Marks the end of a stage's input
+_DONE = object()
+
+
+class CsvLeadSink:
+    """Append leads to a CSV file as soon as they arrive"""
+
+    def __init__(self, filepath: str, fieldnames: List[str] = None):
+        self.filepath = filepath
+        self.fieldnames = fieldnames
+        self.count = 0
+        self._file = None
+        self._writer = None
+
+    def write(self, lead: Dict):
+        """Write one lead and flush it to disk"""
+        if self._writer is None:
+            directory = os.path.dirname(self.filepath)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(self.filepath, 'w', newline='', encoding='utf-8')
+            self._writer = csv.DictWriter(
+                self._file,
+                fieldnames=self.fieldnames or list(lead.keys()),
+                extrasaction='ignore'
+            )
+            self._writer.writeheader()
+
+        self._writer.writerow(lead_row(lead, self._writer.fieldnames))
+        self._file.flush()
+        self.count += 1
+
+    def close(self):
+        """Close the output file"""
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+class TeeSink:
+    """Write every lead to several sinks (e.g. a CSV file and the lead store)"""
+
+    def __init__(self, *sinks):
+        self.sinks = sinks
+
+    @property
+    def count(self) -> int:
+        """Leads written to the first sink"""
+        return self.sinks[0].count if self.sinks else 0
+
+    def write(self, lead: Dict):
+        """Write one lead to every sink"""
+        for sink in self.sinks:
+            sink.write(lead)
+
+    def close(self):
+        """Close every sink"""
+        for sink in self.sinks:
+            sink.close()
+
+
+class LeadPipeline:
+    def __init__(self, scraper, enricher: Callable = None, sink=None,
+                 on_lead: Callable = None, on_search: Callable = None,
+                 place_filter: Callable = None, place_release: Callable = None,
+                 control: JobControl = None, queue_size: int = None,
+                 details_workers: int = None, enrich_workers: int = None):
+        """
+        Build a streaming pipeline around a LeadScraper
+
+        Args:
+            scraper: LeadScraper (or subclass) used for search and details
+            enricher: Optional callable(lead, deadline) -> lead run on every lead
+                      (e.g. EmailLeadScraper.enhance_lead_with_email); deadline
+                      is the lead's LEAD_TIME_BUDGET bounded by the job control
+            sink: Optional object with write(lead) called as each lead finishes
+            on_lead: Optional callback(lead, count) after a lead reaches the sink
+            on_search: Optional callback(query, places) after each search
+            place_filter: Optional callable(place) -> bool; places it rejects are
+                          dropped before their details are fetched (e.g. ones
+                          another job already scraped)
+            place_release: Optional callback(place) for places place_filter
+                           accepted that didn't become a lead because their
+                           details call failed (e.g. to release a claim)
+            control: Optional JobControl; once cancelled, stages drain their
+                     queues without doing any more work
+            queue_size: Maximum items waiting between two stages
+            details_workers: Threads fetching place details
+            enrich_workers: Threads running the enricher
+        """
+        self.scraper = scraper
+        self.enricher = enricher
+        self.sink = sink
+        self.on_lead = on_lead
+        self.on_search = on_search
+        self.place_filter = place_filter
+        self.place_release = place_release
+        self.control = control or JobControl()
+        self.queue_size = queue_size or PIPELINE_QUEUE_SIZE
+        self.details_workers = details_workers or DETAILS_WORKERS
+        self.enrich_workers = enrich_workers or ENRICH_WORKERS
+
+    def _start_stage(self, name: str, func: Callable, in_queue: queue.Queue,
+                     out_queue: queue.Queue, workers: int, downstream_workers: int) -> List[threading.Thread]:
+        """
+        Start worker threads that apply func to every item of in_queue
+
+        The last worker to finish passes one end marker per downstream worker on.
+        """
+        remaining = [workers]
+        lock = threading.Lock()
+        job_id = getattr(self.scraper, 'job_id', None)  # Stage timings are attributed to this job
+
+        def worker():
+            try:
+                with job_context(job_id):
+                    while True:
+                        item = in_queue.get()
+                        if item is _DONE:
+                            break
+                        if self.control.cancelled:
+                            # Keep draining so upstream stages never block on a full queue
+                            continue
+                        try:
+                            result = func(item)
+                        except Exception as e:
+                            get_log().error('stage_failed', "❌ Error in {stage} stage: {error}",
+                                            stage=name, error=str(e))
+                            continue
+                        if result is not None:
+                            out_queue.put(result)
+            finally:
+                with lock:
+                    remaining[0] -= 1
+                    last = remaining[0] == 0
+                if last:
+                    for _ in range(downstream_workers):
+                        out_queue.put(_DONE)
+
+        threads = [
+            threading.Thread(target=worker, name=f"{name}-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    def _search(self, queries: List[str], location, max_results: int, radius: int,
+                out_queue: queue.Queue):
+        """Search stage: push (query, place) pairs for every query"""
+        with job_context(getattr(self.scraper, 'job_id', None)):
+            self._search_queries(queries, location, max_results, radius, out_queue)
+
+    def _search_queries(self, queries: List[str], location, max_results: int, radius: int,
+                        out_queue: queue.Queue):
+        try:
+            # Geocode once per job; every query then searches the same coordinates
+            coordinates = self.scraper.resolve_location(location) or location
+
+            for query in queries:
+                if self.control.cancelled:
+                    break
+                places = self.scraper.search_places(query, coordinates, radius)[:max_results]
+                if self.on_search:
+                    self.on_search(query, places)
+                for place in places:
+                    if self.control.cancelled:
+                        break
+                    if place.get('place_id') and (not self.place_filter or self.place_filter(place)):
+                        out_queue.put((query, place))
+        except Exception as e:
+            get_log().error('stage_failed', "❌ Error in {stage} stage: {error}", stage='search', error=str(e))
+        finally:
+            for _ in range(self.details_workers):
+                out_queue.put(_DONE)
+
+    def _details(self, item) -> Optional[Dict]:
+        """Details stage: turn a (query, place) pair into a lead"""
+        query, place = item
+        try:
+            details = self.scraper.get_place_details(place['place_id'])
+        except Exception:
+            if self.place_release:
+                self.place_release(place)
+            raise
+        if not details and self.place_release:
+            self.place_release(place)
+
+        # Add delay to respect API rate limits
+        time.sleep(API_DELAY)
+
+        if not details:
+            return None
+        return self.scraper.build_lead(place, details, query)
+
+    def _enrich(self, lead: Dict) -> Optional[Dict]:
+        """Enrich stage: run the enricher within the lead's time budget"""
+        with get_metrics().timer('enrich'):
+            return self.enricher(lead, Deadline(LEAD_TIME_BUDGET, parent=self.control))
+
+    def run(self, queries: List[str], location=None, max_results: int = 20, radius: int = 5000) -> List[Dict]:
+        """
+        Run the pipeline to completion
+
+        Args:
+            queries: List of search terms
+            location: Location string or (lat, lng) tuple
+            max_results: Maximum number of results per query
+            radius: Search radius in meters
+
+        Returns:
+            List of finished lead dictionaries, in completion order (only
+            the leads finished before cancellation if the job was stopped)
+        """
+        places_queue = queue.Queue(maxsize=self.queue_size)
+        leads_queue = queue.Queue(maxsize=self.queue_size)
+        done_queue = queue.Queue(maxsize=self.queue_size) if self.enricher else leads_queue
+
+        search_thread = threading.Thread(
+            target=self._search,
+            args=(queries, location, max_results, radius, places_queue),
+            name="search",
+            daemon=True
+        )
+        search_thread.start()
+
+        self._start_stage('details', self._details, places_queue, leads_queue,
+                          self.details_workers, self.enrich_workers if self.enricher else 1)
+        if self.enricher:
+            self._start_stage('enrich', self._enrich, leads_queue, done_queue,
+                              self.enrich_workers, 1)
+
+        # Sink stage runs on the calling thread
+        leads = []
+        metrics = get_metrics()
+        log = get_log()
+        job_id = getattr(self.scraper, 'job_id', None)
+        progress = log.progress('leads', total=len(queries) * max_results)
+        try:
+            while True:
+                lead = done_queue.get()
+                if lead is _DONE:
+                    break
+                leads.append(lead)
+                if self.sink:
+                    try:
+                        with job_context(job_id), metrics.timer('write'):
+                            self.sink.write(lead)
+                    except Exception as e:
+                        log.error('write_failed', "❌ Error writing lead: {error}", error=str(e))
+                if self.on_lead:
+                    self.on_lead(lead, len(leads))
+                with job_context(job_id):
+                    if self.enricher:
+                        progress.update(emails=int(bool(lead.get('emails'))))
+                    else:
+                        progress.update()
+        except KeyboardInterrupt:
+            # Let the worker threads wind down; leads written so far stay on disk
+            self.control.cancel('Interrupted by user')
+            raise
+
+        search_thread.join()
+        with job_context(job_id):
+            progress.close()
+        return leads
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Profiling - Low-overhead sampling profiler for CLI runs
+A background thread samples every thread's stack PROFILE_INTERVAL times a
+second (no tracing hooks, so the scrape runs at full speed) and tags each
+sample with the pipeline stage the thread is in (see metrics.timer). The
+result is saved as a collapsed-stack file next to the output CSV, ready for
+flamegraph.pl, speedscope or inferno:
+
+    python3 add_emails.py --profile
+    flamegraph.pl data/leads_with_emails_20250101_120000.collapsed > profile.svg
+
+Threads idling on a queue or lock outside any stage are left out, so the
+flame graph shows where work (and network waiting) happens. HTML parsing runs
+in the parser processes (HTML_PARSER_WORKERS), so in-process samples show it
+as waiting under the "parse" stage; set HTML_PARSER_WORKERS = 0 to see
+BeautifulSoup itself.
+"""
+
+import os
+import re
+import sys
+import time
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from config import PROFILE_INTERVAL
+from metrics import active_stages, get_metrics
+
+# Modules whose frames mean a thread is parked, not working (e.g. an idle pool worker)
+_IDLE_FILES = ('threading.py', 'queue.py', 'selectors.py', 'socketserver.py',
+               os.path.join('concurrent', 'futures', 'thread.py'))
+
+
+def take_profile_flag(argv: List[str] = None) -> bool:
+    """
+    Whether profiling was asked for, with --profile or LEADSCRAPER_PROFILE=1
+
+    The flag is removed from argv so scripts that read positional
+    arguments (e.g. quick_scraper.py) don't see it.
+    """
+    argv = sys.argv if argv is None else argv
+    requested = '--profile' in argv
+    while '--profile' in argv:
+        argv.remove('--profile')
+    return requested or os.getenv('LEADSCRAPER_PROFILE') == '1'
+
+
+def _stage_for(thread_name: str) -> str:
+    """Stage of a thread outside any timed stage, from its name (e.g. "details-3" -> "details")"""
+    base = re.sub(r'[-_]\d+$', '', thread_name)
+    return 'main' if base == 'MainThread' else base
+
+
+class SamplingProfiler:
+    def __init__(self, interval: float = None):
+        """
+        Create a profiler (call start() to begin sampling)
+
+        Args:
+            interval: Seconds between samples
+        """
+        self.interval = interval or PROFILE_INTERVAL
+        self.samples = Counter()
+        self.sample_count = 0
+        self.overhead = 0.0
+        self._labels = {}
+        self._stop = threading.Event()
+        self._thread = None
+        self._started = None
+        self.elapsed = 0.0
+
+    def start(self) -> 'SamplingProfiler':
+        self._started = time.time()
+        self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.elapsed = time.time() - self._started
+
+    def _label(self, code) -> str:
+        """Frame label for a code object, e.g. "website_emails:fetch_page" (cached)"""
+        label = self._labels.get(code)
+        if label is None:
+            module = os.path.splitext(os.path.basename(code.co_filename))[0]
+            label = self._labels[code] = f"{module}:{code.co_name}"
+        return label
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            started = time.perf_counter()
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            stages = active_stages()
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                stage = stages.get(ident)
+                if stage is None and frame.f_code.co_filename.endswith(_IDLE_FILES):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(self._label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(stage or _stage_for(names.get(ident, 'thread')))
+                self.samples[tuple(reversed(stack))] += 1
+            self.sample_count += 1
+            self.overhead += time.perf_counter() - started
+
+    # Reporting
+
+    def write_collapsed(self, path: str) -> str:
+        """Write samples in collapsed-stack format ("stage;frame;frame count" per line)"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{';'.join(stack)} {count}\n")
+        return path
+
+    def stage_shares(self) -> Dict[str, float]:
+        """Fraction of working samples spent in each stage, largest first"""
+        totals = Counter()
+        for stack, count in self.samples.items():
+            totals[stack[0]] += count
+        total = sum(totals.values()) or 1
+        return {stage: count / total for stage, count in totals.most_common()}
+
+    def top_functions(self, limit: int = 10) -> List[Tuple[str, float]]:
+        """Functions most often on top of the stack (self time), with their share"""
+        leaves = Counter()
+        for stack, count in self.samples.items():
+            leaves[stack[-1]] += count
+        total = sum(leaves.values()) or 1
+        return [(label, count / total) for label, count in leaves.most_common(limit)]
+
+
+@contextmanager
+def profile_run(enabled: bool = True, interval: float = None):
+    """
+    Profile the block and save a collapsed-stack file when it ends
+
+    The file goes next to the run's output CSV (the last file a run summary
+    was written for, see Metrics.save_run_summary) or to data/ otherwise.
+
+    Args:
+        enabled: Do nothing when False, so callers can pass their --profile flag
+        interval: Seconds between samples (default: PROFILE_INTERVAL)
+    """
+    if not enabled:
+        yield None
+        return
+
+    profiler = SamplingProfiler(interval).start()
+    print(f"🔬 Profiling this run (sampling every {profiler.interval * 1000:.0f}ms)")
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        output_file = get_metrics().last_output_file
+        if output_file:
+            path = os.path.splitext(output_file)[0] + '.collapsed'
+        else:
+            path = os.path.join('data', f"profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}.collapsed")
+        profiler.write_collapsed(path)
+
+        print(f"\n🔬 Profile ({profiler.sample_count} samples over {profiler.elapsed:.1f}s, "
+              f"sampler overhead {profiler.overhead / max(profiler.elapsed, 1e-9):.1%}):")
+        for stage, share in list(profiler.stage_shares().items())[:6]:
+            print(f"   {stage}: {share:.0%}")
+        print(f"   Hottest functions:")
+        for label, share in profiler.top_functions(5):
+            print(f"      {label}: {share:.0%}")
+        print(f"🔥 Collapsed stacks saved to: {path}")
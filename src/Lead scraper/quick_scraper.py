@@ -1,11 +1,13 @@
 #!/usr/bin/env python3
 """
 Quick Lead Scraper - Command line input
-Usage: python3 quick_scraper.py "search term" "location" [number_of_results]
+Usage: python3 quick_scraper.py "search term" "location" [number_of_results] [--profile]
 """
 
 import sys
 from lead_scraper import LeadScraper
+from metrics import get_metrics
+from profiling import profile_run, take_profile_flag
 
 def main():
     """Main function with command line arguments"""
@@ -54,9 +56,11 @@ def main():
             print(f"\n📁 Files saved:")
             print(f"   CSV: {csv_file}")
             print(f"   Excel: {excel_file}")
+            get_metrics().save_run_summary(csv_file, scraper.job_id)
         
     except Exception as e:
         print(f"❌ Error: {str(e)}")
 
 if __name__ == "__main__":
-    main()
+    with profile_run(take_profile_flag()):
+        main()
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Refresh an existing lead file without re-scraping everything
+Only rows older than a threshold get a (cheaper) Place Details call; closed
+businesses are dropped or flagged, and only rows whose website changed are
+re-enriched. Writes the updated master plus a diff of new/changed/removed rows.
+
+Usage: python3 refresh_leads.py data/MASTER_LEADS_WITH_EMAILS_*.csv [--max-age-days 30] [--profile]
+"""
+
+import os
+import re
+import argparse
+import pandas as pd
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+from lead_scraper import LeadScraper
+from website_emails import WebsiteEmailFinder
+from job_control import Deadline
+from lead_store import get_lead_store
+from lead_record import lead_row
+from metrics import get_metrics
+from profiling import profile_run
+from config import DETAILS_WORKERS, LEAD_TIME_BUDGET
+
+# Place Details fields needed to refresh a row; opening hours aren't stored
+# in lead files, so they aren't paid for here
+REFRESH_FIELDS = [
+    'name', 'formatted_address', 'formatted_phone_number', 'website',
+    'rating', 'user_ratings_total', 'price_level', 'type', 'business_status'
+]
+
+# Columns compared to decide whether a row changed
+COMPARED_FIELDS = [
+    'name', 'address', 'phone', 'website', 'rating', 'total_reviews',
+    'price_level', 'business_status', 'types'
+]
+
+CLOSED_STATUS = 'CLOSED_PERMANENTLY'
+
+
+def _as_text(value) -> str:
+    """Normalize a value the way it reads back from a CSV"""
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _values_differ(field: str, old: str, new: str) -> bool:
+    """Compare a CSV value with a fresh one, numerically where it matters"""
+    if field in ('rating', 'total_reviews', 'price_level'):
+        try:
+            return float(old or 0) != float(new or 0)
+        except ValueError:
+            pass
+    return old != new
+
+
+def _output_paths(input_file: str):
+    """Paths for the refreshed master and its diff, next to the input"""
+    directory = os.path.dirname(input_file) or '.'
+    stem = os.path.splitext(os.path.basename(input_file))[0]
+    stem = re.sub(r'_\d{8}_\d{6}$', '', stem)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return (os.path.join(directory, f"{stem}_{timestamp}.csv"),
+            os.path.join(directory, f"{stem}_diff_{timestamp}.csv"))
+
+
+def refresh_leads(input_file: str, max_age_days: float = 30, flag_closed: bool = False,
+                  new_file: str = None, enrich: bool = True):
+    """
+    Refresh stale rows of a lead file
+
+    Args:
+        input_file: Existing lead CSV (e.g. MASTER_LEADS_WITH_EMAILS_*.csv)
+        max_age_days: Rows scraped more recently than this are left alone
+        flag_closed: Keep permanently closed businesses with status_flag=closed
+                     instead of dropping them
+        new_file: Optional fresh lead CSV whose unseen place_ids are added
+        enrich: Re-check websites for emails when a row's website changed
+
+    Returns:
+        (master_path, diff_path)
+    """
+    df = pd.read_csv(input_file, dtype=str, keep_default_na=False)
+    print(f"📖 Loaded {len(df)} leads from: {input_file}")
+
+    if 'place_id' not in df.columns:
+        raise ValueError("Lead file has no place_id column, so it can't be refreshed")
+
+    # A file without scraped_at is treated as entirely stale
+    if 'scraped_at' in df.columns:
+        scraped_at = pd.to_datetime(df['scraped_at'], errors='coerce')
+    else:
+        scraped_at = pd.Series(pd.NaT, index=df.index)
+    cutoff = datetime.now() - timedelta(days=max_age_days)
+    stale = (scraped_at.isna() | (scraped_at < cutoff)) & (df['place_id'] != '')
+    print(f"🕒 {int(stale.sum())} of {len(df)} leads are older than {max_age_days:g} days")
+
+    scraper = LeadScraper()
+    stale_rows = df[stale]
+
+    def fetch(place_id):
+        return scraper.get_place_details(place_id, fields=REFRESH_FIELDS)
+
+    with ThreadPoolExecutor(max_workers=DETAILS_WORKERS) as executor:
+        details_list = list(executor.map(fetch, stale_rows['place_id']))
+
+    has_emails = 'emails' in df.columns
+    finder = WebsiteEmailFinder() if enrich and has_emails else None
+    if flag_closed and 'status_flag' not in df.columns:
+        df['status_flag'] = ''
+
+    diff_rows = []
+    drop_index = []
+    failed = 0
+    re_enriched = 0
+
+    for (index, row), details in zip(stale_rows.iterrows(), details_list):
+        if not details:
+            failed += 1
+            continue
+
+        place = {'place_id': row['place_id'], 'name': row.get('name', ''),
+                 'formatted_address': row.get('address', '')}
+        fresh = lead_row(scraper.build_lead(place, details, row.get('query_used', '')))
+
+        if fresh['business_status'] == CLOSED_STATUS:
+            diff_rows.append({**row.to_dict(), 'change': 'removed', 'changed_fields': 'business_status'})
+            if flag_closed:
+                df.at[index, 'business_status'] = CLOSED_STATUS
+                df.at[index, 'status_flag'] = 'closed'
+                df.at[index, 'scraped_at'] = fresh['scraped_at']
+            else:
+                drop_index.append(index)
+            continue
+
+        changed = [field for field in COMPARED_FIELDS
+                   if field in df.columns and _values_differ(field, row[field], _as_text(fresh[field]))]
+
+        for field in COMPARED_FIELDS:
+            if field in df.columns:
+                df.at[index, field] = _as_text(fresh[field])
+        df.at[index, 'scraped_at'] = fresh['scraped_at']
+
+        if 'website' in changed and finder:
+            emails = finder.find_emails(fresh['website'], deadline=Deadline(LEAD_TIME_BUDGET)) if fresh['website'] else []
+            df.at[index, 'emails'] = ', '.join(emails)
+            if df.at[index, 'emails'] != row['emails']:
+                changed.append('emails')
+            re_enriched += 1
+
+        if changed:
+            diff_rows.append({**df.loc[index].to_dict(), 'change': 'changed', 'changed_fields': ', '.join(changed)})
+
+    df = df.drop(index=drop_index)
+
+    if new_file:
+        new_df = pd.read_csv(new_file, dtype=str, keep_default_na=False)
+        added = new_df[~new_df['place_id'].isin(df['place_id'])]
+        added = added.drop_duplicates(subset=['place_id'], keep='first')
+        for _, row in added.iterrows():
+            diff_rows.append({**row.to_dict(), 'change': 'new', 'changed_fields': ''})
+        df = pd.concat([df, added], ignore_index=True).fillna('')
+        print(f"➕ {len(added)} new leads from: {new_file}")
+
+    master_path, diff_path = _output_paths(input_file)
+    df.to_csv(master_path, index=False)
+    pd.DataFrame(diff_rows).to_csv(diff_path, index=False)
+
+    # Refreshed and new rows also go into the lead store
+    store = get_lead_store()
+    job_id = store.start_job('refresh', name=os.path.splitext(os.path.basename(master_path))[0])
+    store.upsert_many([row for row in diff_rows if row['change'] != 'removed'], job_id)
+    store.finish_job(job_id)
+    store.record_export(master_path, job_id, len(df))
+
+    counts = {change: sum(1 for row in diff_rows if row['change'] == change)
+              for change in ('new', 'changed', 'removed')}
+    print(f"\n🎉 Refresh completed!")
+    print(f"💾 Updated master: {master_path}")
+    print(f"💾 Diff: {diff_path}")
+    print(f"\n📊 Refresh Statistics:")
+    print(f"   New: {counts['new']}, changed: {counts['changed']}, removed: {counts['removed']}")
+    print(f"   Details calls: {len(stale_rows)} (a full re-scrape would need {len(df)} plus searches)")
+    print(f"   Websites re-enriched: {re_enriched}")
+    if failed:
+        print(f"   ⚠️  {failed} leads could not be refreshed and were left unchanged")
+
+    get_metrics().save_run_summary(master_path)
+    return master_path, diff_path
+
+
+def main():
+    """Main function with command line arguments"""
+    parser = argparse.ArgumentParser(description="Refresh stale rows of an existing lead file")
+    parser.add_argument('input_file', help="Lead CSV to refresh (e.g. data/MASTER_LEADS_WITH_EMAILS_*.csv)")
+    parser.add_argument('--max-age-days', type=float, default=30,
+                        help="Only refresh rows scraped longer ago than this (default: 30)")
+    parser.add_argument('--flag-closed', action='store_true',
+                        help="Keep permanently closed businesses with status_flag=closed instead of dropping them")
+    parser.add_argument('--new', dest='new_file',
+                        help="Fresh lead CSV whose unseen place_ids are added to the master")
+    parser.add_argument('--no-enrich', action='store_true',
+                        help="Don't re-check websites for emails when they change")
+    parser.add_argument('--profile', action='store_true',
+                        help="Sample the run and save a flame graph (.collapsed) next to the output")
+    args = parser.parse_args()
+
+    try:
+        with profile_run(args.profile):
+            refresh_leads(args.input_file, args.max_age_days, args.flag_closed,
+                          args.new_file, enrich=not args.no_enrich)
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Run Log - Levelled, structured logging for scraping runs
+Replaces per-lead prints. Every event has a name and fields; the console
+shows events at LOG_LEVEL and above (per-lead detail is DEBUG, so it is off
+by default) and an optional JSON-lines file records them for later analysis,
+tagged with the job the thread is working on (see metrics.job_context).
+Long loops report through a ProgressReporter, which prints one summary line
+every PROGRESS_EVERY items or PROGRESS_INTERVAL seconds instead of a line
+per item.
+
+Hot loops pass a message template plus fields, so a disabled event costs a
+level comparison and nothing is formatted:
+
+    log = get_log()
+    log.debug('lead_added', "✅ Added: {name}", name=lead['name'])
+
+Settings (environment variables override config.py):
+    LEADSCRAPER_LOG_LEVEL=DEBUG|INFO|WARNING|ERROR
+    LEADSCRAPER_LOG_FILE=data/run_log.jsonl
+"""
+
+import os
+import json
+import time
+import atexit
+import threading
+from typing import Dict, Optional
+
+from config import LOG_LEVEL, LOG_FILE, LOG_FILE_LEVEL, PROGRESS_EVERY, PROGRESS_INTERVAL
+from metrics import current_job
+
+DEBUG, INFO, WARNING, ERROR = 10, 20, 30, 40
+LEVELS = {'DEBUG': DEBUG, 'INFO': INFO, 'WARNING': WARNING, 'ERROR': ERROR}
+LEVEL_NAMES = {value: name for name, value in LEVELS.items()}
+
+# Buffered JSON lines written per flush (warnings and errors flush at once)
+FLUSH_EVERY = 100
+
+# Levels above every real one, for a sink that is switched off
+_OFF = 100
+
+
+def _level(value) -> int:
+    """Level number from a name such as "DEBUG" (or a number)"""
+    if isinstance(value, int):
+        return value
+    return LEVELS.get(str(value).upper(), INFO)
+
+
+class RunLog:
+    def __init__(self, level=INFO, path: str = None, file_level=DEBUG, console: bool = True):
+        """
+        Create a log
+
+        Args:
+            level: Lowest level shown on the console
+            path: JSON-lines file to record events in (None = no file)
+            file_level: Lowest level recorded in the file
+            console: Print events to stdout at all
+        """
+        self.console_level = _level(level) if console else _OFF
+        self.file_level = _level(file_level) if path else _OFF
+        # Events below this are dropped before anything else happens
+        self.level = min(self.console_level, self.file_level)
+        self.path = path
+        self._buffer = []
+        self._lock = threading.Lock()
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+    def enabled(self, level: int) -> bool:
+        """Whether an event at this level goes anywhere (guard for costly fields)"""
+        return level >= self.level
+
+    def debug(self, event: str, message: str = None, **fields):
+        if DEBUG >= self.level:
+            self._emit(DEBUG, event, message, fields)
+
+    def info(self, event: str, message: str = None, **fields):
+        if INFO >= self.level:
+            self._emit(INFO, event, message, fields)
+
+    def warning(self, event: str, message: str = None, **fields):
+        if WARNING >= self.level:
+            self._emit(WARNING, event, message, fields)
+
+    def error(self, event: str, message: str = None, **fields):
+        if ERROR >= self.level:
+            self._emit(ERROR, event, message, fields)
+
+    def _emit(self, level: int, event: str, message: Optional[str], fields: Dict):
+        if level >= self.console_level and message is not None:
+            print(message.format(**fields) if fields else message)
+
+        if level >= self.file_level:
+            record = {'ts': round(time.time(), 3), 'level': LEVEL_NAMES[level], 'event': event}
+            job_id = current_job()
+            if job_id:
+                record['job_id'] = job_id
+            record.update(fields)
+            line = json.dumps(record, default=str, ensure_ascii=False)
+            with self._lock:
+                self._buffer.append(line)
+                if len(self._buffer) >= FLUSH_EVERY or level >= WARNING:
+                    self._flush()
+
+    def _flush(self):
+        """Append buffered lines to the file (caller holds the lock)"""
+        if self._buffer:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write('\n'.join(self._buffer) + '\n')
+            self._buffer = []
+
+    def flush(self):
+        """Write any buffered events to the file"""
+        with self._lock:
+            self._flush()
+
+    def progress(self, name: str, total: int = None, every: int = None,
+                 interval: float = None) -> 'ProgressReporter':
+        """
+        Start a batched progress report for a loop
+
+        Args:
+            name: What is being counted (e.g. "leads")
+            total: Expected number of items, if known
+            every: Report after this many items (default: PROGRESS_EVERY)
+            interval: ... or after this many seconds (default: PROGRESS_INTERVAL)
+        """
+        return ProgressReporter(self, name, total, every, interval)
+
+
+class ProgressReporter:
+    """Counts items in a loop and logs a summary line every N items or T seconds"""
+
+    def __init__(self, log: RunLog, name: str, total: int = None,
+                 every: int = None, interval: float = None):
+        self.log = log
+        self.name = name
+        self.total = total
+        self.every = every or PROGRESS_EVERY
+        self.interval = interval or PROGRESS_INTERVAL
+        self.done = 0
+        self.counts = {}
+        self.started = time.monotonic()
+        self._next_count = self.every
+        self._next_time = self.started + self.interval
+        self._lock = threading.Lock()
+
+    def update(self, amount: int = 1, **counts):
+        """
+        Count finished items, plus any outcomes (e.g. update(emails=1))
+
+        Args:
+            amount: Items finished
+            counts: Outcome counters to add to
+        """
+        with self._lock:
+            self.done += amount
+            for key, value in counts.items():
+                self.counts[key] = self.counts.get(key, 0) + value
+            if self.done < self._next_count and time.monotonic() < self._next_time:
+                return
+            if self.total and self.done >= self.total:
+                return  # close() reports the end
+            self._next_count = self.done + self.every
+            self._next_time = time.monotonic() + self.interval
+            snapshot = self._snapshot()
+        self._report(snapshot)
+
+    def close(self):
+        """Log the final summary"""
+        with self._lock:
+            snapshot = self._snapshot()
+        self._report(snapshot, final=True)
+
+    def _snapshot(self) -> Dict:
+        elapsed = time.monotonic() - self.started
+        return {'done': self.done, 'total': self.total, 'elapsed': round(elapsed, 1),
+                'rate': round(self.done / elapsed, 2) if elapsed else None, **self.counts}
+
+    def _report(self, snapshot: Dict, final: bool = False):
+        done, total, rate = snapshot['done'], snapshot['total'], snapshot['rate']
+        message = f"📊 {self.name}: {done}/{total}" if total else f"📊 {self.name}: {done}"
+        if rate:
+            message += f" ({rate:.1f}/s"
+            if total and not final and done < total:
+                message += f", ~{(total - done) / rate:.0f}s left"
+            message += ")"
+        extras = ', '.join(f"{key}: {value}" for key, value in self.counts.items())
+        if extras:
+            message += f" - {extras}"
+        self.log.info('progress_done' if final else 'progress', "{summary}",
+                      summary=message, name=self.name, **snapshot)
+
+
+# Process-wide log shared by every scraper and the web app
+_shared_log = None
+_shared_log_lock = threading.Lock()
+
+
+def get_log() -> RunLog:
+    """Return the process-wide run log, configured from config.py and the environment"""
+    global _shared_log
+    with _shared_log_lock:
+        if _shared_log is None:
+            # Read when first needed rather than at import, so values from .env count
+            _shared_log = RunLog(os.getenv('LEADSCRAPER_LOG_LEVEL', LOG_LEVEL),
+                                 os.getenv('LEADSCRAPER_LOG_FILE', LOG_FILE),
+                                 LOG_FILE_LEVEL)
+            atexit.register(_shared_log.flush)
+        return _shared_log
@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""
+Task Queue - Shared work queue for worker processes (see worker.py)
+Tasks are leased rather than popped: a worker that takes a task owns it for
+a visibility timeout, extends the lease while it works, and completes or
+fails it at the end. If the worker dies, the lease runs out and another
+worker picks the task up again, until it has been tried max_attempts times.
+
+The default broker is a SQLite file, which every process on a machine (or
+on a shared disk) can use at once. Other brokers register a URL scheme:
+
+    register_broker('redis', RedisBroker)
+    broker = get_broker('redis://queue-host:6379/0')
+
+Usage:
+    python3 task_queue.py stats [--queue campaign:london]
+    python3 task_queue.py retry-failed [--queue campaign:london]
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import sqlite3
+import hashlib
+import argparse
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterable, Optional
+
+from config import TASK_QUEUE_URL, TASK_VISIBILITY_TIMEOUT, TASK_MAX_ATTEMPTS
+
+STATUSES = ('queued', 'leased', 'done', 'failed')
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS tasks (
+        task_id TEXT PRIMARY KEY,
+        queue TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        payload TEXT,
+        status TEXT NOT NULL DEFAULT 'queued',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        max_attempts INTEGER NOT NULL,
+        lease_owner TEXT,
+        lease_expires REAL,
+        result TEXT,
+        error TEXT,
+        created_at REAL,
+        updated_at REAL
+    );
+    CREATE INDEX IF NOT EXISTS idx_tasks_ready ON tasks (queue, status, created_at);
+
+    CREATE TABLE IF NOT EXISTS claims (
+        namespace TEXT NOT NULL,
+        claim_key TEXT NOT NULL,
+        task_id TEXT,
+        PRIMARY KEY (namespace, claim_key)
+    );
+'''
+
+
+class Task:
+    """One leased unit of work"""
+
+    __slots__ = ('task_id', 'queue', 'kind', 'payload', 'attempts', 'max_attempts')
+
+    def __init__(self, task_id: str, queue: str, kind: str, payload: Dict,
+                 attempts: int, max_attempts: int):
+        self.task_id = task_id
+        self.queue = queue
+        self.kind = kind
+        self.payload = payload
+        self.attempts = attempts
+        self.max_attempts = max_attempts
+
+    def __repr__(self):
+        return f"Task({self.kind} {self.task_id} on {self.queue}, attempt {self.attempts}/{self.max_attempts})"
+
+
+def task_id_for(queue: str, kind: str, key: str) -> str:
+    """Stable task id, so enqueuing the same work twice adds it once"""
+    return hashlib.sha1(f"{queue}|{kind}|{key}".encode('utf-8')).hexdigest()[:16]
+
+
+class Broker(ABC):
+    """Interface every broker implements (see SqliteBroker for the full contract)"""
+
+    @abstractmethod
+    def enqueue(self, kind: str, payload: Dict, queue: str = 'default', key: str = None,
+                max_attempts: int = None) -> str:
+        """Add a task and return its id; a key makes enqueuing the same work idempotent"""
+
+    @abstractmethod
+    def lease(self, worker_id: str, queues: Iterable[str] = None,
+              visibility_timeout: float = None) -> Optional[Task]:
+        """Take the oldest ready task for visibility_timeout seconds, or None"""
+
+    @abstractmethod
+    def extend(self, task: Task, worker_id: str, visibility_timeout: float = None) -> bool:
+        """Keep holding a task; False if the lease was lost"""
+
+    @abstractmethod
+    def complete(self, task: Task, worker_id: str, result: Dict = None) -> bool:
+        """Mark a task done; False if the lease was lost"""
+
+    @abstractmethod
+    def fail(self, task: Task, worker_id: str, error: str) -> bool:
+        """Give a task back for another try (or fail it for good); False if the lease was lost"""
+
+    @abstractmethod
+    def claim(self, namespace: str, key: str, task_id: str = None) -> bool:
+        """Claim a key for one task across every worker; False if another task holds it"""
+
+    @abstractmethod
+    def release(self, namespace: str, key: str, task_id: str = None) -> bool:
+        """Give back a key the task claimed"""
+
+    @abstractmethod
+    def stats(self, queue: str = None) -> Dict[str, int]:
+        """Number of tasks in each status"""
+
+    @abstractmethod
+    def results(self, queue: str, kind: str = None) -> Dict[str, Dict]:
+        """Finished and failed tasks of a queue by task id"""
+
+    @abstractmethod
+    def retry_failed(self, queue: str = None) -> int:
+        """Queue every failed task again; returns how many"""
+
+
+class SqliteBroker(Broker):
+    def __init__(self, path: str):
+        """
+        Open (or create) a queue database
+
+        Args:
+            path: SQLite file shared by every producer and worker
+        """
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        # Autocommit mode; leases take the write lock up front with BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(SCHEMA)
+
+    def _write(self, sql: str, params: tuple) -> int:
+        """Run one write statement and return the number of rows it changed"""
+        with self._lock:
+            return self._conn.execute(sql, params).rowcount
+
+    def enqueue(self, kind: str, payload: Dict, queue: str = 'default', key: str = None,
+                max_attempts: int = None) -> str:
+        """
+        Add a task (a failed task with the same key is queued again)
+
+        Args:
+            kind: Handler name (see worker.py)
+            payload: JSON-serializable arguments for the handler
+            queue: Queue name, e.g. "campaign:london"
+            key: Identity of the work for idempotent enqueuing (default: a new task)
+            max_attempts: Tries before the task is marked failed
+
+        Returns:
+            The task id
+        """
+        task_id = task_id_for(queue, kind, key) if key else uuid.uuid4().hex[:16]
+        now = time.time()
+        self._write(
+            "INSERT INTO tasks (task_id, queue, kind, payload, status, max_attempts, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, 'queued', ?, ?, ?) "
+            "ON CONFLICT (task_id) DO UPDATE SET status = 'queued', attempts = 0, error = NULL, "
+            "payload = excluded.payload, updated_at = excluded.updated_at WHERE tasks.status = 'failed'",
+            (task_id, queue, kind, json.dumps(payload), max_attempts or TASK_MAX_ATTEMPTS, now, now)
+        )
+        return task_id
+
+    def lease(self, worker_id: str, queues: Iterable[str] = None,
+              visibility_timeout: float = None) -> Optional[Task]:
+        """
+        Take the oldest ready task: a queued one, or a leased one whose worker
+        let its lease expire
+
+        Args:
+            worker_id: Identity of the leasing worker
+            queues: Only take tasks from these queues (default: any)
+            visibility_timeout: Seconds before the task is offered to other workers
+
+        Returns:
+            The leased Task, or None when nothing is ready
+        """
+        now = time.time()
+        queues = list(queues or [])
+        where = "(status = 'queued' OR (status = 'leased' AND lease_expires < ?))"
+        params = [now]
+        if queues:
+            where += f" AND queue IN ({', '.join('?' * len(queues))})"
+            params += queues
+
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                while True:
+                    row = self._conn.execute(
+                        f"SELECT * FROM tasks WHERE {where} ORDER BY created_at LIMIT 1", params
+                    ).fetchone()
+                    if row is None:
+                        self._conn.execute('COMMIT')
+                        return None
+                    if row['attempts'] >= row['max_attempts']:
+                        # Its last worker died holding it; don't hand it out again
+                        self._conn.execute(
+                            "UPDATE tasks SET status = 'failed', error = ?, lease_owner = NULL, updated_at = ? "
+                            "WHERE task_id = ?",
+                            (row['error'] or 'Lease expired on the last attempt', now, row['task_id'])
+                        )
+                        self._conn.execute('DELETE FROM claims WHERE task_id = ?', (row['task_id'],))
+                        continue
+                    self._conn.execute(
+                        "UPDATE tasks SET status = 'leased', attempts = attempts + 1, lease_owner = ?, "
+                        "lease_expires = ?, updated_at = ? WHERE task_id = ?",
+                        (worker_id, now + (visibility_timeout or TASK_VISIBILITY_TIMEOUT), now, row['task_id'])
+                    )
+                    self._conn.execute('COMMIT')
+                    return Task(row['task_id'], row['queue'], row['kind'], json.loads(row['payload'] or '{}'),
+                                row['attempts'] + 1, row['max_attempts'])
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+
+    def extend(self, task: Task, worker_id: str, visibility_timeout: float = None) -> bool:
+        """Keep holding a task; False if the lease was lost to another worker"""
+        return self._write(
+            "UPDATE tasks SET lease_expires = ?, updated_at = ? "
+            "WHERE task_id = ? AND status = 'leased' AND lease_owner = ?",
+            (time.time() + (visibility_timeout or TASK_VISIBILITY_TIMEOUT), time.time(), task.task_id, worker_id)
+        ) == 1
+
+    def complete(self, task: Task, worker_id: str, result: Dict = None) -> bool:
+        """Mark a task done with its result; False if the lease was lost"""
+        return self._write(
+            "UPDATE tasks SET status = 'done', result = ?, lease_owner = NULL, updated_at = ? "
+            "WHERE task_id = ? AND status = 'leased' AND lease_owner = ?",
+            (json.dumps(result) if result is not None else None, time.time(), task.task_id, worker_id)
+        ) == 1
+
+    def fail(self, task: Task, worker_id: str, error: str) -> bool:
+        """
+        Give a task back for another try, or mark it failed after its last
+        attempt (which also releases everything it claimed)
+        """
+        status = 'failed' if task.attempts >= task.max_attempts else 'queued'
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                updated = self._conn.execute(
+                    "UPDATE tasks SET status = ?, error = ?, lease_owner = NULL, updated_at = ? "
+                    "WHERE task_id = ? AND status = 'leased' AND lease_owner = ?",
+                    (status, error, time.time(), task.task_id, worker_id)
+                ).rowcount == 1
+                if updated and status == 'failed':
+                    self._conn.execute('DELETE FROM claims WHERE task_id = ?', (task.task_id,))
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        return updated
+
+    def claim(self, namespace: str, key: str, task_id: str = None) -> bool:
+        """
+        Claim a key for one task across every worker (e.g. a place_id within a campaign)
+
+        Returns:
+            True for the first claim of the key, or a repeat claim by the same task
+            (a retried task keeps what it claimed before)
+        """
+        if self._write('INSERT OR IGNORE INTO claims (namespace, claim_key, task_id) VALUES (?, ?, ?)',
+                       (namespace, key, task_id)) == 1:
+            return True
+        if task_id is None:
+            return False
+        with self._lock:
+            row = self._conn.execute('SELECT task_id FROM claims WHERE namespace = ? AND claim_key = ?',
+                                     (namespace, key)).fetchone()
+        return row is not None and row['task_id'] == task_id
+
+    def release(self, namespace: str, key: str, task_id: str = None) -> bool:
+        """Give back a key this task claimed (e.g. a place whose details failed); False if it didn't hold it"""
+        return self._write('DELETE FROM claims WHERE namespace = ? AND claim_key = ? AND task_id IS ?',
+                           (namespace, key, task_id)) == 1
+
+    def stats(self, queue: str = None) -> Dict[str, int]:
+        """Number of tasks in each status"""
+        sql = 'SELECT status, COUNT(*) AS count FROM tasks'
+        params = ()
+        if queue:
+            sql += ' WHERE queue = ?'
+            params = (queue,)
+        with self._lock:
+            rows = self._conn.execute(sql + ' GROUP BY status', params).fetchall()
+        counts = dict.fromkeys(STATUSES, 0)
+        counts.update({row['status']: row['count'] for row in rows})
+        return counts
+
+    def results(self, queue: str, kind: str = None) -> Dict[str, Dict]:
+        """Finished and failed tasks of a queue: task id -> status, payload, result and error"""
+        sql = "SELECT task_id, status, payload, result, error FROM tasks WHERE queue = ? AND status IN ('done', 'failed')"
+        params = [queue]
+        if kind:
+            sql += ' AND kind = ?'
+            params.append(kind)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return {
+            row['task_id']: {
+                'status': row['status'],
+                'payload': json.loads(row['payload'] or '{}'),
+                'result': json.loads(row['result']) if row['result'] else None,
+                'error': row['error']
+            }
+            for row in rows
+        }
+
+    def retry_failed(self, queue: str = None) -> int:
+        """Queue every failed task again; returns how many"""
+        sql = "UPDATE tasks SET status = 'queued', attempts = 0, updated_at = ? WHERE status = 'failed'"
+        params = [time.time()]
+        if queue:
+            sql += ' AND queue = ?'
+            params.append(queue)
+        return self._write(sql, tuple(params))
+
+
+# Broker factories by URL scheme
+BROKERS: Dict[str, Callable[[str], Broker]] = {}
+
+
+def register_broker(scheme: str, factory: Callable[[str], Broker]):
+    """Make get_broker() build brokers for URLs with this scheme"""
+    BROKERS[scheme] = factory
+
+
+def _sqlite_broker(url: str) -> SqliteBroker:
+    """sqlite:///data/tasks.db (relative path) or sqlite:////srv/tasks.db (absolute)"""
+    if not url.startswith('sqlite:///'):
+        raise ValueError(f"SQLite broker URLs look like sqlite:///data/tasks.db, not {url}")
+    return SqliteBroker(url[len('sqlite:///'):])
+
+
+register_broker('sqlite', _sqlite_broker)
+
+_brokers = {}
+_brokers_lock = threading.Lock()
+
+
+def get_broker(url: str = None) -> Broker:
+    """
+    Return the shared broker for a URL
+
+    Args:
+        url: Broker URL (default: LEADSCRAPER_TASK_QUEUE or TASK_QUEUE_URL);
+             sqlite:///data/tasks.db is relative, sqlite:////srv/tasks.db absolute
+    """
+    url = url or os.getenv('LEADSCRAPER_TASK_QUEUE') or TASK_QUEUE_URL
+    scheme = url.split('://', 1)[0]
+    if scheme not in BROKERS:
+        raise ValueError(f"No broker registered for {scheme}:// (known: {', '.join(sorted(BROKERS))})")
+    with _brokers_lock:
+        if url not in _brokers:
+            _brokers[url] = BROKERS[scheme](url)
+        return _brokers[url]
+
+
+def main():
+    """Inspect the task queue and retry failed tasks"""
+    parser = argparse.ArgumentParser(description="Inspect the shared task queue")
+    parser.add_argument('command', choices=['stats', 'retry-failed'])
+    parser.add_argument('--queue', help="Only this queue")
+    parser.add_argument('--broker', help="Broker URL (default: TASK_QUEUE_URL)")
+    args = parser.parse_args()
+
+    broker = get_broker(args.broker)
+    if args.command == 'retry-failed':
+        print(f"🔁 Queued {broker.retry_failed(args.queue)} failed tasks again")
+    counts = broker.stats(args.queue)
+    print(f"📊 Tasks{' in ' + args.queue if args.queue else ''}: "
+          + ', '.join(f"{count} {status}" for status, count in counts.items()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
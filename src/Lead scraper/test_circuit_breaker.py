@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Tests for the host circuit breaker and how website fetches report to it
+Run with: python3 -m pytest test_circuit_breaker.py
+"""
+
+import json
+import time
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from circuit_breaker import HostBlocked, HostCircuitBreaker, host_for, CLOSED, OPEN, HALF_OPEN
+from job_control import Deadline
+from website_emails import WebsiteEmailFinder
+from http_cache import HttpCache
+from host_throttle import HostThrottle
+from page_parser import ParserPool
+
+
+def make_breaker(tmp_path, **kwargs):
+    return HostCircuitBreaker(path=str(tmp_path / 'blocklist.json'), reset_timeout=60, **kwargs)
+
+
+def read_blocklist(tmp_path):
+    path = tmp_path / 'blocklist.json'
+    return json.loads(path.read_text()) if path.exists() else {}
+
+
+def test_single_failure_opens_circuit_but_does_not_block_later_runs(tmp_path):
+    breaker = make_breaker(tmp_path, failure_threshold=1, block_threshold=3)
+    breaker.record_failure('https://slow.example.com', 'timed out')
+
+    assert breaker.state('http://www.slow.example.com/contact') == OPEN
+    assert not breaker.allow('https://slow.example.com')
+    entry = read_blocklist(tmp_path)['slow.example.com']
+    assert entry['failures'] == 1 and 'until' not in entry
+    # A later run starts with the host closed
+    assert make_breaker(tmp_path).allow('https://slow.example.com')
+
+
+def test_half_open_allows_one_trial_and_success_closes(tmp_path):
+    breaker = HostCircuitBreaker(path=str(tmp_path / 'blocklist.json'), reset_timeout=0, block_threshold=5)
+    breaker.record_failure('https://flaky.example.com')
+
+    assert breaker.allow('https://flaky.example.com')
+    assert breaker.state('https://flaky.example.com') == HALF_OPEN
+    assert not breaker.allow('https://flaky.example.com')
+
+    breaker.record_success('https://flaky.example.com')
+    assert breaker.state('https://flaky.example.com') == CLOSED
+
+
+def test_saving_keeps_other_processes_entries(tmp_path):
+    first = make_breaker(tmp_path, block_threshold=1)
+    second = make_breaker(tmp_path, block_threshold=1)
+
+    first.record_failure('https://a.example.com')
+    second.record_failure('https://b.example.com')
+    assert set(read_blocklist(tmp_path)) == {'a.example.com', 'b.example.com'}
+
+    # Unblocking a host only removes that host
+    first.record_success('https://a.example.com')
+    assert set(read_blocklist(tmp_path)) == {'b.example.com'}
+
+
+def test_persist_false_never_touches_disk(tmp_path):
+    (tmp_path / 'blocklist.json').write_text(json.dumps({'old.example.com': {'until': time.time() + 60}}))
+    breaker = make_breaker(tmp_path, block_threshold=1, persist=False)
+
+    assert breaker.allow('https://old.example.com')
+    breaker.record_failure('https://new.example.com')
+    assert set(read_blocklist(tmp_path)) == {'old.example.com'}
+
+
+def make_finder(tmp_path, breaker):
+    session = requests.Session()
+    session.trust_env = False
+    return WebsiteEmailFinder(session=session, parser_pool=ParserPool(workers=0), breaker=breaker,
+                              http_cache=HttpCache(str(tmp_path / 'cache.db')), throttle=HostThrottle(0))
+
+
+def dead_url():
+    """URL of a local port nothing listens on"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}/"
+
+
+def test_dead_host_is_blocked_after_failing_in_several_runs(tmp_path):
+    url = dead_url()
+    for run in range(1, 4):
+        # Each run is a fresh breaker, as in a new process
+        breaker = make_breaker(tmp_path, failure_threshold=1, block_threshold=3)
+        assert breaker.allow(url)
+        finder = make_finder(tmp_path, breaker)
+        for _ in range(20):  # Many leads on the same dead host
+            with pytest.raises((requests.ConnectionError, HostBlocked)):
+                finder.fetch_page(url + 'contact')
+        assert read_blocklist(tmp_path)[host_for(url)]['failures'] == run
+
+    assert 'until' in read_blocklist(tmp_path)[host_for(url)]
+    later_run = make_breaker(tmp_path)
+    assert not later_run.allow(url)
+    assert make_finder(tmp_path, later_run).find_emails(url) == []
+
+
+class SlowSite:
+    """Local site that answers after a delay"""
+
+    def __init__(self, delay):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                time.sleep(site.delay)
+                body = b'<html><body>hello@slow.example.com</body></html>'
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.delay = delay
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/"
+
+
+@pytest.fixture
+def slow_site():
+    site = SlowSite(delay=2)
+    yield site
+    site.server.shutdown()
+    site.server.server_close()
+
+
+def test_budget_shortened_timeout_does_not_block_host(tmp_path, slow_site):
+    breaker = make_breaker(tmp_path, failure_threshold=1, block_threshold=1)
+    finder = make_finder(tmp_path, breaker)
+
+    with pytest.raises(requests.RequestException):
+        finder.fetch_page(slow_site.url, Deadline(1.0))
+
+    assert breaker.state(slow_site.url) == CLOSED
+    assert read_blocklist(tmp_path) == {}
+    # Without a deadline the healthy host still answers
+    assert finder.fetch_page(slow_site.url)['emails'] == ['hello@slow.example.com']
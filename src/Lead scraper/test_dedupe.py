@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Tests for lead normalization and entity resolution
+Run with: python3 -m pytest test_dedupe.py
+"""
+
+import pandas as pd
+import pytest
+
+from dedupe import (UnionFind, dedupe_dataframe, dedupe_leads, merge_cluster, normalize_domain,
+                    normalize_name, normalize_phone, normalize_postcode)
+
+
+@pytest.mark.parametrize('phone', ['020 7123 4567', '+44 20 7123 4567', '+44 (0)20 7123 4567',
+                                   '0044 20 7123 4567'])
+def test_uk_numbers_normalize_to_e164(phone):
+    assert normalize_phone(phone, 'GB') == '+442071234567'
+
+
+def test_us_numbers_and_junk():
+    assert normalize_phone('(212) 555-0123', 'US') == '+12125550123'
+    assert normalize_phone('n/a') == ''
+    assert normalize_phone(None) == ''
+    assert normalize_phone(float('nan')) == ''
+
+
+def test_name_domain_and_postcode_normalization():
+    assert normalize_name('The Café & Bakery Ltd.') == 'cafe bakery'
+    assert normalize_domain('https://www.Example.co.uk/contact') == 'example.co.uk'
+    assert normalize_domain('https://facebook.com/somecafe') == ''
+    assert normalize_domain('https://mycafe.business.site') == ''
+    assert normalize_postcode('12 High St, London E8 1AB, UK') == 'E81AB'
+    assert normalize_postcode('1 Main St, New York, NY 10001-1234') == '10001'
+
+
+def test_union_find_keeps_different_labels_apart():
+    groups = UnionFind(3, ['place-a', '', 'place-b'])
+    groups.union(0, 1)
+    groups.union(1, 2)
+
+    assert groups.find(0) == groups.find(1)
+    assert groups.find(2) != groups.find(0)
+
+
+def test_same_business_without_place_id_is_merged():
+    leads = [
+        {'place_id': 'p1', 'name': 'Hackney Coffee Co', 'phone': '020 7123 4567',
+         'address': '1 Mare St, London E8 1AB', 'website': 'https://hackneycoffee.co.uk', 'emails': ''},
+        {'name': 'Hackney Coffee', 'phone': '+44 20 7123 4567', 'address': '',
+         'website': '', 'emails': 'hello@hackneycoffee.co.uk'},
+        {'place_id': 'p2', 'name': 'Dalston Bakery', 'phone': '020 7999 0000',
+         'address': '5 Kingsland Rd, London E8 2AA', 'website': '', 'emails': ''},
+    ]
+    merged, clusters = dedupe_leads(leads)
+
+    assert clusters == [[0, 1], [2]]
+    assert merged[0]['place_id'] == 'p1'
+    assert merged[0]['emails'] == 'hello@hackneycoffee.co.uk'
+    assert merged[0]['cluster_size'] == 2
+
+
+def test_different_place_ids_are_never_merged():
+    leads = [{'place_id': 'p1', 'name': 'Pret A Manger', 'phone': '020 7123 4567'},
+             {'place_id': 'p2', 'name': 'Pret A Manger', 'phone': '020 7123 4567'}]
+
+    assert len(dedupe_leads(leads)[0]) == 2
+
+
+def test_chain_branches_sharing_a_domain_stay_apart():
+    leads = [{'name': 'Gail\'s Bakery', 'website': 'https://gails.com', 'address': 'London N1 9AA'},
+             {'name': 'Gail\'s Bakery', 'website': 'https://gails.com', 'address': 'London SW1A 1AA'}]
+
+    assert len(dedupe_leads(leads)[0]) == 2
+
+
+def test_oversized_block_still_joins_identical_names():
+    leads = [{'name': 'Same Name', 'address': 'London E8 1AB'} for _ in range(5)]
+    leads += [{'name': f"Shop {i}", 'address': 'London E8 1AB'} for i in range(5)]
+
+    merged, clusters = dedupe_leads(leads, max_block_size=3)
+    assert sorted(len(rows) for rows in clusters) == [1, 1, 1, 1, 1, 5]
+
+
+def test_merge_cluster_prefers_place_id_and_unions_emails():
+    merged = merge_cluster([
+        {'name': 'Cafe', 'phone': '', 'emails': 'a@cafe.com, b@cafe.com'},
+        {'place_id': 'p1', 'name': 'Cafe Ltd', 'phone': '020 7123 4567', 'emails': 'A@cafe.com'},
+    ])
+
+    assert merged['place_id'] == 'p1'
+    assert merged['name'] == 'Cafe Ltd'
+    assert merged['emails'] == 'A@cafe.com, b@cafe.com'
+
+
+def test_dedupe_dataframe_lists_every_input_row():
+    df = pd.DataFrame([
+        {'name': 'Cafe One', 'phone': '020 7123 4567', 'address': '', 'website': '', 'place_id': ''},
+        {'name': 'Cafe One', 'phone': '02071234567', 'address': '', 'website': '', 'place_id': ''},
+    ])
+    merged, members = dedupe_dataframe(df)
+
+    assert len(merged) == 1
+    assert list(members['row']) == [0, 1]
+    assert set(members['cluster_id']) == {1}
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Tests for the per-host politeness throttle
+Run with: python3 -m pytest test_host_throttle.py
+"""
+
+import time
+import threading
+
+import pytest
+
+from host_throttle import HostThrottle
+from job_control import Deadline, JobCancelled
+
+
+def test_requests_to_one_host_are_spaced_out():
+    throttle = HostThrottle(interval=0.2)
+    started = time.monotonic()
+    for path in ('/', '/contact', '/about'):
+        throttle.wait(f"https://www.example.com{path}")
+
+    assert time.monotonic() - started >= 0.38
+
+
+def test_threads_share_the_limit_but_not_across_hosts():
+    throttle = HostThrottle(interval=0.2)
+    finished = []
+
+    def fetch(url):
+        throttle.wait(url)
+        finished.append((url, time.monotonic()))
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=fetch, args=(url,))
+               for url in ['https://a.example.com/', 'http://www.a.example.com/contact',
+                           'https://b.example.com/', 'https://c.example.com/']]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    delays = sorted(at - started for url, at in finished)
+    assert delays[2] < 0.1  # Three different hosts go straight away
+    assert delays[3] >= 0.18  # The second request to a.example.com waits its turn
+
+
+def test_slot_after_deadline_raises_without_reserving():
+    throttle = HostThrottle(interval=5)
+    throttle.wait('https://example.com/')
+
+    with pytest.raises(JobCancelled):
+        throttle.wait('https://example.com/contact', Deadline(1))
+    assert throttle._next_slot['example.com'] - time.monotonic() <= 5
+
+
+def test_zero_interval_turns_the_limit_off():
+    throttle = HostThrottle(interval=0)
+    started = time.monotonic()
+    for _ in range(5):
+        throttle.wait('https://example.com/')
+
+    assert time.monotonic() - started < 0.05
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Tests for conditional refreshes through the HTTP cache, including redirected pages
+Run with: python3 -m pytest test_http_cache.py
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from circuit_breaker import HostCircuitBreaker
+from http_cache import HttpCache
+from host_throttle import HostThrottle
+from page_parser import ParserPool
+from website_emails import WebsiteEmailFinder
+
+PAGE = b'<html><body><a href="mailto:hello@example.com">Email us</a></body></html>'
+ETAG = '"v1"'
+
+
+class SiteHandler(BaseHTTPRequestHandler):
+    """/old redirects to /page, which answers 304 to a matching If-None-Match"""
+
+    full_responses = 0
+
+    def do_GET(self):
+        if self.path == '/old':
+            self.send_response(301)
+            self.send_header('Location', '/page')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        elif self.headers.get('If-None-Match') == ETAG:
+            self.send_response(304)
+            self.end_headers()
+        else:
+            type(self).full_responses += 1
+            self.send_response(200)
+            self.send_header('ETag', ETAG)
+            self.send_header('Content-Type', 'text/html')
+            self.send_header('Content-Length', str(len(PAGE)))
+            self.end_headers()
+            self.wfile.write(PAGE)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def site():
+    SiteHandler.full_responses = 0
+    server = ThreadingHTTPServer(('127.0.0.1', 0), SiteHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def finder(tmp_path):
+    session = requests.Session()
+    session.trust_env = False
+    breaker = HostCircuitBreaker(path=str(tmp_path / 'blocklist.json'))
+    return WebsiteEmailFinder(session=session, parser_pool=ParserPool(workers=0), breaker=breaker,
+                              http_cache=HttpCache(str(tmp_path / 'cache.db')), throttle=HostThrottle(0))
+
+
+def test_redirected_page_is_revalidated_by_its_requested_url(site, finder):
+    first = finder.fetch_page(f"{site}/old")
+    again = finder.fetch_page(f"{site}/old")
+
+    assert first['emails'] == again['emails'] == ['hello@example.com']
+    assert SiteHandler.full_responses == 1
+
+
+def test_redirect_target_shares_the_cached_entry(site, finder):
+    finder.fetch_page(f"{site}/old")
+
+    assert finder.fetch_page(f"{site}/page")['emails'] == ['hello@example.com']
+    assert SiteHandler.full_responses == 1
+
+
+def test_cache_keys_ignore_trivial_url_differences(tmp_path):
+    cache = HttpCache(str(tmp_path / 'cache.db'))
+    cache.store('https://Example.com', {'ETag': ETAG}, 'hash', {'emails': []})
+
+    assert cache.conditional_headers('https://example.com/#contact') == {'If-None-Match': ETAG}
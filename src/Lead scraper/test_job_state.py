@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared web job state and the JobReporter heartbeat
+Run with: python3 -m pytest test_job_state.py
+"""
+
+import time
+import sqlite3
+
+import pytest
+
+from job_control import JobControl
+from job_state import JobReporter, JobState, SqliteJobState, get_job_state
+
+
+@pytest.fixture
+def state(tmp_path):
+    return SqliteJobState(str(tmp_path / 'web_jobs.db'), stale_after=60)
+
+
+def wait_for(condition, timeout=3):
+    expires_at = time.monotonic() + timeout
+    while time.monotonic() < expires_at:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_reporter_publishes_progress(state):
+    state.create('job1', total_queries=2)
+    reporter = JobReporter(state, 'job1', interval=0.05)
+    reporter.set(status='running', progress=50)
+
+    assert wait_for(lambda: state.get('job1')['progress'] == 50)
+    reporter.close(status='completed', progress=100)
+    assert state.get('job1')['status'] == 'completed'
+
+
+def test_failed_write_does_not_stop_heartbeat(state, monkeypatch):
+    state.create('job1', total_queries=1)
+    update = state.update
+
+    def strict_update(job_id, **fields):
+        # Stands in for a store that serializes fields itself
+        if not isinstance(fields.get('message', ''), str):
+            raise TypeError('Object of type object is not JSON serializable')
+        update(job_id, **fields)
+
+    monkeypatch.setattr(state, 'update', strict_update)
+    reporter = JobReporter(state, 'job1', interval=0.05)
+    reporter.set(message=object())
+
+    time.sleep(0.2)
+    assert reporter._thread.is_alive()
+    reporter.set(progress=70)
+    assert wait_for(lambda: state.get('job1')['progress'] == 70)
+    reporter.close()
+
+
+def test_busy_database_keeps_pending_fields(state, monkeypatch):
+    state.create('job1', total_queries=1)
+    update = state.update
+    calls = []
+
+    def busy_once(job_id, **fields):
+        calls.append(fields)
+        if len(calls) == 1:
+            raise sqlite3.OperationalError('database is locked')
+        update(job_id, **fields)
+
+    monkeypatch.setattr(state, 'update', busy_once)
+    reporter = JobReporter(state, 'job1', interval=0.05)
+    reporter.set(progress=30)
+
+    assert wait_for(lambda: state.get('job1')['progress'] == 30)
+    reporter.close()
+
+
+def test_cancel_from_another_process_reaches_control(state):
+    state.create('job1', total_queries=1)
+    control = JobControl()
+    reporter = JobReporter(state, 'job1', control=control, interval=0.05)
+
+    assert state.request_cancel('job1')
+    assert wait_for(lambda: control.cancelled)
+    reporter.close(status='cancelled')
+    assert not state.request_cancel('job1')
+
+
+def test_job_without_heartbeat_is_failed(tmp_path):
+    state = SqliteJobState(str(tmp_path / 'web_jobs.db'), stale_after=0.1)
+    state.create('job1', total_queries=1)
+    time.sleep(0.2)
+
+    job = state.get('job1')
+    assert job['status'] == 'failed'
+    assert not job['is_running']
+    assert state.active() == []
+
+
+def test_job_state_interface_is_abstract():
+    class Incomplete(JobState):
+        def get(self, job_id):
+            return None
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_get_job_state_rejects_unknown_scheme():
+    with pytest.raises(ValueError):
+        get_job_state('memcached://state-host')
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Tests for the lead database: upserts, job membership and exports
+Run with: python3 -m pytest test_lead_store.py
+"""
+
+import csv
+
+import pytest
+
+from lead_store import LeadStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return LeadStore(str(tmp_path / 'leads.db'), export_dir=str(tmp_path / 'exports'))
+
+
+def lead(phone, scraped_at, emails=''):
+    return {'place_id': 'p1', 'name': 'Hackney Coffee', 'phone': phone,
+            'scraped_at': scraped_at, 'emails': emails}
+
+
+def read_csv(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+def test_newer_scrape_wins_and_empty_emails_keep_old_ones(store):
+    store.upsert(lead('020 7000 0001', '2026-01-01T10:00:00', 'hi@hackneycoffee.co.uk'))
+    store.upsert(lead('020 7000 0002', '2026-02-01T10:00:00'))
+    store.upsert(lead('020 7000 0000', '2025-12-01T10:00:00'))
+
+    [stored] = store.leads()
+    assert stored['phone'] == '020 7000 0002'
+    assert stored['emails'] == 'hi@hackneycoffee.co.uk'
+    assert store.count()['leads'] == 1
+
+
+def test_job_export_shows_latest_stored_values(store):
+    first = store.start_job('scrape', ['cafes'])
+    store.upsert(lead('020 7000 0001', '2026-01-01T10:00:00'), first)
+    store.finish_job(first)
+    second = store.start_job('scrape', ['coffee'])
+    store.upsert(lead('020 7000 0002', '2026-02-01T10:00:00'), second)
+    store.finish_job(second)
+
+    path = store.export(first)
+    assert [row['phone'] for row in read_csv(path)] == ['020 7000 0002']
+    assert store.get_job(first)['lead_count'] == 1
+
+
+def test_finished_job_export_is_reused(store):
+    job_id = store.start_job('scrape', ['cafes'])
+    store.upsert(lead('020 7000 0001', '2026-01-01T10:00:00'), job_id)
+    store.finish_job(job_id)
+
+    path = store.export(job_id)
+    store.upsert(lead('020 7000 0002', '2026-02-01T10:00:00'))
+    assert store.export(job_id) == path
+    assert [row['phone'] for row in read_csv(path)] == ['020 7000 0001']
+    assert store.export(job_id, has_email=True) is None
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Tests for geocoding each location once, including locations that can't be found
+Run with: python3 -m pytest test_location_resolver.py
+"""
+
+import time
+
+import location_resolver
+from location_resolver import LocationResolver
+
+LONDON = [{'formatted_address': 'London, UK',
+           'geometry': {'location': {'lat': 51.5072, 'lng': -0.1276}}}]
+
+
+class FakeGeocoder:
+    """Stands in for googlemaps.Client.geocode and counts its calls"""
+
+    def __init__(self, results=None, error=None):
+        self.results = results or []
+        self.error = error
+        self.calls = 0
+
+    def __call__(self, address):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return self.results
+
+
+def test_location_is_geocoded_once_across_resolvers(tmp_path):
+    geocoder = FakeGeocoder(LONDON)
+    cache_path = str(tmp_path / 'geocode.json')
+
+    assert LocationResolver(geocoder, cache_path).latlng('London, UK') == (51.5072, -0.1276)
+    assert LocationResolver(geocoder, cache_path).latlng('london,  uk') == (51.5072, -0.1276)
+    assert geocoder.calls == 1
+
+
+def test_unknown_location_is_not_geocoded_again_until_its_entry_expires(tmp_path, monkeypatch):
+    geocoder = FakeGeocoder([])
+    cache_path = str(tmp_path / 'geocode.json')
+
+    assert LocationResolver(geocoder, cache_path).resolve('Nowhereville') is None
+    assert LocationResolver(geocoder, cache_path).resolve('Nowhereville') is None
+    assert geocoder.calls == 1
+
+    monkeypatch.setattr(location_resolver, 'GEOCODE_FAILURE_TTL', 0)
+    geocoder.results = LONDON
+    assert LocationResolver(geocoder, cache_path).resolve('Nowhereville')['lat'] == 51.5072
+    assert geocoder.calls == 2
+
+
+def test_geocoding_errors_are_retried_sooner(tmp_path, monkeypatch):
+    monkeypatch.setattr(location_resolver, 'GEOCODE_ERROR_TTL', 0.1)
+    geocoder = FakeGeocoder(error=RuntimeError('OVER_QUERY_LIMIT'))
+    resolver = LocationResolver(geocoder, str(tmp_path / 'geocode.json'))
+
+    assert resolver.resolve('London, UK') is None
+    assert resolver.resolve('London, UK') is None
+    assert geocoder.calls == 1
+
+    time.sleep(0.15)
+    geocoder.error, geocoder.results = None, LONDON
+    assert resolver.latlng('London, UK') == (51.5072, -0.1276)
+    assert geocoder.calls == 2
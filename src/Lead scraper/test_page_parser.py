@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Tests for the parser pool's time limits and recovery from dead workers
+Run with: python3 -m pytest test_page_parser.py
+"""
+
+import os
+import signal
+
+import pytest
+
+from job_control import Deadline, JobControl
+from page_parser import ParserPool
+
+PAGE = b'<html><body><p>Write to hello@example.com</p>\n<a href="/contact">Contact us</a></body></html>'
+
+
+@pytest.fixture
+def pool():
+    pool = ParserPool(workers=1, parser='html.parser')
+    yield pool
+    pool.shutdown()
+
+
+def test_parse_in_worker_process(pool):
+    result = pool.parse(PAGE, 'https://example.com/')
+
+    assert result['emails'] == ['hello@example.com']
+    assert result['contact_links'][0] == 'https://example.com/contact'
+
+
+def test_expired_deadline_returns_none(pool):
+    assert pool.parse(PAGE, 'https://example.com/', Deadline(0)) is None
+
+
+def test_cancelled_job_returns_none(pool):
+    control = JobControl()
+    control.cancel()
+
+    assert pool.parse(PAGE, 'https://example.com/', Deadline(30, parent=control)) is None
+
+
+def test_dead_worker_returns_none_and_pool_restarts(pool):
+    pool.parse(PAGE, 'https://example.com/')
+    for pid in list(pool._executor._processes):
+        os.kill(pid, signal.SIGKILL)
+
+    assert pool.parse(PAGE, 'https://example.com/') is None
+    assert pool.parse(PAGE, 'https://example.com/')['emails'] == ['hello@example.com']
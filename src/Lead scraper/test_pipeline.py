@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Tests for the streaming lead pipeline, run against a fake Places scraper
+Run with: python3 -m pytest test_pipeline.py
+"""
+
+import csv
+import time
+import threading
+
+import pytest
+
+import pipeline
+from job_control import JobControl
+from pipeline import CsvLeadSink, LeadPipeline
+
+
+class FakeScraper:
+    """Stands in for LeadScraper: every query finds `per_query` places"""
+
+    job_id = None
+
+    def __init__(self, per_query=5, missing=(), broken=()):
+        self.per_query = per_query
+        self.missing = set(missing)
+        self.broken = set(broken)
+        self.details_calls = []
+        self._lock = threading.Lock()
+
+    def resolve_location(self, location):
+        return (51.5, -0.1)
+
+    def search_places(self, query, location=None, radius=5000):
+        return [{'place_id': f"{query}-{i}", 'name': f"{query} {i}"} for i in range(self.per_query)]
+
+    def get_place_details(self, place_id, fields=None):
+        with self._lock:
+            self.details_calls.append(place_id)
+        if place_id in self.broken:
+            raise RuntimeError('Places API unreachable')
+        if place_id in self.missing:
+            return None
+        return {'website': f"https://{place_id}.example.com"}
+
+    def build_lead(self, place, details, query):
+        return {'place_id': place['place_id'], 'name': place['name'], 'website': details['website'],
+                'search_query': query}
+
+
+@pytest.fixture(autouse=True)
+def no_api_delay(monkeypatch):
+    monkeypatch.setattr(pipeline, 'API_DELAY', 0)
+
+
+def test_every_place_becomes_a_lead(tmp_path):
+    scraper = FakeScraper(per_query=5, missing={'cafes-2'})
+    sink = CsvLeadSink(str(tmp_path / 'leads.csv'), fieldnames=['place_id', 'name', 'website'])
+    seen = []
+
+    leads = LeadPipeline(scraper, sink=sink, on_lead=lambda lead, count: seen.append(count),
+                         details_workers=3).run(['cafes', 'bakeries'], 'London, UK', max_results=4)
+    sink.close()
+
+    assert sorted(lead['place_id'] for lead in leads) == sorted(
+        ['cafes-0', 'cafes-1', 'cafes-3', 'bakeries-0', 'bakeries-1', 'bakeries-2', 'bakeries-3'])
+    assert seen == list(range(1, 8))
+    with open(tmp_path / 'leads.csv', newline='') as f:
+        assert len(list(csv.DictReader(f))) == 7
+
+
+def test_enricher_gets_a_deadline_and_failures_drop_only_that_lead():
+    def enricher(lead, deadline):
+        if lead['place_id'] == 'cafes-1':
+            raise RuntimeError('website exploded')
+        assert deadline.remaining() is not None
+        return dict(lead, emails='hello@example.com')
+
+    leads = LeadPipeline(FakeScraper(per_query=3), enricher=enricher, enrich_workers=2).run(['cafes'])
+
+    assert sorted(lead['place_id'] for lead in leads) == ['cafes-0', 'cafes-2']
+    assert all(lead['emails'] for lead in leads)
+
+
+def test_place_filter_skips_details_calls():
+    scraper = FakeScraper(per_query=4)
+    leads = LeadPipeline(scraper, place_filter=lambda place: not place['place_id'].endswith('0')).run(['cafes'])
+
+    assert len(leads) == 3
+    assert 'cafes-0' not in scraper.details_calls
+
+
+def test_places_without_details_are_released():
+    released = []
+    scraper = FakeScraper(per_query=4, missing={'cafes-1'}, broken={'cafes-2'})
+    leads = LeadPipeline(scraper, place_filter=lambda place: True,
+                         place_release=lambda place: released.append(place['place_id'])).run(['cafes'])
+
+    assert sorted(lead['place_id'] for lead in leads) == ['cafes-0', 'cafes-3']
+    assert sorted(released) == ['cafes-1', 'cafes-2']
+
+
+def test_cancelled_job_stops_without_hanging():
+    control = JobControl()
+
+    def slow_enricher(lead, deadline):
+        time.sleep(0.05)
+        control.cancel()
+        return lead
+
+    started = time.monotonic()
+    leads = LeadPipeline(FakeScraper(per_query=50), enricher=slow_enricher, control=control,
+                         queue_size=2, enrich_workers=1).run(['cafes'], max_results=50)
+
+    assert len(leads) < 50
+    assert time.monotonic() - started < 5
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Tests for refreshing stale rows of an existing lead file
+Run with: python3 -m pytest test_refresh_leads.py
+"""
+
+import pandas as pd
+import pytest
+
+import refresh_leads
+from lead_scraper import LeadScraper
+from lead_store import LeadStore
+
+
+class FakeScraper(LeadScraper):
+    """LeadScraper whose Place Details calls answer from a dict"""
+
+    details = {}
+    calls = []
+
+    def __init__(self):
+        self.job_id = None
+
+    def get_place_details(self, place_id, fields=None):
+        FakeScraper.calls.append(place_id)
+        return FakeScraper.details.get(place_id)
+
+
+@pytest.fixture
+def fake_places(tmp_path, monkeypatch):
+    FakeScraper.calls = []
+    FakeScraper.details = {
+        'p1': {'name': 'Hackney Coffee', 'formatted_phone_number': '020 7000 0002', 'business_status': 'OPERATIONAL'},
+        'p2': {'name': 'Closed Cafe', 'business_status': 'CLOSED_PERMANENTLY'},
+    }
+    monkeypatch.setattr(refresh_leads, 'LeadScraper', FakeScraper)
+    store = LeadStore(str(tmp_path / 'leads.db'), export_dir=str(tmp_path))
+    monkeypatch.setattr(refresh_leads, 'get_lead_store', lambda: store)
+    return FakeScraper
+
+
+def test_file_without_scraped_at_is_all_stale(tmp_path, fake_places):
+    input_file = tmp_path / 'leads.csv'
+    pd.DataFrame([
+        {'place_id': 'p1', 'name': 'Hackney Coffee', 'phone': '020 7000 0001'},
+        {'place_id': 'p2', 'name': 'Closed Cafe', 'phone': ''},
+    ]).to_csv(input_file, index=False)
+
+    master_path, diff_path = refresh_leads.refresh_leads(str(input_file), enrich=False)
+
+    assert sorted(fake_places.calls) == ['p1', 'p2']
+    master = pd.read_csv(master_path, dtype=str, keep_default_na=False)
+    assert list(master['place_id']) == ['p1']
+    assert master.loc[0, 'phone'] == '020 7000 0002'
+    assert master.loc[0, 'scraped_at']
+    diff = pd.read_csv(diff_path, dtype=str, keep_default_na=False)
+    assert sorted(diff['change']) == ['changed', 'removed']
+
+
+def test_recent_rows_are_left_alone(tmp_path, fake_places):
+    input_file = tmp_path / 'leads.csv'
+    pd.DataFrame([
+        {'place_id': 'p1', 'name': 'Hackney Coffee', 'phone': '020 7000 0001',
+         'scraped_at': pd.Timestamp.now().isoformat()},
+        {'place_id': 'p2', 'name': 'Closed Cafe', 'phone': '', 'scraped_at': '2020-01-01T00:00:00'},
+    ]).to_csv(input_file, index=False)
+
+    refresh_leads.refresh_leads(str(input_file), max_age_days=30, flag_closed=True, enrich=False)
+
+    assert fake_places.calls == ['p2']
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Tests for the SQLite task queue: leases, retries, idempotent enqueue and claims
+Run with: python3 -m pytest test_task_queue.py
+"""
+
+import time
+
+import pytest
+
+from task_queue import Broker, SqliteBroker, get_broker
+
+
+@pytest.fixture
+def broker(tmp_path):
+    return SqliteBroker(str(tmp_path / 'tasks.db'))
+
+
+def test_leased_task_is_hidden_until_its_lease_expires(broker):
+    broker.enqueue('enrich_lead', {'n': 1}, queue='q')
+    task = broker.lease('w1', ['q'], visibility_timeout=0.2)
+
+    assert task.attempts == 1
+    assert broker.lease('w2', ['q'], visibility_timeout=0.2) is None
+
+    time.sleep(0.3)
+    retry = broker.lease('w2', ['q'], visibility_timeout=60)
+    assert retry.task_id == task.task_id
+    assert retry.attempts == 2
+    # The first worker's lease is gone: its outcome is refused
+    assert not broker.complete(task, 'w1', {'ok': True})
+    assert not broker.extend(task, 'w1')
+    assert broker.complete(retry, 'w2', {'ok': True})
+    assert broker.stats('q')['done'] == 1
+
+
+def test_extend_keeps_the_lease(broker):
+    broker.enqueue('enrich_lead', {}, queue='q')
+    task = broker.lease('w1', ['q'], visibility_timeout=0.2)
+
+    time.sleep(0.1)
+    assert broker.extend(task, 'w1', visibility_timeout=0.3)
+    time.sleep(0.15)
+    assert broker.lease('w2', ['q']) is None
+
+
+def test_failed_task_is_retried_until_max_attempts(broker):
+    broker.enqueue('enrich_lead', {}, queue='q', max_attempts=2)
+
+    task = broker.lease('w1', ['q'])
+    assert broker.fail(task, 'w1', 'boom')
+    assert broker.stats('q')['queued'] == 1
+
+    task = broker.lease('w1', ['q'])
+    assert broker.fail(task, 'w1', 'boom again')
+    assert broker.stats('q')['failed'] == 1
+    assert broker.lease('w1', ['q']) is None
+    assert list(broker.results('q').values())[0]['error'] == 'boom again'
+
+
+def test_expired_lease_on_last_attempt_marks_task_failed(broker):
+    broker.enqueue('enrich_lead', {}, queue='q', max_attempts=1)
+    broker.lease('w1', ['q'], visibility_timeout=0.1)
+
+    time.sleep(0.2)
+    assert broker.lease('w2', ['q']) is None
+    assert broker.stats('q')['failed'] == 1
+    assert broker.retry_failed('q') == 1
+    assert broker.lease('w2', ['q']).attempts == 1
+
+
+def test_enqueue_with_key_is_idempotent(broker):
+    first = broker.enqueue('scrape_cell', {'v': 1}, queue='q', key='Hackney|cafes')
+    second = broker.enqueue('scrape_cell', {'v': 2}, queue='q', key='Hackney|cafes')
+
+    assert first == second
+    assert broker.stats('q')['queued'] == 1
+    assert broker.lease('w1', ['q']).payload == {'v': 1}
+
+
+def test_enqueue_requeues_a_failed_task(broker):
+    broker.enqueue('scrape_cell', {'v': 1}, queue='q', key='cell', max_attempts=1)
+    broker.fail(broker.lease('w1', ['q']), 'w1', 'boom')
+
+    broker.enqueue('scrape_cell', {'v': 2}, queue='q', key='cell', max_attempts=1)
+    task = broker.lease('w1', ['q'])
+    assert task.payload == {'v': 2}
+    assert task.attempts == 1
+
+
+def test_lease_only_takes_requested_queues(broker):
+    broker.enqueue('enrich_lead', {}, queue='a')
+
+    assert broker.lease('w1', ['b']) is None
+    assert broker.lease('w1', ['a']).queue == 'a'
+
+
+def test_claim_is_first_come_and_kept_by_a_retried_task(broker):
+    assert broker.claim('campaign:x', 'place1', 'task-a')
+    assert not broker.claim('campaign:x', 'place1', 'task-b')
+    assert broker.claim('campaign:x', 'place1', 'task-a')
+    assert broker.claim('campaign:y', 'place1', 'task-b')
+
+    assert broker.claim('campaign:x', 'place2')
+    assert not broker.claim('campaign:x', 'place2')
+
+
+def test_get_broker_rejects_unknown_scheme():
+    with pytest.raises(ValueError):
+        get_broker('memcached://queue-host')
+
+
+def test_release_gives_a_claim_back(broker):
+    assert broker.claim('campaign:x', 'place1', 'task-a')
+    assert not broker.release('campaign:x', 'place1', 'task-b')
+    assert broker.release('campaign:x', 'place1', 'task-a')
+    assert broker.claim('campaign:x', 'place1', 'task-b')
+
+
+def test_task_failing_for_good_releases_its_claims(broker):
+    task_id = broker.enqueue('scrape_cell', {}, queue='q', max_attempts=2)
+    task = broker.lease('w1', ['q'])
+    broker.claim('q', 'place1', task_id)
+
+    broker.fail(task, 'w1', 'boom')
+    assert not broker.claim('q', 'place1', 'other-task')  # Kept for the retry
+
+    broker.fail(broker.lease('w1', ['q']), 'w1', 'boom again')
+    assert broker.claim('q', 'place1', 'other-task')
+
+
+def test_expired_last_attempt_releases_its_claims(broker):
+    task_id = broker.enqueue('scrape_cell', {}, queue='q', max_attempts=1)
+    broker.lease('w1', ['q'], visibility_timeout=0.1)
+    broker.claim('q', 'place1', task_id)
+
+    time.sleep(0.2)
+    assert broker.lease('w2', ['q']) is None
+    assert broker.claim('q', 'place1', 'other-task')
+
+
+def test_broker_interface_is_abstract():
+    class Incomplete(Broker):
+        def enqueue(self, kind, payload, queue='default', key=None, max_attempts=None):
+            return 'id'
+
+    with pytest.raises(TypeError):
+        Incomplete()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Tests for how a worker reports task outcomes to the broker
+Run with: python3 -m pytest test_worker.py
+"""
+
+import time
+
+import pytest
+
+import worker as worker_module
+from task_queue import SqliteBroker
+from worker import HANDLERS, Worker
+
+
+@pytest.fixture
+def broker(tmp_path):
+    return SqliteBroker(str(tmp_path / 'tasks.db'))
+
+
+@pytest.fixture
+def handlers(monkeypatch):
+    monkeypatch.setitem(HANDLERS, 'ok', lambda task, broker: {'ok': True})
+    monkeypatch.setitem(HANDLERS, 'slow', lambda task, broker: time.sleep(0.3) or {'ok': True})
+
+    def boom(task, broker):
+        raise RuntimeError('boom')
+
+    monkeypatch.setitem(HANDLERS, 'boom', boom)
+
+
+def test_completed_task_is_counted(broker, handlers):
+    broker.enqueue('ok', {}, queue='q')
+    worker = Worker(broker, ['q'], visibility_timeout=60)
+    worker.run_task(broker.lease(worker.worker_id, ['q'], 60))
+
+    assert (worker.completed, worker.failed, worker.lost) == (1, 0, 0)
+    assert broker.stats('q')['done'] == 1
+
+
+def test_failed_task_is_counted_and_requeued(broker, handlers):
+    broker.enqueue('boom', {}, queue='q')
+    worker = Worker(broker, ['q'], visibility_timeout=60)
+    worker.run_task(broker.lease(worker.worker_id, ['q'], 60))
+
+    assert (worker.completed, worker.failed, worker.lost) == (0, 1, 0)
+    assert broker.stats('q')['queued'] == 1
+
+
+def test_task_finished_after_losing_its_lease_is_not_counted(broker, handlers):
+    broker.enqueue('slow', {}, queue='q')
+    worker = Worker(broker, ['q'], visibility_timeout=60)
+    task = broker.lease(worker.worker_id, ['q'], visibility_timeout=0.1)
+
+    # Another worker takes the task over while the slow handler runs
+    time.sleep(0.15)
+    other = broker.lease('other-worker', ['q'], visibility_timeout=60)
+    worker.run_task(task)
+
+    assert (worker.completed, worker.failed, worker.lost) == (0, 0, 1)
+    assert broker.stats('q')['leased'] == 1
+    assert broker.complete(other, 'other-worker', {'ok': True})
+
+
+def test_broker_errors_are_logged_and_do_not_end_the_worker(broker, handlers, monkeypatch):
+    monkeypatch.setattr(worker_module, 'POLL_INTERVAL', 0.01)
+    broker.enqueue('ok', {}, queue='q')
+    lease = broker.lease
+    failures = []
+
+    def flaky_lease(*args, **kwargs):
+        if len(failures) < 2:
+            failures.append(1)
+            raise RuntimeError('database is locked')
+        return lease(*args, **kwargs)
+
+    monkeypatch.setattr(broker, 'lease', flaky_lease)
+    worker = Worker(broker, ['q'], visibility_timeout=60, drain=True)
+    worker._loop()
+
+    assert len(failures) == 2
+    assert worker.completed == 1
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+URL Resolver - Race http/https/www variants of a lead's website
+Many small-business sites only answer on http:// or only on the www. host.
+All likely variants are requested at once and the first good response wins;
+the winning scheme and host are cached per domain for later runs.
+"""
+
+import os
+import json
+import time
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, List, Optional
+from urllib.parse import urlparse, urlunparse
+
+from config import PAGE_TIMEOUT, URL_CACHE_FILE, URL_RACE_WORKERS
+from circuit_breaker import HostBlocked, counts_as_failure, host_for
+from metrics import get_metrics
+
+
+def url_variants(url: str) -> List[str]:
+    """
+    Likely working variants of a website URL, most likely first
+
+    Args:
+        url: Website URL, with or without scheme
+
+    Returns:
+        Unique URLs covering https/http with and without www.
+    """
+    if '://' not in url:
+        parsed = urlparse('https://' + url)
+        schemes = ['https', 'http']
+    else:
+        parsed = urlparse(url)
+        schemes = [parsed.scheme, 'http' if parsed.scheme == 'https' else 'https']
+
+    netloc = parsed.netloc
+    bare = netloc[4:] if netloc.lower().startswith('www.') else netloc
+    hosts = [netloc, bare if netloc != bare else 'www.' + bare]
+
+    variants = []
+    for scheme in schemes:
+        for host in hosts:
+            variant = urlunparse((scheme, host, parsed.path or '/', parsed.params, parsed.query, ''))
+            if variant not in variants:
+                variants.append(variant)
+    return variants
+
+
+def _swap_base(url: str, base: str) -> str:
+    """Put a URL's path onto a cached scheme://host base"""
+    parsed = urlparse(url if '://' in url else 'https://' + url)
+    base_parsed = urlparse(base)
+    return urlunparse((base_parsed.scheme, base_parsed.netloc, parsed.path or '/', parsed.params, parsed.query, ''))
+
+
+class UrlResolver:
+    def __init__(self, session: requests.Session, breaker, cache_path: str = None, workers: int = None):
+        """
+        Initialize the resolver
+
+        Args:
+            session: requests session used for the race
+            breaker: HostCircuitBreaker consulted before racing a host
+            cache_path: JSON file mapping domains to their working scheme://host
+            workers: Threads shared by all races
+        """
+        self.session = session
+        self.breaker = breaker
+        self.cache_path = cache_path or URL_CACHE_FILE
+        self._lock = threading.Lock()
+        self._cache = self._load_cache()
+        self._executor = ThreadPoolExecutor(max_workers=workers or URL_RACE_WORKERS,
+                                            thread_name_prefix='url-race')
+
+    def _load_cache(self) -> Dict:
+        """Load known canonical URLs from disk"""
+        try:
+            with open(self.cache_path, 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _save_cache(self):
+        """Write the cache to disk atomically"""
+        try:
+            directory = os.path.dirname(self.cache_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = self.cache_path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(self._cache, f, indent=2)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            print(f"⚠️  Could not write URL cache: {str(e)}")
+
+    def _remember(self, domain: str, final_url: str):
+        """Cache the scheme://host a domain answered on"""
+        parsed = urlparse(final_url)
+        base = f"{parsed.scheme}://{parsed.netloc}"
+        with self._lock:
+            if self._cache.get(domain, {}).get('base') == base:
+                return
+            self._cache[domain] = {'base': base, 'checked_at': time.time()}
+            self._save_cache()
+
+    def _forget(self, domain: str):
+        """Drop a cached canonical URL that stopped working"""
+        with self._lock:
+            if self._cache.pop(domain, None) is not None:
+                self._save_cache()
+
+    def _get(self, url: str, timeout: float, headers: Dict = None):
+        """GET one variant, streaming so a loser can be closed without reading its body"""
+        return self.session.get(url, timeout=timeout, stream=True, headers=headers)
+
+    def open(self, url: str, deadline=None, conditional_headers=None):
+        """
+        Open a website, trying the cached canonical URL first and racing
+        variants otherwise
+
+        Args:
+            url: Website URL, with or without scheme
+            deadline: Optional Deadline bounding the race
+            conditional_headers: Optional callable(url) -> headers used for
+                                 the cached canonical URL (e.g. If-None-Match)
+
+        Returns:
+            The winning streamed response (caller must close it), or None if
+            no variant gave a 200 (a 304 is returned for a cached canonical
+            URL when conditional headers were sent)
+
+        Raises:
+            HostBlocked: If the host's circuit is open
+        """
+        domain = host_for(url)
+        if not self.breaker.allow(url):
+            raise HostBlocked(f"{domain} is failing, skipped")
+
+        timeout = deadline.timeout(PAGE_TIMEOUT) if deadline else PAGE_TIMEOUT
+
+        with self._lock:
+            cached = self._cache.get(domain)
+        get_metrics().cache('canonical_url', bool(cached))
+        if cached:
+            canonical = _swap_base(url, cached['base'])
+            headers = conditional_headers(canonical) if conditional_headers else None
+            try:
+                response = self._get(canonical, timeout, headers)
+                if response.status_code in (200, 304):
+                    self.breaker.record_success(url)
+                    return response
+                response.close()
+            except (requests.ConnectionError, requests.Timeout):
+                pass
+            self._forget(domain)
+            timeout = deadline.timeout(PAGE_TIMEOUT) if deadline else PAGE_TIMEOUT
+
+        return self._race(url, domain, timeout)
+
+    def _race(self, url: str, domain: str, timeout: float):
+        """Request every variant at once and keep the first 200"""
+        pending = {self._executor.submit(self._get, variant, timeout) for variant in url_variants(url)}
+        winner = None
+        host_answered = False
+        last_error = ''
+
+        while pending and winner is None:
+            done, pending = wait(pending, timeout=timeout + 1, return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                try:
+                    response = future.result()
+                except Exception as e:
+                    last_error = str(e)
+                    continue
+                if response.status_code < 500:
+                    host_answered = True
+                if winner is None and response.status_code == 200:
+                    winner = response
+                else:
+                    response.close()
+
+        # Close the losers' responses whenever they arrive
+        for future in pending:
+            future.add_done_callback(_close_response)
+
+        if winner is not None:
+            self.breaker.record_success(url)
+            self._remember(domain, winner.url)
+        elif host_answered:
+            self.breaker.record_success(url)
+        elif counts_as_failure(timeout):
+            # Silence within a timeout the deadline had cut short isn't the host's fault
+            self.breaker.record_failure(url, last_error or 'No variant answered')
+
+        return winner
+
+    def resolve(self, url: str, deadline=None) -> Optional[str]:
+        """Return the working URL for a website, or None if nothing answered"""
+        response = self.open(url, deadline)
+        if response is None:
+            return None
+        response.close()
+        return response.url
+
+
+def _close_response(future):
+    """Done-callback closing a race loser's response"""
+    try:
+        future.result().close()
+    except Exception:
+        pass
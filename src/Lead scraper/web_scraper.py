@@ -4,16 +4,26 @@ Web-based Lead Scraper
 A Flask web application for lead generation
 """
 
-from flask import Flask, render_template, request, jsonify, send_file, flash, redirect, url_for
+from flask import Flask, Response, render_template, request, jsonify, send_file, flash, redirect, url_for
 import os
 import json
-import pandas as pd
 from datetime import datetime
-from lead_scraper import LeadScraper
-from email_scraper import EmailLeadScraper
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from pipeline import LeadPipeline
+from lead_store import get_lead_store, StoreLeadSink, EXPORT_FORMATS
+from lead_index import LeadIndex, SORT_FIELDS
+from lead_record import lead_rows
+from job_control import JobControl
+from job_state import get_job_state, JobReporter
+from metrics import get_metrics
+from run_log import get_log
+from config import JOB_DEADLINE, JOB_INDEX_CACHE_SIZE, WEB_JOB_WORKERS, WEB_MAX_ACTIVE_JOBS
 import threading
-import time
-import signal
+import uuid
+
+# Load environment variables (the scrapers, which also do this, are only imported by jobs)
+load_dotenv()
 
 app = Flask(__name__)
 app.secret_key = 'your-secret-key-here'  # Change this in production
@@ -54,17 +64,51 @@ def switch_api_key(account_name):
         return True
     return False
 
-# Global variables to store scraping status
-scraping_status = {
+# Scraping jobs run here; their status lives in the shared job state (see
+# job_state.py), so any worker process of the app can report on or cancel them
+job_executor = ThreadPoolExecutor(max_workers=WEB_JOB_WORKERS, thread_name_prefix='web-job')
+
+# Status reported before any job has been started
+IDLE_STATUS = {
     'is_running': False,
     'progress': 0,
     'current_query': '',
     'total_queries': 0,
     'leads_found': 0,
     'message': '',
-    'results': []
+    'results': [],
+    'job_id': None
 }
 
+# In-memory lead indexes for the most recent jobs, by job id (oldest first)
+job_indexes = {}
+job_indexes_lock = threading.Lock()
+
+def get_job_index(job_id):
+    """Index for a job's leads, rebuilt from the lead store if it isn't in memory"""
+    with job_indexes_lock:
+        index = job_indexes.get(job_id)
+    if index is not None:
+        return index
+    
+    store = get_lead_store()
+    job = store.get_job(job_id)
+    if job is None:
+        return None
+    index = LeadIndex(store.leads(job_id=job_id))
+    if job['status'] == 'running':
+        # Still growing in another process; only a finished job's index is kept
+        return index
+    return remember_job_index(job_id, index)
+
+def remember_job_index(job_id, index):
+    """Keep an index in memory, dropping the oldest ones beyond JOB_INDEX_CACHE_SIZE"""
+    with job_indexes_lock:
+        job_indexes[job_id] = index
+        while len(job_indexes) > JOB_INDEX_CACHE_SIZE:
+            del job_indexes[next(iter(job_indexes))]
+    return index
+
 @app.route('/')
 def index():
     """Main page"""
@@ -73,10 +117,9 @@ def index():
 @app.route('/scrape', methods=['POST'])
 def scrape_leads():
     """Start scraping leads"""
-    global scraping_status
-    
-    if scraping_status['is_running']:
-        return jsonify({'error': 'Scraping is already in progress'})
+    state = get_job_state()
+    if len(state.active()) >= WEB_MAX_ACTIVE_JOBS:
+        return jsonify({'error': 'Too many scrapes are in progress, please try again shortly'})
     
     # Get form data
     api_account = request.form.get('apiKey', 'Account 1')
@@ -95,152 +138,176 @@ def scrape_leads():
     if not queries:
         return jsonify({'error': 'Please enter at least one search term'})
     
-    # Reset status
-    scraping_status.update({
-        'is_running': True,
-        'progress': 0,
-        'current_query': '',
-        'total_queries': len(queries),
-        'leads_found': 0,
-        'message': 'Starting scraper...',
-        'results': []
-    })
+    # The job stops itself cooperatively once JOB_DEADLINE passes or it is
+    # cancelled; the reporter heartbeats it (even while it waits for a free
+    # worker) and passes on cancellations made through other processes
+    job_id = uuid.uuid4().hex[:12]
+    control = JobControl(deadline_seconds=JOB_DEADLINE)
+    state.create(job_id, len(queries), 'Starting scraper...')
+    reporter = JobReporter(state, job_id, control)
     
-    # Start scraping in background thread
-    thread = threading.Thread(
-        target=run_scraper,
-        args=(queries, location, max_results, include_emails)
-    )
-    thread.daemon = True
-    thread.start()
+    # The key is read now, so switching accounts later doesn't affect this job
+    job_executor.submit(run_scraper, queries, location, max_results, include_emails,
+                        control, job_id, reporter, get_current_api_key())
     
-    # Set a timeout to prevent hanging (30 minutes max)
-    def timeout_handler():
-        time.sleep(1800)  # 30 minutes
-        if scraping_status['is_running']:
-            scraping_status['is_running'] = False
-            scraping_status['message'] = 'Scraping timed out after 30 minutes'
+    return jsonify({'success': True, 'message': 'Scraping started', 'job_id': job_id})
+
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """Cancel a running job; in-flight requests stop at their next deadline check"""
+    state = get_job_state()
+    if not state.request_cancel(job_id):
+        return jsonify({'error': 'Job not found'}), 404
     
-    timeout_thread = threading.Thread(target=timeout_handler)
-    timeout_thread.daemon = True
-    timeout_thread.start()
+    state.update(job_id, message='Cancelling...')
     
-    return jsonify({'success': True, 'message': 'Scraping started'})
+    return jsonify({'success': True, 'message': 'Cancellation requested', 'job_id': job_id})
 
-def run_scraper(queries, location, max_results, include_emails):
-    """Run the scraper in background"""
-    global scraping_status
+def run_scraper(queries, location, max_results, include_emails, control, job_id, reporter, api_key=None):
+    """Run a scraping job on the job executor, publishing its progress through the reporter"""
+    if control.cancelled:
+        # Cancelled while it was waiting for a worker
+        reporter.close(status='cancelled', progress=100, message=f'{control.reason()}. Kept 0 leads')
+        return
+    reporter.set(status='running')
     
     try:
-        # Get current API key
-        current_api_key = get_current_api_key()
+        # Loaded on the first job rather than at startup: pandas, googlemaps and
+        # requests sit behind these, and /status or /files never need them
+        from lead_scraper import LeadScraper
+        from email_scraper import EmailLeadScraper
         
-        # Initialize scraper with current API key
+        # Initialize scraper with the job's API key
+        api_key = api_key or get_current_api_key()
         if include_emails:
-            scraper = EmailLeadScraper(api_key=current_api_key)
+            scraper = EmailLeadScraper(api_key=api_key)
         else:
-            scraper = LeadScraper(api_key=current_api_key)
+            scraper = LeadScraper(api_key=api_key)
         
-        all_leads = []
-        total_places = 0
+        def on_search(query, places):
+            reporter.set(current_query=query,
+                         message=f'Found {len(places)} places for "{query}". Processing details...')
         
-        for i, query in enumerate(queries):
-            scraping_status['current_query'] = query
-            scraping_status['progress'] = int((i / len(queries)) * 100)
-            scraping_status['message'] = f'Processing: {query}'
+        def on_lead(lead, count):
+            index.add(lead)
             
-            # Search for places
-            places = scraper.search_places(query, location, radius=5000)
-            places = places[:max_results]
-            total_places += len(places)
-            
-            scraping_status['message'] = f'Found {len(places)} places for "{query}". Processing details...'
-            
-            for j, place in enumerate(places):
-                place_id = place.get('place_id')
-                if place_id:
-                    try:
-                        details = scraper.get_place_details(place_id)
-                        if details:
-                            lead = {
-                                'name': details.get('name', place.get('name', '')),
-                                'address': details.get('formatted_address', place.get('formatted_address', '')),
-                                'phone': details.get('formatted_phone_number', ''),
-                                'website': details.get('website', ''),
-                                'rating': details.get('rating', 0),
-                                'total_reviews': details.get('user_ratings_total', 0),
-                                'price_level': details.get('price_level', ''),
-                                'business_status': details.get('business_status', ''),
-                                'types': ', '.join(details.get('type', [])),
-                                'place_id': place_id,
-                                'query_used': query,
-                                'scraped_at': datetime.now().isoformat()
-                            }
-                            
-                            # Add email if requested (with timeout protection)
-                            if include_emails and lead.get('website'):
-                                try:
-                                    scraping_status['message'] = f'Getting email for: {lead["name"]}'
-                                    emails = scraper.scrape_website_for_emails(lead['website'])
-                                    lead['emails'] = ', '.join(emails) if emails else ''
-                                except Exception as e:
-                                    print(f"Email scraping failed for {lead['name']}: {str(e)}")
-                                    lead['emails'] = ''
-                            
-                            all_leads.append(lead)
-                            scraping_status['leads_found'] = len(all_leads)
-                            
-                            # Update progress more frequently
-                            current_progress = int(((i * max_results + j + 1) / (len(queries) * max_results)) * 100)
-                            scraping_status['progress'] = min(current_progress, 95)
-                            scraping_status['message'] = f'Processed {j+1}/{len(places)} places for "{query}". Found {len(all_leads)} total leads.'
-                    
-                    except Exception as e:
-                        print(f"Error processing place {place_id}: {str(e)}")
-                        continue
-                
-                time.sleep(0.1)  # Rate limiting
+            # Progress follows the leads that have reached disk
+            current_progress = int((count / (len(queries) * max_results)) * 100)
+            reporter.set(leads_found=count, progress=min(current_progress, 95),
+                         message=f'Processed "{lead["name"]}". Found {count} total leads.')
         
-        # Save results
-        if all_leads:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            
-            # Create filename with search terms
-            search_terms_clean = '_'.join([term.replace(' ', '_').replace(',', '') for term in queries[:3]])
-            if len(queries) > 3:
-                search_terms_clean += f"_and_{len(queries)-3}_more"
-            
-            # Limit filename length
-            if len(search_terms_clean) > 50:
-                search_terms_clean = search_terms_clean[:50]
-            
-            filename = f"leads_{search_terms_clean}_{timestamp}.csv"
-            filepath = os.path.join('data', filename)
-            
-            # Create data directory if it doesn't exist
-            os.makedirs('data', exist_ok=True)
-            
-            # Save to CSV
-            df = pd.DataFrame(all_leads)
-            df.to_csv(filepath, index=False)
-            
-            scraping_status['results'] = all_leads
-            scraping_status['message'] = f'Completed! Found {len(all_leads)} leads. Saved to {filename}'
+        def enrich(lead, deadline):
+            # Only the website is checked here; a failure leaves the lead without emails
+            lead['emails'] = ''
+            if lead.get('website'):
+                try:
+                    emails = scraper.scrape_website_for_emails(lead['website'], deadline=deadline)
+                    lead['emails'] = ', '.join(emails) if emails else ''
+                except Exception as e:
+                    get_log().warning('enrich_failed', "Email scraping failed for {name}: {error}",
+                                      name=lead['name'], error=str(e))
+            return lead
+        
+        # Stream leads into the lead store as they are processed; CSV/Excel
+        # files are exported from it when downloaded
+        store = get_lead_store()
+        name = os.path.splitext(scraper.output_filename('csv', queries))[0]
+        store.start_job('web', queries, location, name=name, job_id=job_id)
+        scraper.job_id = job_id
+        sink = StoreLeadSink(store, job_id)
+        index = remember_job_index(job_id, LeadIndex())
+        
+        reporter.set(message=f'Resolving location: {location}')
+        pipeline = LeadPipeline(
+            scraper,
+            enricher=enrich if include_emails else None,
+            sink=sink,
+            on_lead=on_lead,
+            on_search=on_search,
+            control=control
+        )
+        try:
+            all_leads = pipeline.run(queries, location, max_results, radius=5000)
+        finally:
+            sink.close()
+            store.finish_job(job_id, 'cancelled' if control.cancelled else 'completed')
+        
+        if control.cancelled:
+            message = f'{control.reason()}. Kept {len(all_leads)} leads'
+            if all_leads:
+                message += f' in {name}'
+        elif all_leads:
+            message = f'Completed! Found {len(all_leads)} leads. Saved as {name}'
         else:
-            scraping_status['message'] = 'No leads found'
+            message = 'No leads found'
         
-        scraping_status['progress'] = 100
+        # Leads found is final here even if the last on_lead update was batched away
+        reporter.close(status='cancelled' if control.cancelled else 'completed', progress=100,
+                       leads_found=len(all_leads), message=message)
         
     except Exception as e:
-        scraping_status['message'] = f'Error: {str(e)}'
+        get_log().error('job_failed', "❌ Job {job_id} failed: {error}", job_id=job_id, error=str(e))
+        reporter.close(status='failed', error=str(e), message=f'Error: {str(e)}')
+
+@app.route('/jobs/<job_id>/leads')
+def job_leads(job_id):
+    """
+    Browse a job's leads, filtered, sorted and paginated on the server
+    
+    Query parameters: min_rating, has_email (1/0), type, query,
+    sort (rating, reviews, name, newest), order (asc/desc), page, per_page,
+    facets=1 to include lead counts per type
+    """
+    index = get_job_index(job_id)
+    if index is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    args = request.args
+    sort = args.get('sort', 'rating')
+    if sort not in SORT_FIELDS:
+        return jsonify({'error': f'Unsupported sort field: {sort}'}), 400
     
-    finally:
-        scraping_status['is_running'] = False
+    try:
+        min_rating = float(args['min_rating']) if args.get('min_rating') else None
+        page = int(args.get('page', 1))
+        per_page = min(int(args.get('per_page', 50)), 500)
+    except ValueError:
+        return jsonify({'error': 'min_rating, page and per_page must be numbers'}), 400
+    
+    has_email = args.get('has_email')
+    result = index.search(
+        min_rating=min_rating,
+        has_email=None if has_email in (None, '') else has_email.lower() in ('1', 'true', 'yes'),
+        place_type=args.get('type') or None,
+        query=args.get('query') or None,
+        sort=sort,
+        descending=args.get('order', 'desc') != 'asc',
+        page=page,
+        per_page=per_page
+    )
+    result['leads'] = lead_rows(result['leads'])
+    result['job_id'] = job_id
+    if args.get('facets'):
+        result['types'] = index.types()
+    return jsonify(result)
 
 @app.route('/status')
 def get_status():
-    """Get scraping status"""
-    return jsonify(scraping_status)
+    """Get a job's status (?job_id=..., default: the most recent job) and, once it has finished, its leads"""
+    state = get_job_state()
+    job_id = request.args.get('job_id')
+    job = state.get(job_id) if job_id else state.latest()
+    if job is None:
+        if job_id:
+            return jsonify({'error': 'Job not found'}), 404
+        return jsonify(IDLE_STATUS)
+    
+    status = {key: job[key] for key in IDLE_STATUS if key in job}
+    status['status'] = job['status']
+    status['results'] = []
+    if not job['is_running'] and job['leads_found']:
+        status['results'] = lead_rows(get_lead_store().leads(job_id=job['job_id']))
+    return jsonify(status)
 
 @app.route('/api-status')
 def get_api_status():
@@ -252,36 +319,75 @@ def get_api_status():
         'key_usage': config['key_usage']
     })
 
+@app.route('/metrics')
+def prometheus_metrics():
+    """Stage timings, API requests and cache hit rates in Prometheus text format"""
+    return Response(get_metrics().prometheus(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/jobs/<job_id>/metrics')
+def job_metrics(job_id):
+    """Stage timings, API requests and cache hit rates for one recent job"""
+    return jsonify(get_metrics().summary(job_id))
+
 @app.route('/download/<filename>')
 def download_file(filename):
     """Download generated file"""
-    filepath = os.path.join('data', filename)
+    filepath = get_lead_store().export_path(filename) or os.path.join('data', filename)
     if os.path.exists(filepath):
-        return send_file(filepath, as_attachment=True)
+        return send_file(os.path.abspath(filepath), as_attachment=True)
     else:
         return jsonify({'error': 'File not found'})
 
+@app.route('/jobs/<job_id>/export')
+def export_job(job_id):
+    """Export a job's leads from the lead store (?format=csv or xlsx)"""
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f'Unsupported format: {fmt}'}), 400
+    
+    store = get_lead_store()
+    if store.get_job(job_id) is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    filepath = store.export(job_id, fmt)
+    if not filepath:
+        return jsonify({'error': 'Job has no leads'}), 404
+    return send_file(os.path.abspath(filepath), as_attachment=True)
+
 @app.route('/files')
 def list_files():
-    """List available files"""
-    data_dir = 'data'
-    if not os.path.exists(data_dir):
-        return jsonify({'files': []})
+    """List jobs and their exports from the lead store catalog (?page=1&per_page=20)"""
+    try:
+        page = int(request.args.get('page', 1))
+        per_page = int(request.args.get('per_page', 20))
+    except ValueError:
+        return jsonify({'error': 'page and per_page must be numbers'}), 400
+    
+    catalog = get_lead_store().catalog(page, per_page)
     
     files = []
-    for filename in os.listdir(data_dir):
-        if filename.endswith('.csv'):
-            filepath = os.path.join(data_dir, filename)
-            stat = os.stat(filepath)
-            files.append({
-                'name': filename,
-                'size': stat.st_size,
-                'created': datetime.fromtimestamp(stat.st_ctime).isoformat()
-            })
+    for job in catalog['jobs']:
+        files.append({
+            'name': f"{job['name']}.csv",
+            'job_id': job['job_id'],
+            'status': job['status'],
+            'leads': job['lead_count'],
+            'size': max([export['size'] or 0 for export in job['exports']], default=0),
+            'created': datetime.fromtimestamp(job['created_at']).isoformat(),
+            'download_url': url_for('export_job', job_id=job['job_id'], format='csv'),
+            'exports': [{
+                'name': export['filename'],
+                'size': export['size'],
+                'created': datetime.fromtimestamp(export['created_at']).isoformat()
+            } for export in job['exports']]
+        })
     
-    # Sort by creation time (newest first)
-    files.sort(key=lambda x: x['created'], reverse=True)
-    return jsonify({'files': files})
+    return jsonify({
+        'files': files,
+        'page': catalog['page'],
+        'per_page': catalog['per_page'],
+        'total': catalog['total']
+    })
 
 if __name__ == '__main__':
     # Create templates directory if it doesn't exist
@@ -292,5 +398,7 @@ if __name__ == '__main__':
     print("📱 Open your browser and go to: http://localhost:5001")
     print("🛑 Press Ctrl+C to stop the server")
     print("🔒 Port 5001 is reserved exclusively for LeadScraper Pro")
+    print("💡 For several users, serve it with: gunicorn -w 4 -b 0.0.0.0:5001 web_scraper:app")
     
-    app.run(debug=True, host='0.0.0.0', port=5001)
+    # Development server only; DEBUG=true in .env turns on the reloader and debugger
+    app.run(debug=os.getenv('DEBUG', 'false').lower() == 'true', host='0.0.0.0', port=5001)
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Website Email Finder - Fetch lead websites and find email addresses
+Fetching happens on the calling thread; the raw bytes are handed to the
+shared parser pool so HTML parsing doesn't compete with I/O for the GIL.
+"""
+
+import time
+import requests
+from typing import List
+
+from config import PAGE_TIMEOUT, MAX_PAGE_BYTES
+from job_control import Deadline, JobCancelled
+from page_parser import get_parser_pool
+from circuit_breaker import HostBlocked, counts_as_failure, get_circuit_breaker, host_for
+from host_throttle import get_host_throttle
+from url_resolver import UrlResolver
+from http_cache import HttpCache, get_http_cache
+from cassette import install_cassette
+from metrics import get_metrics
+from run_log import get_log
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+
+def requested_url(response) -> str:
+    """The URL a response was requested from, before any redirects"""
+    if response.history:
+        return response.history[0].url
+    return response.url
+
+
+class WebsiteEmailFinder:
+    def __init__(self, session: requests.Session = None, parser_pool=None, breaker=None, http_cache=None,
+                 throttle=None):
+        """
+        Initialize the finder
+
+        Args:
+            session: Optional requests session to reuse
+            parser_pool: Optional ParserPool (defaults to the shared pool)
+            breaker: Optional HostCircuitBreaker (defaults to the shared breaker)
+            http_cache: Optional HttpCache (defaults to the shared cache)
+            throttle: Optional HostThrottle (defaults to the shared throttle)
+        """
+        if session is None:
+            session = requests.Session()
+            session.headers.update({'User-Agent': USER_AGENT})
+        self.session = install_cassette(session)
+        self.parser_pool = parser_pool or get_parser_pool()
+        self.breaker = breaker or get_circuit_breaker()
+        self.http_cache = http_cache or get_http_cache()
+        self.throttle = throttle or get_host_throttle()
+        self.url_resolver = UrlResolver(self.session, self.breaker)
+
+    def fetch_page(self, url: str, deadline: Deadline = None):
+        """
+        Fetch a page and parse it, returning None unless the response is 200
+        (or a 304 for a page already in the HTTP cache)
+
+        The body is read in chunks so the deadline bounds the whole download,
+        not just each socket read. Connection errors, timeouts and 5xx
+        responses count against the host's circuit breaker, except timeouts
+        that the deadline had cut short. Requests to one host are spaced out
+        by the throttle.
+        """
+        if not self.breaker.allow(url):
+            raise HostBlocked(f"{host_for(url)} is failing, skipped")
+        self.throttle.wait(url, deadline)
+
+        timeout = deadline.timeout(PAGE_TIMEOUT) if deadline else PAGE_TIMEOUT
+        try:
+            with get_metrics().timer('fetch'):
+                response = self.session.get(url, timeout=timeout, stream=True,
+                                            headers=self.http_cache.conditional_headers(url))
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if not isinstance(e, requests.Timeout) or counts_as_failure(timeout):
+                self.breaker.record_failure(url, str(e))
+            raise
+
+        with response:
+            if response.status_code >= 500:
+                self.breaker.record_failure(url, f"HTTP {response.status_code}")
+                return None
+            self.breaker.record_success(url)
+            if response.status_code == 304:
+                get_metrics().cache('http', True)
+                # Cached under the requested URL, where the conditional headers came from
+                return self._cached_result(url)
+            if response.status_code != 200:
+                return None
+            return self._read_page(response, url, deadline, counts_as_failure(timeout))
+
+    def _cached_result(self, url: str):
+        """Extraction result stored for a page the server says is unchanged"""
+        entry = self.http_cache.get(url)
+        if entry is None:
+            return None
+        self.http_cache.touch(url)
+        return entry['result']
+
+    def _read_page(self, response, url: str, deadline: Deadline = None, full_timeout: bool = True):
+        """
+        Read a 200 response body within the deadline and parse it
+
+        The page is cached under url, the URL it was requested from, and
+        also under the URL it redirected to. A body whose hash matches the
+        cached copy reuses the cached result. A read error only counts
+        against the host when the request had the full PAGE_TIMEOUT
+        (full_timeout); requests reports read timeouts as connection errors,
+        so a shortened one can't be told apart.
+        """
+        metrics = get_metrics()
+        chunks = []
+        size = 0
+        started = time.perf_counter()
+        try:
+            for chunk in response.iter_content(chunk_size=16384):
+                if deadline:
+                    deadline.check()
+                chunks.append(chunk)
+                size += len(chunk)
+                if size >= MAX_PAGE_BYTES:
+                    break
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if full_timeout:
+                self.breaker.record_failure(url, str(e))
+            raise
+
+        metrics.observe('download', time.perf_counter() - started)
+        if deadline:
+            deadline.check()
+
+        content = b''.join(chunks)
+        final_url = response.url or url
+        content_hash = HttpCache.content_hash(content)
+
+        cached = self.http_cache.get(url)
+        if cached and cached['content_hash'] == content_hash and cached['result'] is not None:
+            metrics.cache('http', True)
+            result = cached['result']
+        else:
+            metrics.cache('http', False)
+            with metrics.timer('parse'):
+                result = self.parser_pool.parse(content, final_url, deadline)
+            if result is None:
+                # Parsing gave up; don't cache that, so the page is parsed again next time
+                return None
+        self.http_cache.store(url, response.headers, content_hash, result, aliases=[final_url])
+        return result
+
+    def fetch_homepage(self, url: str, deadline: Deadline = None):
+        """
+        Fetch and parse a website's homepage
+
+        http/https and www variants are raced (or the cached canonical URL is
+        used), so bare domains and sites that only answer on one variant work.
+        """
+        self.throttle.wait(url, deadline)
+        # The resolver makes its requests with the same timeout
+        full_timeout = counts_as_failure(deadline.timeout(PAGE_TIMEOUT) if deadline else PAGE_TIMEOUT)
+        with get_metrics().timer('fetch'):
+            response = self.url_resolver.open(url, deadline, self.http_cache.conditional_headers)
+        if response is None:
+            return None
+        with response:
+            # The resolver may have requested a variant or the cached canonical URL, not url
+            requested = requested_url(response)
+            if response.status_code == 304:
+                get_metrics().cache('http', True)
+                return self._cached_result(requested)
+            return self._read_page(response, requested, deadline, full_timeout)
+
+    def find_emails(self, url: str, max_pages: int = 3, deadline: Deadline = None) -> List[str]:
+        """
+        Find email addresses on a website
+
+        Args:
+            url: Website URL, with or without scheme
+            max_pages: Maximum pages to fetch, including the homepage
+            deadline: Optional time budget for the whole website
+
+        Returns:
+            List of email addresses found before the budget ran out
+        """
+        started = time.perf_counter()
+        emails = set()
+
+        try:
+            # Get main page from whichever URL variant answers
+            page = self.fetch_homepage(url, deadline)
+            if page:
+                emails.update(page['emails'])
+
+                # Check the best-ranked contact pages until a confident email
+                # (mailto: or on the site's own domain) turns up
+                for contact_url in page['contact_links'][:max_pages-1]:
+                    if page['confident']:
+                        break
+                    try:
+                        # fetch_page waits for the host's throttle slot
+                        contact_page = self.fetch_page(contact_url, deadline)
+                        if contact_page:
+                            emails.update(contact_page['emails'])
+                            page['confident'] = contact_page['confident']
+                    except (JobCancelled, HostBlocked):
+                        break
+                    except Exception:
+                        continue
+
+        except JobCancelled as e:
+            get_log().debug('website_stopped', "   ⏱️  Stopped checking {url}: {error}", url=url, error=str(e))
+        except HostBlocked as e:
+            get_log().debug('website_skipped', "   ⏭️  Skipping {url}: {error}", url=url, error=str(e))
+        except Exception as e:
+            get_log().debug('website_failed', "   ⚠️  Could not scrape website {url}: {error}", url=url, error=str(e))
+
+        metrics = get_metrics()
+        metrics.observe('extract', time.perf_counter() - started)
+        metrics.inc('websites_checked', result='email' if emails else 'no_email')
+        return list(emails)
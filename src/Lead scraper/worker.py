@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Worker - Run scraping tasks from the shared task queue
+Start as many as you like, on one machine or several sharing the data
+directory; each leases tasks (see task_queue.py), keeps its leases alive
+while it works and hands failed tasks back for another try. A worker that
+crashes simply lets its leases expire, and other workers pick the tasks up.
+
+Tasks:
+    scrape_cell   one campaign cell (see campaign.py --enqueue); queues an
+                  enrich_lead task per lead with a website
+    enrich_lead   look for a lead's emails on its website and store them
+
+Usage: python3 worker.py [--queue campaign:london] [--concurrency 2] [--drain]
+"""
+
+import os
+import sys
+import time
+import uuid
+import socket
+import argparse
+import threading
+from typing import Callable, Dict
+
+from config import WORKER_CONCURRENCY, TASK_VISIBILITY_TIMEOUT, LEAD_TIME_BUDGET
+from task_queue import Broker, Task, get_broker
+from lead_record import LEAD_FIELDS, lead_row
+from lead_store import get_lead_store, lead_key
+from job_control import Deadline
+from metrics import job_context
+from run_log import get_log
+
+# Seconds an idle worker waits before asking the queue again
+POLL_INTERVAL = 1
+
+# Longest wait after the broker fails, doubling from POLL_INTERVAL
+MAX_BACKOFF = 30
+
+# Task handlers by kind: handler(task, broker) -> result dict
+HANDLERS: Dict[str, Callable[[Task, Broker], Dict]] = {}
+
+
+def task_handler(kind: str):
+    """Register a function as the handler for a kind of task"""
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+    return register
+
+
+_email_scraper = None
+_email_scraper_lock = threading.Lock()
+
+
+def get_email_scraper():
+    """One EmailLeadScraper per worker process, shared by its task threads"""
+    global _email_scraper
+    from email_scraper import EmailLeadScraper
+    with _email_scraper_lock:
+        if _email_scraper is None:
+            _email_scraper = EmailLeadScraper()
+        return _email_scraper
+
+
+@task_handler('scrape_cell')
+def scrape_cell(task: Task, broker: Broker) -> Dict:
+    """Scrape one campaign cell; places other cells already claimed are skipped"""
+    from campaign import Campaign
+    payload = task.payload
+    matrix = dict(payload['matrix'], emails=False)  # Emails are found by enrich_lead tasks
+    campaign = Campaign(matrix, fresh=True,
+                        claim=lambda place: broker.claim(task.queue, place['place_id'], task.task_id),
+                        release=lambda place: broker.release(task.queue, place['place_id'], task.task_id))
+    campaign.resolver = get_email_scraper().location_resolver
+    leads, stats = campaign.run_cell(payload['location'], payload['query'])
+
+    if payload['matrix'].get('emails'):
+        for lead in leads:
+            if lead.get('website'):
+                broker.enqueue('enrich_lead', {'lead': lead_row(lead, LEAD_FIELDS), 'job_id': stats['job_id']},
+                               queue=task.queue, key=lead_key(lead))
+    return stats
+
+
+@task_handler('enrich_lead')
+def enrich_lead(task: Task, broker: Broker) -> Dict:
+    """Find a stored lead's emails on its website and update the lead store"""
+    lead = task.payload['lead']
+    with job_context(task.payload.get('job_id')):
+        emails = get_email_scraper().scrape_website_for_emails(lead['website'], deadline=Deadline(LEAD_TIME_BUDGET))
+        lead['emails'] = ', '.join(emails) if emails else ''
+        get_lead_store().upsert(lead, task.payload.get('job_id'))
+    return {'emails': len(emails)}
+
+
+class Worker:
+    def __init__(self, broker: Broker, queues=None, concurrency: int = None,
+                 visibility_timeout: float = None, drain: bool = False):
+        """
+        Configure a worker
+
+        Args:
+            broker: Task queue to take work from
+            queues: Only work on these queues (default: any)
+            concurrency: Tasks run at the same time (default: WORKER_CONCURRENCY)
+            visibility_timeout: Lease length in seconds; leases are extended
+                                every third of it while a task runs
+            drain: Exit once the queues are empty instead of waiting for more work
+        """
+        self.broker = broker
+        self.queues = list(queues or [])
+        self.concurrency = concurrency or WORKER_CONCURRENCY
+        self.visibility_timeout = visibility_timeout or TASK_VISIBILITY_TIMEOUT
+        self.drain = drain
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.completed = 0
+        self.failed = 0
+        self.lost = 0  # Tasks whose lease ran out before they finished (another worker redoes them)
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def _idle(self) -> bool:
+        """No task is waiting or running on our queues"""
+        for queue in self.queues or [None]:
+            counts = self.broker.stats(queue)
+            if counts['queued'] or counts['leased']:
+                return False
+        return True
+
+    def _lease_lost(self, task: Task):
+        """Record that a task's outcome was not accepted because its lease had gone"""
+        with self._lock:
+            self.lost += 1
+        get_log().warning('lease_lost', "⚠️  Lost the lease on {task}; another worker may redo it",
+                          task=repr(task))
+
+    def _heartbeat(self, task: Task, done: threading.Event):
+        """Extend a task's lease until it finishes"""
+        while not done.wait(self.visibility_timeout / 3):
+            try:
+                extended = self.broker.extend(task, self.worker_id, self.visibility_timeout)
+            except Exception as e:
+                # Try again next time; the lease only runs out if this keeps failing
+                get_log().warning('lease_extend_error', "⚠️  Could not reach the broker to extend {task}: {error}",
+                                  task=repr(task), error=str(e))
+                continue
+            if not extended:
+                # run_task reports the loss when the broker refuses the outcome
+                get_log().debug('lease_extend_failed', "   ⚠️  Could not extend the lease on {task}",
+                                task=repr(task))
+                return
+
+    def run_task(self, task: Task):
+        """Run one leased task and report the outcome to the broker"""
+        log = get_log()
+        handler = HANDLERS.get(task.kind)
+        if handler is None:
+            self.broker.fail(task, self.worker_id, f"No handler for task kind {task.kind}")
+            return
+
+        done = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(task, done), name='heartbeat', daemon=True)
+        heartbeat.start()
+        started = time.time()
+        try:
+            result = handler(task, self.broker)
+        except Exception as e:
+            done.set()
+            if not self.broker.fail(task, self.worker_id, f"{type(e).__name__}: {e}"):
+                self._lease_lost(task)
+                return
+            with self._lock:
+                self.failed += 1
+            log.error('task_failed', "❌ {kind} failed (attempt {attempt}/{max_attempts}): {error}",
+                      kind=task.kind, task_id=task.task_id, attempt=task.attempts,
+                      max_attempts=task.max_attempts, error=str(e))
+            return
+        done.set()
+        if not self.broker.complete(task, self.worker_id, result):
+            self._lease_lost(task)
+            return
+        with self._lock:
+            self.completed += 1
+        log.debug('task_done', "✅ {kind} done in {seconds}s", kind=task.kind, task_id=task.task_id,
+                  seconds=round(time.time() - started, 1))
+
+    def _loop(self):
+        backoff = POLL_INTERVAL
+        while not self._stop.is_set():
+            try:
+                task = self.broker.lease(self.worker_id, self.queues, self.visibility_timeout)
+                if task is None:
+                    if self.drain and self._idle():
+                        return
+                    self._stop.wait(POLL_INTERVAL)
+                    continue
+                self.run_task(task)
+                backoff = POLL_INTERVAL
+            except Exception as e:
+                # A broker error (e.g. a locked or unreachable queue) must not end this thread;
+                # a task it interrupted is retried once its lease runs out
+                get_log().error('worker_error', "❌ Task queue error, retrying in {seconds}s: {error}",
+                                seconds=backoff, error=f"{type(e).__name__}: {e}")
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, MAX_BACKOFF)
+
+    def run(self):
+        """Work until stopped (Ctrl+C), or until the queues are empty with drain"""
+        log = get_log()
+        print(f"👷 Worker {self.worker_id}: {self.concurrency} at a time from "
+              f"{', '.join(self.queues) if self.queues else 'every queue'}")
+        threads = [threading.Thread(target=self._loop, name=f"task-{i}", daemon=True)
+                   for i in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        try:
+            last_report = (0, 0)
+            while any(thread.is_alive() for thread in threads):
+                time.sleep(POLL_INTERVAL)
+                if (self.completed, self.failed) != last_report:
+                    last_report = (self.completed, self.failed)
+                    log.info('worker_progress', "📊 {completed} tasks done, {failed} failed",
+                             completed=self.completed, failed=self.failed)
+        except KeyboardInterrupt:
+            # Running tasks finish; anything left is retried after its lease expires
+            print(f"\n🛑 Stopping after the running tasks...")
+            self._stop.set()
+            for thread in threads:
+                thread.join()
+        print(f"✅ Worker finished: {self.completed} tasks done, {self.failed} failed"
+              + (f", {self.lost} lost to expired leases" if self.lost else ''))
+
+
+def main():
+    """Main function with command line arguments"""
+    parser = argparse.ArgumentParser(description="Run scraping tasks from the shared task queue")
+    parser.add_argument('--queue', action='append', dest='queues',
+                        help="Only take tasks from this queue (repeatable; default: every queue)")
+    parser.add_argument('--concurrency', type=int, help=f"Tasks run at once (default: {WORKER_CONCURRENCY})")
+    parser.add_argument('--visibility-timeout', type=float,
+                        help=f"Lease length in seconds (default: {TASK_VISIBILITY_TIMEOUT})")
+    parser.add_argument('--drain', action='store_true', help="Exit when there is no work left")
+    parser.add_argument('--broker', help="Task queue URL (default: TASK_QUEUE_URL)")
+    args = parser.parse_args()
+
+    try:
+        Worker(get_broker(args.broker), args.queues, args.concurrency,
+               args.visibility_timeout, args.drain).run()
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())